@@ -0,0 +1,28 @@
+from dotenv import load_dotenv
+load_dotenv()
+
+import argparse
+
+from src.dependencies import get_collection
+from src.services.vendor_service import backfill_filter_metadata
+
+# Usage: python backfill_vendor_filters.py [--batch-size 1000]
+# Adds the normalized city / category_key and geocoded lat/lon metadata that
+# search filters and geo search use to vendors onboarded before they existed,
+# and rewrites city keys stored from a locality ("koramangala" -> bengaluru)
+# or from an unknown place (cleared, so they no longer act as filter keys).
+# Safe to re-run (e.g. after pointing GEO_GAZETTEER_PATH at a larger file).
+# Restart running servers afterwards so their in-memory indexes reload.
+
+def main():
+    parser = argparse.ArgumentParser(description="Backfill filter and geo metadata on existing vendors")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    collection = get_collection()
+    updated = backfill_filter_metadata(collection, batch_size=args.batch_size)
+    print(f"Done: {updated} of {collection.count()} vendors updated")
+
+
+if __name__ == "__main__":
+    main()
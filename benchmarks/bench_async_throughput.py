@@ -0,0 +1,126 @@
+"""
+Concurrent request throughput for one worker (one event loop).
+
+Drives the real FastAPI app in-process over httpx.ASGITransport with a local
+Chroma store. Gemini and Telegram are replaced by simulated endpoints with a
+fixed latency so the numbers only reflect how the request path uses the loop:
+
+- blocking: the LLM call blocks the event loop (what the old sync
+  TelegramService did inside the async webhook)
+- async:    the LLM call is awaited (client.aio), Chroma runs on the thread pool
+
+Usage: python -m benchmarks.bench_async_throughput [--requests 200] [--concurrency 50]
+"""
+import argparse
+import asyncio
+import hashlib
+import os
+import statistics
+import tempfile
+import time
+import types
+
+os.environ.setdefault("GOOGLE_API_KEY", "bench-dummy-key")
+os.environ.setdefault("CHROMA_DB_DIR", tempfile.mkdtemp(prefix="bench_chroma_"))
+
+import httpx
+
+import main
+from src.models import VendorOnboardRequest
+
+
+def fake_embed(texts):
+    # Deterministic local vectors; no network
+    return [[b / 255.0 for b in hashlib.sha256(t.lower().encode()).digest()[:16]] for t in texts]
+
+
+class SimulatedModels:
+    def __init__(self, latency: float, blocking: bool):
+        self.latency = latency
+        self.blocking = blocking
+
+    async def generate_content(self, model, contents, config=None):
+        if self.blocking:
+            time.sleep(self.latency)
+        else:
+            await asyncio.sleep(self.latency)
+        text = "search" if "Classify the intent" in contents else "Simulated summary."
+        return types.SimpleNamespace(text=text)
+
+
+class SimulatedGenAI:
+    def __init__(self, latency: float, blocking: bool):
+        self.aio = types.SimpleNamespace(models=SimulatedModels(latency, blocking))
+
+
+def telegram_update(i: int) -> dict:
+    return {
+        "update_id": i,
+        "message": {"chat": {"id": 1000 + i}, "from": {"first_name": "Bench"}, "text": f"find bakery {i % 5}"},
+    }
+
+
+async def run_mode(label: str, blocking: bool, args):
+    async with main.lifespan(main.app):
+        services = main.app.state.services
+        services.embedding_function._embed_remote = fake_embed
+        if services.embedding_function.batcher:
+            services.embedding_function.batcher.embed_fn = fake_embed
+
+        llm = SimulatedGenAI(args.llm_latency_ms / 1000.0, blocking)
+        services.vendor_service.client = llm
+        services.bot_core.client = llm
+        services.message_analyzer.client = llm
+        # Replies go out directly or through the send queue (TELEGRAM_SEND_QUEUE_ENABLED); mock both paths
+        telegram = httpx.AsyncClient(
+            transport=httpx.MockTransport(lambda request: httpx.Response(200, json={"ok": True}))
+        )
+        services.telegram_service.http_client = telegram
+        if services.telegram_service.outbound is not None:
+            services.telegram_service.outbound.transport.http_client = telegram
+        if services.collection.count() == 0:
+            for i in range(50):
+                services.vendor_service.onboard_vendor(
+                    VendorOnboardRequest(name=f"Bakery {i}", location="Bangalore", category="Bakery")
+                )
+
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            semaphore = asyncio.Semaphore(args.concurrency)
+            latencies = []
+
+            async def one(i: int):
+                async with semaphore:
+                    start = time.perf_counter()
+                    if i % 2:
+                        resp = await client.post("/v1/telegram/webhook", json=telegram_update(i))
+                    else:
+                        resp = await client.post("/v1/search", json={"query": f"bakery {i % 5}"})
+                    resp.raise_for_status()
+                    latencies.append((time.perf_counter() - start) * 1000)
+
+            start = time.perf_counter()
+            await asyncio.gather(*(one(i) for i in range(args.requests)))
+            elapsed = time.perf_counter() - start
+
+        latencies.sort()
+        p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+        print(f"{label:<9} throughput={args.requests / elapsed:8.1f} req/s  "
+              f"p50={statistics.median(latencies):8.1f} ms  p99={p99:8.1f} ms")
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Benchmark per-worker concurrent throughput")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--llm-latency-ms", type=float, default=100.0)
+    args = parser.parse_args()
+
+    print(f"{args.requests} requests (half /v1/search, half Telegram webhook), "
+          f"concurrency {args.concurrency}, simulated LLM latency {args.llm_latency_ms} ms\n")
+    asyncio.run(run_mode("blocking", True, args))
+    asyncio.run(run_mode("async", False, args))
+
+
+if __name__ == "__main__":
+    main_cli()
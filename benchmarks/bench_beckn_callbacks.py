@@ -0,0 +1,184 @@
+"""
+Beckn /on_search callback delivery against local stub BAP servers.
+
+Starts N stub buyer apps (uvicorn on free ports) and pushes callbacks through
+the CallbackDispatcher. Reports throughput and delivery latency, then checks:
+
+- every callback was delivered exactly once
+- with one connection per host, each BAP received its callbacks in send order
+- injected transient failures (503 on first attempt) were retried and delivered
+- a callback whose ttl runs out while it waits for the per-host semaphore
+  expires without being sent
+
+Any failed check is listed and the run exits with status 1, so it can gate CI.
+
+Usage: python -m benchmarks.bench_beckn_callbacks [--callbacks 2000] [--baps 4]
+"""
+import argparse
+import asyncio
+import socket
+import sys
+import threading
+import time
+
+import uvicorn
+from fastapi import FastAPI, Request, Response
+
+from src.services.callback_dispatcher import CallbackDispatcher
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class StubBAP:
+    def __init__(self, fail_every: int, latency_ms: float):
+        self.received = []
+        self.attempts = {}
+        self.fail_every = fail_every
+        self.latency = latency_ms / 1000.0
+        self.port = free_port()
+        self.app = FastAPI()
+        self.app.post("/on_search")(self.on_search)
+        self.server = uvicorn.Server(uvicorn.Config(self.app, host="127.0.0.1", port=self.port, log_level="error"))
+
+    async def on_search(self, request: Request):
+        body = await request.json()
+        seq = body["context"]["message_id"]
+        self.attempts[seq] = self.attempts.get(seq, 0) + 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        # Fail the first attempt of every Nth callback to exercise retries
+        if self.fails(seq) and self.attempts[seq] == 1:
+            return Response(status_code=503)
+        self.received.append(seq)
+        return {"message": {"ack": {"status": "ACK"}}}
+
+    def fails(self, seq: str) -> bool:
+        return bool(self.fail_every) and int(seq.split("-")[-1]) % self.fail_every == 0
+
+    def start(self):
+        threading.Thread(target=self.server.run, daemon=True).start()
+        while not self.server.started:
+            time.sleep(0.05)
+
+    def stop(self):
+        self.server.should_exit = True
+
+
+class Checks:
+    def __init__(self):
+        self.failures = []
+
+    def __call__(self, ok: bool, message: str):
+        if not ok:
+            self.failures.append(message)
+            print(f"  FAILED: {message}")
+
+
+def on_search_body(bap: int, seq: int) -> dict:
+    return {
+        "context": {"action": "on_search", "bap_id": f"bap-{bap}", "message_id": f"msg-{bap}-{seq}"},
+        "message": {"catalog": {"descriptor": {"name": "ONDC Setu Catalog"}, "providers": []}},
+    }
+
+
+async def run(label: str, baps, callbacks: int, concurrency: int, check_order: bool, check: Checks):
+    dispatcher = CallbackDispatcher(max_concurrency_per_host=concurrency, backoff_seconds=0.05)
+    for bap in baps:
+        bap.received.clear()
+        bap.attempts.clear()
+
+    start = time.perf_counter()
+    tasks = []
+    for seq in range(callbacks):
+        index = seq % len(baps)
+        url = f"http://127.0.0.1:{baps[index].port}/on_search"
+        tasks.append(asyncio.create_task(dispatcher.send(url, on_search_body(index, seq), ttl_seconds=30)))
+    results = await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - start
+
+    stats = dispatcher.stats()
+    latency = stats["delivery_latency"]
+    print(f"{label:<24} {callbacks / elapsed:8.1f} callbacks/s  p50={latency['p50_ms']:7.1f} ms  "
+          f"p99={latency['p99_ms']:7.1f} ms  retries={stats['retries']}")
+
+    delivered = [seq for bap in baps for seq in bap.received]
+    check(all(results), f"{label}: {results.count(False)} callbacks reported undelivered")
+    check(len(delivered) == len(set(delivered)), f"{label}: {len(delivered) - len(set(delivered))} duplicated callbacks")
+    check(len(set(delivered)) == callbacks, f"{label}: {callbacks - len(set(delivered))} lost callbacks")
+
+    for index, bap in enumerate(baps):
+        # Every injected 503 must have been retried once and then delivered
+        failed_first = {seq for seq in bap.attempts if bap.fails(seq)}
+        check(all(bap.attempts[seq] == 2 for seq in failed_first),
+              f"{label}: bap-{index} did not see exactly one retry after each 503")
+        check(failed_first <= set(bap.received), f"{label}: bap-{index} lost callbacks that got a 503")
+        if check_order:
+            # Retried callbacks legitimately arrive after their successors
+            retried = {seq for seq, n in bap.attempts.items() if n > 1}
+            in_order = [seq for seq in bap.received if seq not in retried]
+            expected = [f"msg-{index}-{seq}" for seq in range(index, callbacks, len(baps))
+                        if f"msg-{index}-{seq}" not in retried]
+            check(in_order == expected, f"{label}: bap-{index} received callbacks out of order")
+    check(stats["retries"] == sum(len([s for s in bap.attempts if bap.fails(s)]) for bap in baps),
+          f"{label}: retry count does not match the injected 503s")
+
+    await dispatcher.aclose()
+
+
+async def run_expiry(bap: "StubBAP", check: Checks):
+    """A short-ttl callback queued behind a slow one on a single-slot host must expire unsent."""
+    dispatcher = CallbackDispatcher(max_concurrency_per_host=1, backoff_seconds=0.05)
+    bap.received.clear()
+    bap.attempts.clear()
+    url = f"http://127.0.0.1:{bap.port}/on_search"
+    slow = asyncio.create_task(dispatcher.send(url, on_search_body(0, 1), ttl_seconds=10))
+    await asyncio.sleep(0.05)  # the slow callback holds the only slot
+    queued = await dispatcher.send(url, on_search_body(0, 3), ttl_seconds=bap.latency / 2)
+    delivered = await slow
+
+    print(f"{'ttl expiry while queued':<24} slow delivered={delivered}  queued delivered={queued}  "
+          f"expired={dispatcher.expired}")
+    check(delivered, "expiry: the slow callback was not delivered")
+    check(not queued and dispatcher.expired == 1, "expiry: the queued callback did not expire")
+    check("msg-0-3" not in bap.attempts, "expiry: the expired callback was still sent to the BAP")
+    await dispatcher.aclose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark Beckn callback delivery")
+    parser.add_argument("--callbacks", type=int, default=2000)
+    parser.add_argument("--baps", type=int, default=4)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--bap-latency-ms", type=float, default=5.0)
+    parser.add_argument("--fail-every", type=int, default=50)
+    args = parser.parse_args()
+
+    baps = [StubBAP(args.fail_every, args.bap_latency_ms) for _ in range(args.baps)]
+    slow_bap = StubBAP(0, 400.0)
+    for bap in (*baps, slow_bap):
+        bap.start()
+    print(f"{args.callbacks} callbacks to {args.baps} stub BAPs, "
+          f"{args.bap_latency_ms} ms BAP latency, 503 on every {args.fail_every}th first attempt\n")
+
+    check = Checks()
+    try:
+        asyncio.run(run("ordered (1 per host)", baps, args.callbacks // 4, 1, True, check))
+        asyncio.run(run(f"pooled ({args.concurrency} per host)", baps, args.callbacks, args.concurrency, False, check))
+        asyncio.run(run_expiry(slow_bap, check))
+    finally:
+        for bap in (*baps, slow_bap):
+            bap.stop()
+
+    if check.failures:
+        print(f"\n{len(check.failures)} check(s) failed")
+        sys.exit(1)
+    print("\nAll callbacks delivered exactly once, 503s retried, per-BAP ordering preserved, "
+          "queued callbacks past their ttl expired unsent.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+"""
+Compact index mode: truncated vectors in Chroma + int8 full vectors for re-ranking.
+
+Builds the same synthetic vendors into a full-size collection and into
+"@<dims>" compact collections, then runs the same queries through
+VendorService's vector path. Reports, per setup: HNSW index bytes per
+vendor (what Chroma keeps in RAM), re-rank store bytes per vendor (SQLite,
+on disk), recall@k against exact float32 search over the full vectors, and
+query latency.
+
+The embedder is synthetic (no model download needed): a bag of hashed word
+vectors whose per-dimension scale decays, so leading dimensions carry most
+of the signal the way they do in Matryoshka-trained models such as
+gemini-embedding-001. Absolute recall on real embeddings will differ; the
+gap between setups is the point.
+
+Usage: python -m benchmarks.bench_compact_index [--vendors 20000] [--dim 3072] [--dims 128,256,512]
+       [--k 10] [--queries 300] [--depth 50]
+"""
+import argparse
+import hashlib
+import os
+import random
+import tempfile
+import time
+
+os.environ.setdefault("GOOGLE_API_KEY", "bench-dummy-key")
+
+import chromadb
+import numpy as np
+
+from benchmarks.common import CATEGORIES, CITIES, percentile
+from src.config import get_settings
+from src.embedding_backends import CachedEmbeddingFunction
+from src.quantized_vectors import QuantizedVectorStore
+from src.services.bulk_onboarding import BulkCheckpointStore, BulkOnboarder
+from src.services.vendor_service import VendorService
+
+VOCABULARY = [f"w{i}" for i in range(3000)]
+
+
+class SpectralEmbedding(CachedEmbeddingFunction):
+    """Sum of per-word Gaussian vectors with a decaying per-dimension scale."""
+
+    def __init__(self, model_name: str, dim: int):
+        super().__init__(model_name)
+        self.dim = dim
+        self.scale = (1.0 + np.arange(dim, dtype=np.float32) / 8.0) ** -0.5
+        self.words = {}
+
+    def _word(self, word: str) -> np.ndarray:
+        vector = self.words.get(word)
+        if vector is None:
+            seed = int.from_bytes(hashlib.blake2b(word.encode(), digest_size=8).digest(), "little")
+            vector = np.random.default_rng(seed).standard_normal(self.dim).astype(np.float32) * self.scale
+            self.words[word] = vector
+        return vector
+
+    def _embed_uncached(self, texts):
+        out = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for word in text.lower().replace(".", " ").split():
+                out[row] += self._word(word)
+        return list(out / np.clip(np.linalg.norm(out, axis=1, keepdims=True), 1e-12, None))
+
+
+def synthetic_rows(n: int, rng: random.Random):
+    # Zipf-ish word frequencies, so some words are common and some rare
+    weights = [1.0 / (rank + 1) ** 0.8 for rank in range(len(VOCABULARY))]
+    for i in range(n):
+        words = rng.choices(VOCABULARY, weights, k=8)
+        category = rng.choice(CATEGORIES)
+        yield {
+            "name": f"{category} {words[0]} {words[1]}",
+            "location": rng.choice(CITIES),
+            "category": category,
+            "contact": f"+91{9000000000 + i}",
+            "raw_text": f"{category} shop selling {' '.join(words[2:])}",
+        }
+
+
+def directory_bytes(path: str, skip: str = "chroma.sqlite3") -> int:
+    total = 0
+    for root, _, files in os.walk(path):
+        total += sum(os.path.getsize(os.path.join(root, f)) for f in files if f != skip)
+    return total
+
+
+def build(workdir: str, name: str, ef, rows, store=None):
+    client = chromadb.PersistentClient(path=os.path.join(workdir, name))
+    collection = client.get_or_create_collection(name, embedding_function=ef, metadata={"hnsw:space": "cosine"})
+    onboarder = BulkOnboarder(collection, ef, BulkCheckpointStore(os.path.join(workdir, f"{name}-jobs.sqlite3")),
+                              quantized_vectors=store, stable_ids=False)
+    started = time.perf_counter()
+    onboarder.run(iter(rows), job_id="bench")  # same job -> same vendor IDs in every build
+    onboarder.close()
+    return client, collection, time.perf_counter() - started
+
+
+def measure(service: VendorService, queries, truth, k: int):
+    latencies, hits = [], 0
+    for query, expected in zip(queries, truth):
+        started = time.perf_counter()
+        rows = service._vector_rows(query, k, None, None)
+        latencies.append((time.perf_counter() - started) * 1000)
+        hits += len({meta["id"] for _, meta, _, _ in rows} & expected)
+    return hits / (len(queries) * k), latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the compact (truncated + int8 re-rank) vector index")
+    parser.add_argument("--vendors", type=int, default=20000)
+    parser.add_argument("--dim", type=int, default=3072, help="full embedding size (gemini-embedding-001: 3072)")
+    parser.add_argument("--dims", default="128,256,512", help="truncated sizes to compare")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=300)
+    parser.add_argument("--depth", type=int, default=50, help="VECTOR_RERANK_DEPTH")
+    args = parser.parse_args()
+
+    settings = get_settings()
+    settings.VECTOR_RERANK_DEPTH = args.depth
+    rng = random.Random(7)
+    rows = list(synthetic_rows(args.vendors, rng))
+    workdir = tempfile.mkdtemp(prefix="bench_compact_")
+
+    # Queries: a few words from a random vendor's text, plus its category
+    queries = []
+    for _ in range(args.queries):
+        row = rng.choice(rows)
+        words = row["raw_text"].split()[3:]
+        queries.append(f"{row['category']} {' '.join(rng.sample(words, 3))}")
+
+    full_ef = SpectralEmbedding("bench/spectral", args.dim)
+    client, full, seconds = build(workdir, "full", full_ef, rows)
+    print(f"{args.vendors} vendors, {args.dim} dims: full collection built in {seconds:.1f} s")
+
+    # Exact float32 top-k over the full vectors
+    stored = full.get(include=["embeddings", "metadatas"])
+    matrix = np.asarray(stored["embeddings"], dtype=np.float32)
+    ids = [meta["id"] for meta in stored["metadatas"]]
+    truth = []
+    for vector in full_ef.embed_full(queries):
+        top = np.argsort(-(matrix @ np.asarray(vector, dtype=np.float32)))[:args.k]
+        truth.append({ids[i] for i in top})
+    del matrix, stored
+
+    def report(label, collection_dir, store_bytes, service):
+        recall, latencies = measure(service, queries, truth, args.k)
+        index_bytes = directory_bytes(os.path.join(workdir, collection_dir))
+        print(f"{label:34s} index {index_bytes / args.vendors:7.0f} B/vendor | store {store_bytes / args.vendors:6.0f} "
+              f"B/vendor | recall@{args.k} {recall:6.1%} | p50 {percentile(latencies, 0.5):6.2f} ms "
+              f"p99 {percentile(latencies, 0.99):6.2f} ms")
+        service.close()
+
+    print()
+    report(f"full float32 ({args.dim})", "full", 0,
+           VendorService(collection=full, client=object(), embedding_function=full_ef, summary_cache=None))
+
+    for dims in (int(d) for d in args.dims.split(",")):
+        ef = SpectralEmbedding(f"bench/spectral@{dims}", args.dim)
+        store_path = os.path.join(workdir, f"quantized-{dims}.sqlite3")
+        store = QuantizedVectorStore(store_path)
+        _, compact, seconds = build(workdir, f"compact-{dims}", ef, rows, store)
+        store_bytes = sum(os.path.getsize(path) for path in (store_path, store_path + "-wal") if os.path.exists(path))
+        report(f"@{dims} truncated only", f"compact-{dims}", 0,
+               VendorService(collection=compact, client=object(), embedding_function=ef, summary_cache=None))
+        report(f"@{dims} + int8 re-rank (depth {args.depth})", f"compact-{dims}", store_bytes,
+               VendorService(collection=compact, client=object(), embedding_function=ef, summary_cache=None,
+                             quantized_vectors=store))
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
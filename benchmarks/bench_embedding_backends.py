@@ -0,0 +1,84 @@
+"""
+Embedding backend latency: local ONNX model vs the Gemini API.
+
+For each backend, measures cold start (model load / first call), single-query
+latency (the search path; embedding cache disabled) and batch throughput for
+onboarding-sized batches. The ONNX backend is run at several thread counts.
+Gemini runs only when GOOGLE_API_KEY is a real key.
+
+Usage: python -m benchmarks.bench_embedding_backends [--model onnx/all-MiniLM-L6-v2] [--model-dir DIR]
+       [--threads 1,2,4,0] [--queries 100] [--batch 256]
+"""
+import argparse
+import os
+import time
+
+os.environ.setdefault("GOOGLE_API_KEY", "bench-dummy-key")
+
+from benchmarks.common import CATEGORIES, CITIES, percentile, synthetic_vendor
+from src.embedding_backends import EmbeddingError, GoogleGenAIEmbeddingFunction, OnnxEmbeddingFunction
+from src.services.vendor_service import build_document
+from src.services.bulk_onboarding import row_to_request
+
+
+def measure(ef, queries, documents, batch: int):
+    start = time.perf_counter()
+    ef.warm_up()
+    ef([queries[0]])
+    cold = (time.perf_counter() - start) * 1000
+
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        ef([query])
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    for i in range(0, len(documents), batch):
+        ef(documents[i:i + batch])
+    rate = len(documents) / (time.perf_counter() - start)
+    return cold, latencies, rate
+
+
+def report(name, cold, latencies, rate):
+    print(f"{name:28s} cold {cold:8.1f} ms | query p50 {percentile(latencies, 0.5):7.2f} ms "
+          f"p99 {percentile(latencies, 0.99):7.2f} ms | {rate:8.0f} docs/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark local vs remote embedding backends")
+    parser.add_argument("--model", default="onnx/all-MiniLM-L6-v2")
+    parser.add_argument("--model-dir", default="")
+    parser.add_argument("--threads", default="1,2,4,0", help="ONNX intra-op thread counts (0 = one per core)")
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--documents", type=int, default=2000)
+    parser.add_argument("--batch", type=int, default=256)
+    args = parser.parse_args()
+
+    queries = [f"{CATEGORIES[i % len(CATEGORIES)].lower()} near {CITIES[i % len(CITIES)]} #{i}"
+               for i in range(args.queries)]
+    documents = [build_document(row_to_request(synthetic_vendor(i))) for i in range(args.documents)]
+
+    for threads in (int(t) for t in args.threads.split(",")):
+        ef = OnnxEmbeddingFunction(args.model, model_dir=args.model_dir, threads=threads)
+        try:
+            report(f"{args.model} threads={threads}", *measure(ef, queries, documents, args.batch))
+        except EmbeddingError as e:
+            print(f"{args.model}: skipped ({e})")
+            break
+        finally:
+            ef.close()
+
+    if os.environ["GOOGLE_API_KEY"] == "bench-dummy-key":
+        print("models/gemini-embedding-001: skipped (set GOOGLE_API_KEY to compare)")
+        return
+    ef = GoogleGenAIEmbeddingFunction(os.environ["GOOGLE_API_KEY"], "models/gemini-embedding-001")
+    try:
+        # Gemini caps a request at 100 texts
+        report("models/gemini-embedding-001", *measure(ef, queries[:20], documents[:500], min(args.batch, 100)))
+    finally:
+        ef.close()
+
+
+if __name__ == "__main__":
+    main()
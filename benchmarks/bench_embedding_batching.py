@@ -0,0 +1,87 @@
+"""
+Embedding calls and caller latency under burst load, with and without the
+EmbeddingBatcher in front of the remote embed_content call.
+
+The remote API is simulated: each call costs a fixed round-trip plus a small
+per-text cost, which is roughly how embed_content behaves.
+
+Usage: python -m benchmarks.bench_embedding_batching [--callers 200] [--rtt-ms 80]
+"""
+import argparse
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from src.embedding_batcher import EmbeddingBatcher
+
+
+class SimulatedEmbeddingAPI:
+    def __init__(self, rtt_ms: float, per_text_ms: float, max_in_flight: int):
+        self.rtt = rtt_ms / 1000.0
+        self.per_text = per_text_ms / 1000.0
+        # Client-side connection limit, like a real HTTP pool
+        self._slots = threading.Semaphore(max_in_flight)
+        self._lock = threading.Lock()
+        self.calls = 0
+
+    def embed(self, texts):
+        with self._slots:
+            with self._lock:
+                self.calls += 1
+            time.sleep(self.rtt + self.per_text * len(texts))
+            return [[float(len(t)), 0.0, 1.0] for t in texts]
+
+
+def run(label: str, embed, api: SimulatedEmbeddingAPI, callers: int, concurrency: int):
+    latencies = []
+    lock = threading.Lock()
+
+    def one_request(i: int):
+        start = time.perf_counter()
+        embed([f"vendor query {i}"])
+        with lock:
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one_request, range(callers)))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    print(f"{label:<12} remote calls={api.calls:5d}  calls/s={api.calls / elapsed:8.1f}  "
+          f"p50={statistics.median(latencies):7.1f} ms  p99={p99:7.1f} ms  wall={elapsed:6.2f} s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark embedding micro-batching")
+    parser.add_argument("--callers", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--rtt-ms", type=float, default=80.0)
+    parser.add_argument("--per-text-ms", type=float, default=0.5)
+    parser.add_argument("--max-in-flight", type=int, default=4)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--wait-ms", type=float, default=10.0)
+    args = parser.parse_args()
+
+    print(f"{args.callers} callers, {args.concurrency} concurrent, "
+          f"simulated RTT {args.rtt_ms} ms, {args.max_in_flight} connections\n")
+
+    api = SimulatedEmbeddingAPI(args.rtt_ms, args.per_text_ms, args.max_in_flight)
+    run("unbatched", api.embed, api, args.callers, args.concurrency)
+
+    api = SimulatedEmbeddingAPI(args.rtt_ms, args.per_text_ms, args.max_in_flight)
+    batcher = EmbeddingBatcher(
+        api.embed,
+        max_batch_size=args.batch_size,
+        max_wait_ms=args.wait_ms,
+        max_concurrent_batches=args.max_in_flight
+    )
+    run("batched", batcher.embed, api, args.callers, args.concurrency)
+    print(f"\nBatcher stats: {batcher.stats()}")
+    batcher.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Vendor search with and without location/category filters.
+
+Onboards N synthetic vendors (8 cities x 8 categories) into a local Chroma
+store through the bulk pipeline, then runs the same queries unfiltered and
+with `location` + `category` filters (Chroma where clauses). Reports query
+latency and how many of the top-k results actually match the requested
+city and category, for two query shapes:
+
+- text names the city ("plumber in pune"): embeddings already find the
+  right vendors, so the filter only adds latency;
+- text names the product only ("plumber") and the city comes separately,
+  as with Beckn's fulfillment city or a bot user's saved location: only
+  the filter can keep other cities out of the results.
+
+Filters are a precision feature. Chroma resolves the where clause in its
+SQLite metadata store before the HNSW scan, so they do not make a query
+faster at any size measured here.
+
+Usage: python -m benchmarks.bench_filtered_search [--vendors 50000] [--queries 200] [--limit 5]
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+os.environ.setdefault("GOOGLE_API_KEY", "bench-dummy-key")
+
+import chromadb
+
+from benchmarks.common import CATEGORIES, CITIES, HashEmbeddingFunction, percentile, synthetic_vendor
+from src.models import VendorSearchRequest
+from src.services.bulk_onboarding import BulkCheckpointStore, BulkOnboarder
+from src.services.vendor_service import VendorService
+from src.vendor_filters import normalize_category, normalize_city
+
+
+def run_queries(service: VendorService, queries, filtered: bool, city_in_text: bool = True):
+    latencies, hits, total = [], 0, 0
+    for city, category in queries:
+        text = f"{category.lower()} in {city}" if city_in_text else category.lower()
+        request = VendorSearchRequest(
+            query=text, limit=service.limit, summary="none",
+            location=city if filtered else None, category=category if filtered else None
+        )
+        start = time.perf_counter()
+        vendors, _ = service._retrieve(request)
+        latencies.append((time.perf_counter() - start) * 1000)
+        for v in vendors:
+            total += 1
+            hits += normalize_city(v.location) == normalize_city(city) and normalize_category(v.category) == normalize_category(category)
+    return latencies, hits / total if total else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark metadata-filtered vendor search")
+    parser.add_argument("--vendors", type=int, default=50000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--limit", type=int, default=5)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench_filters_")
+    client = chromadb.PersistentClient(path=os.path.join(workdir, "chroma"))
+    ef = HashEmbeddingFunction()
+    collection = client.get_or_create_collection("vendors", embedding_function=ef)
+    onboarder = BulkOnboarder(collection, ef, BulkCheckpointStore(os.path.join(workdir, "jobs.sqlite3")))
+    result = onboarder.run((synthetic_vendor(i) for i in range(args.vendors)), job_id="bench")
+    print(f"{collection.count()} vendors onboarded ({result['rows_per_second']} rows/s)\n")
+
+    service = VendorService(collection=collection, client=object(), embedding_function=ef, summary_cache=None)
+    service.limit = args.limit
+    rng = random.Random(3)
+    queries = [(rng.choice(CITIES), rng.choice(CATEGORIES)) for _ in range(args.queries)]
+    run_queries(service, queries[:10], filtered=True)  # warm up both paths
+    run_queries(service, queries[:10], filtered=False)
+
+    for shape, city_in_text in (("city in query text", True), ("city from the request only", False)):
+        print(shape)
+        for name, filtered in (("unfiltered", False), ("filtered", True)):
+            latencies, precision = run_queries(service, queries, filtered, city_in_text)
+            print(f"  {name:10s}: p50={percentile(latencies, 0.5):7.2f} ms  "
+                  f"p99={percentile(latencies, 0.99):7.2f} ms  "
+                  f"top-{args.limit} matching city+category: {precision:.0%}")
+
+    service.close()
+    onboarder.close()
+
+
+if __name__ == "__main__":
+    main()
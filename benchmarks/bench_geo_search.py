@@ -0,0 +1,142 @@
+"""
+Geo-filtered vendor search.
+
+1. GeoIndex at scale (default 1M vendors scattered around the gazetteer's
+   localities): build time, then radius (2/5/25 km) and nearest-k query
+   latency against a brute-force haversine scan over every vendor, checking
+   that both return the same vendors.
+2. End to end through VendorService on a local Chroma store (default 20k
+   vendors onboarded at gazetteer localities): "electrician near <locality>"
+   with a 5 km radius vs the plain semantic query, reporting latency and how
+   many results are actually within the radius.
+
+Usage: python -m benchmarks.bench_geo_search [--vendors 1000000] [--chroma-vendors 20000]
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+os.environ.setdefault("GOOGLE_API_KEY", "bench-dummy-key")
+
+import chromadb
+import numpy as np
+
+from benchmarks.common import CATEGORIES, HashEmbeddingFunction, percentile
+from src.config import get_settings
+from src.dependencies import get_gazetteer
+from src.geo import GeoIndex, haversine_km
+from src.models import VendorSearchRequest
+from src.services.bulk_onboarding import BulkCheckpointStore, BulkOnboarder
+from src.services.vendor_service import VendorService
+
+
+def gazetteer_places():
+    gazetteer = get_gazetteer()
+    return [p for places in gazetteer._localities.values() for p in places] + list(gazetteer._cities.values())
+
+
+def bench_index(args, places):
+    rng = np.random.default_rng(11)
+    centres = rng.integers(0, len(places), args.vendors)
+    # Vendors spread ~3 km around a locality or city centre
+    lats = np.array([places[i].lat for i in centres]) + rng.normal(0, 0.03, args.vendors)
+    lons = np.array([places[i].lon for i in centres]) + rng.normal(0, 0.03, args.vendors)
+    ids = [f"v{i}" for i in range(args.vendors)]
+
+    index = GeoIndex(cell_degrees=args.cell_degrees)
+    start = time.perf_counter()
+    index.add_many(zip(ids, lats.tolist(), lons.tolist()))
+    print(f"GeoIndex: {len(index)} vendors in {index.stats()['cells']} cells, built in {time.perf_counter() - start:.1f} s")
+
+    prng = random.Random(5)
+    probes = [prng.choice(places) for _ in range(args.queries)]
+    for radius in (2.0, 5.0, 25.0):
+        indexed, brute, sizes = [], [], []
+        for place in probes:
+            start = time.perf_counter()
+            found = index.within(place.lat, place.lon, radius)
+            indexed.append((time.perf_counter() - start) * 1000)
+
+            start = time.perf_counter()
+            km = haversine_km(place.lat, place.lon, lats, lons)
+            expected = np.flatnonzero(km <= radius)
+            expected = expected[np.argsort(km[expected])]  # same output: sorted (id, km) pairs
+            brute_found = [(ids[i], float(km[i])) for i in expected]
+            brute.append((time.perf_counter() - start) * 1000)
+            assert {vendor_id for vendor_id, _ in found} == {vendor_id for vendor_id, _ in brute_found}, \
+                "index and brute force disagree"
+            sizes.append(len(found))
+        print(f"radius {radius:4.0f} km: index p50={percentile(indexed, 0.5):7.2f} ms p99={percentile(indexed, 0.99):7.2f} ms | "
+              f"brute force p50={percentile(brute, 0.5):7.2f} ms | avg {sum(sizes) / len(sizes):8.0f} vendors in range")
+
+    indexed = []
+    for place in probes:
+        start = time.perf_counter()
+        found = index.nearest(place.lat, place.lon, args.k)
+        indexed.append((time.perf_counter() - start) * 1000)
+        km = haversine_km(place.lat, place.lon, lats, lons)
+        kth = np.partition(km, args.k - 1)[args.k - 1]
+        assert len(found) == args.k and abs(found[-1][1] - kth) < 1e-6, "nearest-k disagrees with brute force"
+    print(f"nearest {args.k}: index p50={percentile(indexed, 0.5):7.2f} ms p99={percentile(indexed, 0.99):7.2f} ms")
+
+
+def bench_end_to_end(args, places):
+    localities = [p for p in places if p.kind == "locality"]
+    rng = random.Random(9)
+    rows = []
+    for i in range(args.chroma_vendors):
+        place, category = rng.choice(localities), rng.choice(CATEGORIES)
+        rows.append({"name": f"{category} House {i}", "location": f"{place.name}, {place.city.title()}",
+                     "category": category, "contact": f"+91{9000000000 + i}"})
+
+    workdir = tempfile.mkdtemp(prefix="bench_geo_")
+    client = chromadb.PersistentClient(path=os.path.join(workdir, "chroma"))
+    ef = HashEmbeddingFunction()
+    collection = client.get_or_create_collection("vendors", embedding_function=ef)
+    index = GeoIndex()
+    onboarder = BulkOnboarder(collection, ef, BulkCheckpointStore(os.path.join(workdir, "jobs.sqlite3")), geo_index=index)
+    onboarder.run(rows, job_id="bench")
+    service = VendorService(collection=collection, client=object(), embedding_function=ef, summary_cache=None,
+                            geo_index=index)
+    print(f"\nVendorService: {collection.count()} vendors in Chroma, {len(index)} geo-indexed")
+
+    probes = [(rng.choice(localities), rng.choice(CATEGORIES)) for _ in range(args.queries)]
+    for name, geo in (("semantic only", False), ("near, 5 km", True)):
+        latencies, inside, total = [], 0, 0
+        for place, category in probes:
+            request = VendorSearchRequest(query=f"{category.lower()} near {place.name}", limit=5, summary="none")
+            if geo:
+                request.query, request.near, request.radius_km = category.lower(), place.name, 5.0
+            start = time.perf_counter()
+            vendors, _ = service._retrieve(request)
+            latencies.append((time.perf_counter() - start) * 1000)
+            for v in vendors:
+                total += 1
+                located = get_gazetteer().geocode(v.location)
+                inside += float(haversine_km(place.lat, place.lon, located.lat, located.lon)) <= 5.0
+        print(f"{name:14s}: p50={percentile(latencies, 0.5):7.2f} ms p99={percentile(latencies, 0.99):7.2f} ms  "
+              f"results within 5 km: {inside / total if total else 0:.0%}")
+    service.close()
+    onboarder.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark geo-filtered vendor search")
+    parser.add_argument("--vendors", type=int, default=1_000_000)
+    parser.add_argument("--chroma-vendors", type=int, default=20000, help="0 skips the end-to-end part")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=50)
+    parser.add_argument("--cell-degrees", type=float, default=0.05)
+    args = parser.parse_args()
+
+    get_settings().GEO_ENABLED = True  # opt-in; onboarding geocodes through the same gazetteer
+    places = gazetteer_places()
+    bench_index(args, places)
+    if args.chroma_vendors:
+        bench_end_to_end(args, places)
+
+
+if __name__ == "__main__":
+    main()
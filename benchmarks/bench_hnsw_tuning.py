@@ -0,0 +1,226 @@
+"""
+HNSW tuning: build time, query latency, recall and memory per index setting.
+
+Generates a deterministic synthetic vendor corpus per size (each vendor's
+vector is the normalized sum of word vectors for its category, city and a
+few Zipf-distributed product words, so vendors cluster the way real
+profiles do), computes exact top-k by brute force, then builds one Chroma
+collection per (M, ef_construction) with the VECTOR_INDEX_* settings and
+queries it at each ef_search. Builds and query runs each get a fresh
+process, so RSS (anonymous memory: the HNSW graph, vectors and Chroma's
+caches) is their own: "RSS MB" is the growth while building, "serve MB"
+that of a process which loaded the index and answered the queries.
+
+Usage: python -m benchmarks.bench_hnsw_tuning [--sizes 10000,100000,1000000] [--dim 384] [--space cosine]
+       [--m 16,32] [--ef-construction 100,200] [--ef-search 10,50,100,200] [--queries 200] [--k 10]
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+os.environ.setdefault("GOOGLE_API_KEY", "bench-dummy-key")
+
+import numpy as np
+
+from benchmarks.common import CATEGORIES, CITIES, percentile
+
+VOCABULARY_SIZE = 5000
+WORDS_PER_VENDOR = 6
+
+
+def word_table(dim: int, seed: int = 11) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    return rng.standard_normal((len(CATEGORIES) + len(CITIES) + VOCABULARY_SIZE, dim)).astype(np.float32)
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    return vectors / np.clip(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12, None)
+
+
+def vendor_words(start: int, count: int, seed: int = 5) -> np.ndarray:
+    """Word ids per vendor: category, city, then product words (deterministic per vendor range)."""
+    rng = np.random.default_rng([seed, start])
+    categories = rng.integers(0, len(CATEGORIES), count)
+    cities = len(CATEGORIES) + rng.integers(0, len(CITIES), count)
+    # Zipf-ish: low word ids are common, high ones rare
+    products = len(CATEGORIES) + len(CITIES) + np.minimum(
+        rng.zipf(1.3, (count, WORDS_PER_VENDOR)) - 1, VOCABULARY_SIZE - 1
+    )
+    return np.column_stack([categories, cities, products])
+
+
+def write_corpus(path: str, n: int, table: np.ndarray, chunk: int = 100000) -> np.ndarray:
+    corpus = np.lib.format.open_memmap(path, mode="w+", dtype=np.float32, shape=(n, table.shape[1]))
+    for start in range(0, n, chunk):
+        count = min(chunk, n - start)
+        corpus[start:start + count] = _normalize(table[vendor_words(start, count)].sum(axis=1))
+    corpus.flush()
+    return corpus
+
+
+def make_queries(corpus_size: int, count: int, table: np.ndarray, seed: int = 3) -> np.ndarray:
+    """Category plus three product words of a random vendor, like "plumber tap washer pipe"."""
+    rng = np.random.default_rng(seed)
+    queries = []
+    for vendor in rng.integers(0, corpus_size, count):
+        words = vendor_words(int(vendor), 1)[0]
+        picked = [words[0], *rng.choice(words[2:], 3, replace=False)]
+        queries.append(table[picked].sum(axis=0))
+    return _normalize(np.asarray(queries, dtype=np.float32))
+
+
+def exact_top_k(corpus: np.ndarray, queries: np.ndarray, k: int, chunk: int = 100000) -> np.ndarray:
+    best_scores = np.full((len(queries), k), -np.inf, dtype=np.float32)
+    best_ids = np.zeros((len(queries), k), dtype=np.int64)
+    for start in range(0, len(corpus), chunk):
+        block = queries @ np.asarray(corpus[start:start + chunk]).T
+        block_ids = np.broadcast_to(np.arange(start, start + block.shape[1]), block.shape)
+        scores = np.concatenate([best_scores, block], axis=1)
+        ids = np.concatenate([best_ids, block_ids], axis=1)
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        best_scores = np.take_along_axis(scores, top, axis=1)
+        best_ids = np.take_along_axis(ids, top, axis=1)
+    return best_ids
+
+
+def rss_anon_mb() -> float:
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("RssAnon:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run_build(corpus_path: str, space: str, m: int, ef_construction: int, workdir: str) -> dict:
+    """Builds the collection with the VECTOR_INDEX_* settings; runs in a child process."""
+    import chromadb
+
+    from src.config import get_settings
+    from src.dependencies import hnsw_configuration
+
+    settings = get_settings()
+    settings.VECTOR_INDEX_SPACE = space
+    settings.VECTOR_INDEX_M = m
+    settings.VECTOR_INDEX_EF_CONSTRUCTION = ef_construction
+    corpus = np.load(corpus_path, mmap_mode="r")
+    client = chromadb.PersistentClient(path=workdir)
+    baseline = rss_anon_mb()
+
+    collection = client.create_collection("bench_hnsw", configuration=hnsw_configuration(), embedding_function=None)
+    batch = client.get_max_batch_size()
+    started = time.perf_counter()
+    for start in range(0, len(corpus), batch):
+        end = min(start + batch, len(corpus))
+        words = vendor_words(start, end - start)
+        collection.add(
+            ids=[f"v{i}" for i in range(start, end)],
+            embeddings=np.asarray(corpus[start:end]),
+            metadatas=[
+                {"category_key": CATEGORIES[row[0]].lower(), "city": CITIES[row[1] - len(CATEGORIES)].lower()}
+                for row in words
+            ]
+        )
+    return {"build_seconds": time.perf_counter() - started, "build_rss_mb": rss_anon_mb() - baseline}
+
+
+def run_queries(workdir: str, queries: np.ndarray, truth: np.ndarray, ef_search: int, k: int) -> dict:
+    """
+    Opens the built collection the way a server does (apply_index_settings
+    before the first query) and times the queries; runs in a child process,
+    since a loaded index keeps the ef_search it was loaded with.
+    """
+    import chromadb
+
+    from src.config import get_settings
+    from src.dependencies import apply_index_settings
+
+    baseline = rss_anon_mb()
+    collection = chromadb.PersistentClient(path=workdir).get_collection("bench_hnsw")
+    hnsw = collection.configuration["hnsw"]
+    settings = get_settings()
+    # Build-time settings as built, so only ef_search changes
+    settings.VECTOR_INDEX_SPACE = hnsw["space"]
+    settings.VECTOR_INDEX_M = hnsw["max_neighbors"]
+    settings.VECTOR_INDEX_EF_CONSTRUCTION = hnsw["ef_construction"]
+    settings.VECTOR_INDEX_EF_SEARCH = ef_search
+    apply_index_settings(collection)
+
+    started = time.perf_counter()
+    collection.query(query_embeddings=queries[:1], n_results=k, include=[])
+    load_ms = (time.perf_counter() - started) * 1000
+    latencies, hits = [], 0
+    for query, want in zip(queries, truth):
+        began = time.perf_counter()
+        found = collection.query(query_embeddings=query[None, :], n_results=k, include=[])["ids"][0]
+        latencies.append((time.perf_counter() - began) * 1000)
+        hits += len({f"v{i}" for i in want}.intersection(found))
+    return {
+        "ef_search": ef_search,
+        "recall": hits / (len(queries) * k),
+        "p50": percentile(latencies, 0.5),
+        "p99": percentile(latencies, 0.99),
+        "load_ms": load_ms,
+        "serve_rss_mb": rss_anon_mb() - baseline,
+    }
+
+
+def in_child(fn, *args):
+    with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn")) as pool:
+        return pool.submit(fn, *args).result()
+
+
+def _ints(value: str):
+    return [int(v) for v in value.split(",") if v]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark HNSW index settings (VECTOR_INDEX_*)")
+    parser.add_argument("--sizes", default="10000,100000,1000000")
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--space", default="cosine", choices=["l2", "cosine", "ip"])
+    parser.add_argument("--m", default="16,32", help="VECTOR_INDEX_M values")
+    parser.add_argument("--ef-construction", default="100,200", help="VECTOR_INDEX_EF_CONSTRUCTION values")
+    parser.add_argument("--ef-search", default="10,50,100,200", help="VECTOR_INDEX_EF_SEARCH values")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    args = parser.parse_args()
+
+    table = word_table(args.dim)
+    workdir = tempfile.mkdtemp(prefix="bench_hnsw_")
+    print(f"{'vectors':>9} {'M':>3} {'ef_c':>5} {'build s':>8} {'vec/s':>7} {'RSS MB':>7} | {'ef_s':>5} "
+          f"{'recall@' + str(args.k):>9} {'p50 ms':>7} {'p99 ms':>7} {'load ms':>8} {'serve MB':>8}")
+    try:
+        for size in _ints(args.sizes):
+            corpus_path = os.path.join(workdir, f"corpus-{size}.npy")
+            corpus = write_corpus(corpus_path, size, table)
+            queries = make_queries(size, args.queries, table)
+            truth = exact_top_k(corpus, queries, args.k)
+            del corpus
+            for m in _ints(args.m):
+                for ef_construction in _ints(args.ef_construction):
+                    build_dir = os.path.join(workdir, f"chroma-{size}-{m}-{ef_construction}")
+                    build = in_child(run_build, corpus_path, args.space, m, ef_construction, build_dir)
+                    head = (f"{size:>9} {m:>3} {ef_construction:>5} {build['build_seconds']:>8.1f} "
+                            f"{size / build['build_seconds']:>7.0f} {build['build_rss_mb']:>7.0f}")
+                    for ef_search in _ints(args.ef_search):
+                        result = in_child(run_queries, build_dir, queries, truth, ef_search, args.k)
+                        print(f"{head} | {ef_search:>5} {result['recall']:>9.1%} {result['p50']:>7.2f} "
+                              f"{result['p99']:>7.2f} {result['load_ms']:>8.0f} {result['serve_rss_mb']:>8.0f}",
+                              flush=True)
+                        head = " " * len(head)
+                    shutil.rmtree(build_dir, ignore_errors=True)
+            os.remove(corpus_path)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+"""
+Vector vs hybrid (vector + BM25, reciprocal-rank fusion) vs lexical-only search.
+
+Onboards N synthetic vendors, each stocking two brands, into a local Chroma
+store and the SQLite FTS5 lexical index through the bulk pipeline, then runs
+three query sets in every mode:
+
+- phone:    a vendor's 10-digit number, or its first 6 digits ("900001...");
+            hit if a vendor with that number / prefix is in the top-k
+- brand:    "<brand> <category> in <city>"; precision of top-k carrying the brand
+            in that category and city
+- semantic: "<category> in <city>"; precision of top-k matching category and city
+
+Reports hit rate / precision, p50/p99 latency and embedding calls per query.
+A last run makes the embedder raise to show hybrid degrading to lexical.
+
+Usage: python -m benchmarks.bench_hybrid_search [--vendors 20000] [--queries 200] [--limit 5]
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+os.environ.setdefault("GOOGLE_API_KEY", "bench-dummy-key")
+
+import chromadb
+
+from benchmarks.common import CATEGORIES, CITIES, HashEmbeddingFunction, percentile, synthetic_vendor
+from src.lexical_index import LexicalIndex
+from src.models import VendorSearchRequest
+from src.services.bulk_onboarding import BulkCheckpointStore, BulkOnboarder
+from src.services.vendor_service import VendorService
+
+BRANDS = ["Amul", "Britannia", "Haldiram", "Parle", "Havells", "Dabur", "Patanjali", "Bajaj", "Philips", "Godrej",
+          "Cipla", "Raymond", "Nestle", "Tata", "Anchor", "Syska"]
+
+
+class CountingEmbeddingFunction(HashEmbeddingFunction):
+    def __init__(self, dim: int = 256):
+        super().__init__(dim)
+        self.calls = 0
+        self.down = False
+
+    def __call__(self, input):
+        if self.down:
+            raise RuntimeError("embedding API unavailable")
+        self.calls += 1
+        return super().__call__(input)
+
+
+def vendor_rows(count: int):
+    rows = []
+    for i in range(count):
+        row = synthetic_vendor(i)
+        row["brands"] = ", ".join(random.Random(i * 7 + 1).sample(BRANDS, 2))
+        rows.append(row)
+    return rows
+
+
+def query_sets(rows, count: int, rng: random.Random):
+    phone = []
+    for _ in range(count):
+        row = rng.choice(rows)
+        digits = row["contact"][-10:]
+        phone.append(digits if rng.random() < 0.5 else digits[:6])
+    brand = [(rng.choice(BRANDS), rng.choice(CATEGORIES), rng.choice(CITIES)) for _ in range(count)]
+    semantic = [(rng.choice(CATEGORIES), rng.choice(CITIES)) for _ in range(count)]
+    return phone, brand, semantic
+
+
+def run(service, ef, mode: str, queries, limit: int):
+    by_id = service._bench_rows
+    results = {}
+    for name, items in queries.items():
+        latencies, score, total = [], 0.0, 0
+        calls = ef.calls
+        for item in items:
+            if name == "phone":
+                text = item
+            elif name == "brand":
+                text = f"{item[0]} {item[1].lower()} in {item[2]}"
+            else:
+                text = f"{item[0].lower()} in {item[1]}"
+            request = VendorSearchRequest(query=text, limit=limit, summary="none", mode=mode)
+            start = time.perf_counter()
+            vendors, _ = service._retrieve(request)
+            latencies.append((time.perf_counter() - start) * 1000)
+            if name == "phone":
+                # A 6-digit prefix matches up to 10,000 numbers; any of them is a hit
+                score += any(by_id[v.id]["contact"][-10:].startswith(text) for v in vendors)
+                total += 1
+                continue
+            for v in vendors:
+                row = by_id[v.id]
+                total += 1
+                if name == "brand":
+                    score += item[0] in row["brands"] and row["category"] == item[1] and row["location"] == item[2]
+                else:
+                    score += row["category"] == item[0] and row["location"] == item[1]
+        results[name] = (score / total if total else 0.0, latencies, (ef.calls - calls) / len(items))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark vector / hybrid / lexical vendor search")
+    parser.add_argument("--vendors", type=int, default=20000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--limit", type=int, default=5)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench_hybrid_")
+    client = chromadb.PersistentClient(path=os.path.join(workdir, "chroma"))
+    ef = CountingEmbeddingFunction()
+    collection = client.get_or_create_collection("vendors", embedding_function=ef)
+    lexical = LexicalIndex(os.path.join(workdir, "lexical.sqlite3"))
+    onboarder = BulkOnboarder(collection, ef, BulkCheckpointStore(os.path.join(workdir, "jobs.sqlite3")),
+                              lexical_index=lexical)
+    rows = vendor_rows(args.vendors)
+    start = time.perf_counter()
+    onboarder.run(rows, job_id="bench")
+    print(f"{collection.count()} vendors in Chroma, {len(lexical)} in the lexical index "
+          f"({time.perf_counter() - start:.1f} s)")
+
+    service = VendorService(collection=collection, client=object(), embedding_function=ef, summary_cache=None,
+                            lexical_index=lexical)
+    page = collection.get(include=["metadatas"])
+    contacts = {row["contact"]: row for row in rows}
+    service._bench_rows = {meta["id"]: contacts[meta["contact"]] for meta in page["metadatas"]}
+
+    phone, brand, semantic = query_sets(rows, args.queries, random.Random(17))
+    queries = {"phone": phone, "brand": brand, "semantic": semantic}
+    run(service, ef, "hybrid", {k: v[:10] for k, v in queries.items()}, args.limit)  # warm up
+
+    print(f"\n{'mode':8s} {'queries':9s} {'hit/prec@' + str(args.limit):>12s} {'p50 ms':>8s} {'p99 ms':>8s} {'embeds/q':>9s}")
+    for mode in ("vector", "hybrid", "lexical"):
+        for name, (quality, latencies, calls) in run(service, ef, mode, queries, args.limit).items():
+            print(f"{mode:8s} {name:9s} {quality:12.0%} {percentile(latencies, 0.5):8.2f} "
+                  f"{percentile(latencies, 0.99):8.2f} {calls:9.2f}")
+
+    ef.down = True
+    quality, latencies, _ = run(service, ef, "hybrid", {"brand": brand[:20]}, args.limit)["brand"]
+    print(f"\nhybrid with the embedding API down: brand precision {quality:.0%}, "
+          f"p50 {percentile(latencies, 0.5):.2f} ms (lexical results only)")
+
+    service.close()
+    onboarder.close()
+    lexical.close()
+
+
+if __name__ == "__main__":
+    main()
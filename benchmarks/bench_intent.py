@@ -0,0 +1,222 @@
+"""
+Offline evaluation of the tiered intent engine against labelled message sets.
+
+LABELLED was written alongside the rules and only shows they do what they
+were written to do. HELD_OUT was collected afterwards from how people
+actually phrase requests, without looking at the patterns; its numbers are
+the ones to quote. Run with --set all to score both.
+
+The LLM tier is a mocked model that returns the gold label except for a
+seeded share of calls (--llm-error-rate), where it answers another intent,
+so LLM answers are no longer free accuracy. The report shows how many
+messages each tier answered, how accurate it was on those, end-to-end
+accuracy and the classification latency.
+
+The centroid tier uses the local hashing embedder by default; pass --gemini to
+use the real embedding model (needs GOOGLE_API_KEY, results go through the
+embedding cache).
+
+Usage: python -m benchmarks.bench_intent [--set held-out|labelled|all] [--llm-error-rate 0.1] [--gemini] [--show-errors]
+"""
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+
+os.environ.setdefault("GOOGLE_API_KEY", "bench-dummy-key")
+os.environ.setdefault("CHROMA_DB_DIR", tempfile.mkdtemp(prefix="bench-intent-"))
+
+from benchmarks.common import HashEmbeddingFunction, percentile
+from src.intent_engine import INTENTS, CentroidClassifier, IntentEngine
+
+# Written with the rules in view (none of them are centroid seed examples)
+LABELLED = [
+    # English onboarding
+    ("Register my sweet shop in Chandni Chowk", "onboard"),
+    ("I want to register my business", "onboard"),
+    ("Please list my pharmacy on ONDC, it's in Whitefield", "onboard"),
+    ("We make organic soaps in Kochi and want to sell online", "onboard"),
+    ("Add our furniture store to the network", "onboard"),
+    ("I own a mobile repair stall in Lajpat Nagar", "onboard"),
+    ("How do I join ONDC as a seller?", "onboard"),
+    ("Sign up my cloud kitchen, Andheri West, contact 9876543210", "onboard"),
+    ("My bakery is in HSR Layout, we sell cakes and cookies", "onboard"),
+    ("I sell fresh fish at Sassoon Dock", "onboard"),
+    ("Onboard my hardware shop please", "onboard"),
+    ("Put my saree business on the platform", "onboard"),
+    # Hinglish onboarding
+    ("meri dukaan ko register kar do, Lucknow mein hai", "onboard"),
+    ("mera business list karna hai ONDC pe", "onboard"),
+    ("main sabzi bechta hoon Karol Bagh mein", "onboard"),
+    ("hamari dukan jodna hai, hum mithai bechte hain", "onboard"),
+    ("register karna hai meri bakery ko", "onboard"),
+    # Hindi onboarding
+    ("मेरी दुकान रजिस्टर करें, जयपुर में कपड़े की दुकान है", "onboard"),
+    ("मैं पुणे में मोबाइल रिपेयर करता हूँ, मुझे जोड़ें", "onboard"),
+    ("हमारी दुकान को पंजीकृत करना है", "onboard"),
+    # English search
+    ("Find a good dentist in Indiranagar", "search"),
+    ("Looking for a carpenter to fix my door", "search"),
+    ("Where can I get fresh flowers in Mylapore", "search"),
+    ("Any tailors near Koramangala?", "search"),
+    ("I need an electrician urgently", "search"),
+    ("Show me bakeries that deliver", "search"),
+    ("Who sells second hand laptops in Nehru Place", "search"),
+    ("Search for organic honey", "search"),
+    ("plumber nearby", "search"),
+    ("Can you recommend a caterer for a wedding", "search"),
+    ("want to buy a cycle", "search"),
+    ("AC repair service near me", "search"),
+    # Hinglish search
+    ("mujhe ek achha electrician chahiye", "search"),
+    ("paas mein koi dawai ki dukaan batao", "search"),
+    ("Jaipur mein chunri kahan milega", "search"),
+    ("plumber dhundh raha hoon Andheri mein", "search"),
+    ("koi tailor batao Pune mein", "search"),
+    # Hindi search
+    ("मुझे दिल्ली में इलेक्ट्रीशियन चाहिए", "search"),
+    ("पास में कोई दवाई की दुकान बताइए", "search"),
+    ("अच्छी मिठाई कहाँ मिलेगी", "search"),
+    ("लखनऊ में दर्जी ढूंढ रहा हूँ", "search"),
+    # Unknown / chit-chat
+    ("hello", "unknown"),
+    ("Hii", "unknown"),
+    ("thank you", "unknown"),
+    ("namaste", "unknown"),
+    ("what can you do", "unknown"),
+    ("who made this bot?", "unknown"),
+    ("ok", "unknown"),
+    ("नमस्ते", "unknown"),
+    ("good evening", "unknown"),
+    ("is this free?", "unknown"),
+    ("?", "unknown"),
+]
+
+# Collected after the rules, without reading them
+HELD_OUT = [
+    # Onboarding
+    ("I want to list my shop", "onboard"),
+    ("I want to register my shop", "onboard"),
+    ("I want to sell my products on ONDC", "onboard"),
+    ("want to put my restaurant on here", "onboard"),
+    ("How can I get my clinic listed?", "onboard"),
+    ("can you add me as a seller", "onboard"),
+    ("I'd like my boutique to show up in searches", "onboard"),
+    ("We're a small dairy in Anand, can we come on board?", "onboard"),
+    ("need to add my business", "onboard"),
+    ("please create a profile for my salon in Bandra", "onboard"),
+    ("I have a hardware store and want customers from the app", "onboard"),
+    ("my kirana wants to go online", "onboard"),
+    ("seller registration", "onboard"),
+    ("mujhe apni dukaan online daalni hai", "onboard"),
+    ("apna shop add karna hai", "onboard"),
+    ("मुझे अपनी दुकान ऑनलाइन लानी है", "onboard"),
+    # Search
+    ("I want a cake for tomorrow", "search"),
+    ("need someone to repair my fridge", "search"),
+    ("my shop needs a new signboard, who makes them?", "search"),
+    ("best biryani in Hyderabad", "search"),
+    ("is there a vet open now in Baner", "search"),
+    ("I want to buy a second-hand bike", "search"),
+    ("get me a list of electricians", "search"),
+    ("my tap is leaking, need a plumber", "search"),
+    ("where's the nearest chemist", "search"),
+    ("any good gym in Salt Lake", "search"),
+    ("mere ghar ke paas doodh wala", "search"),
+    ("sasta mobile cover chahiye", "search"),
+    ("केक की दुकान पास में", "search"),
+    # Unknown / chit-chat
+    ("how does this work?", "unknown"),
+    ("what is ONDC", "unknown"),
+    ("are you a real person", "unknown"),
+    ("bye", "unknown"),
+    ("👍", "unknown"),
+    ("can you speak Tamil", "unknown"),
+    ("theek hai", "unknown"),
+    ("aap kaun ho", "unknown"),
+]
+
+SETS = {"labelled": LABELLED, "held-out": HELD_OUT, "all": LABELLED + HELD_OUT}
+
+
+class MockLLM:
+    """Stands in for the Gemini fallback: right except for a seeded share of calls."""
+
+    def __init__(self, gold: dict, error_rate: float, seed: int = 11):
+        self.gold = gold
+        self.error_rate = error_rate
+        self.rng = random.Random(seed)
+        self.calls = 0
+
+    async def __call__(self, message: str) -> str:
+        self.calls += 1
+        label = self.gold[message]
+        if self.rng.random() < self.error_rate:
+            return self.rng.choice([intent for intent in INTENTS if intent != label])
+        return label
+
+
+async def evaluate(engine: IntentEngine, messages, llm_error_rate: float, show_errors: bool) -> None:
+    llm = MockLLM(dict(messages), llm_error_rate)
+    per_tier = {}
+    latencies = []
+    errors = []
+    for message, label in messages:
+        start = time.perf_counter()
+        result = await engine.classify(message, llm)
+        latencies.append((time.perf_counter() - start) * 1000)
+        hits, total = per_tier.get(result.tier, (0, 0))
+        per_tier[result.tier] = (hits + (result.intent == label), total + 1)
+        if result.intent != label:
+            errors.append((message, label, result))
+
+    n = len(messages)
+    local = n - llm.calls
+    local_hits = sum(h for tier, (h, _) in per_tier.items() if tier != "llm")
+    print(f"{n} messages, mocked LLM error rate {llm_error_rate:.0%}\n")
+    print(f"{'tier':<10} {'answered':>9} {'accuracy':>9}")
+    for tier in ("rules", "centroid", "llm"):
+        hits, total = per_tier.get(tier, (0, 0))
+        accuracy = f"{hits / total:.1%}" if total else "-"
+        print(f"{tier:<10} {total:>9} {accuracy:>9}")
+    print(f"\nLLM calls avoided: {local}/{n} ({local / n:.1%})")
+    print(f"Local-tier accuracy: {local_hits / local:.1%}" if local else "Local-tier accuracy: -")
+    print(f"End-to-end accuracy: {(n - len(errors)) / n:.1%}")
+    print(f"Latency: p50={percentile(latencies, 0.50):.3f} ms  p99={percentile(latencies, 0.99):.3f} ms")
+
+    if show_errors and errors:
+        print("\nMisclassified:")
+        for message, label, result in errors:
+            print(f"  {message!r}: expected {label}, got {result}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Evaluate the tiered intent engine")
+    parser.add_argument("--gemini", action="store_true", help="Use the Gemini embedding model for tier 2")
+    parser.add_argument("--no-centroid", action="store_true", help="Rules tier only")
+    parser.add_argument("--rules-min-confidence", type=float, default=0.8)
+    parser.add_argument("--centroid-min-confidence", type=float, default=0.8)
+    parser.add_argument("--set", choices=sorted(SETS), default="held-out", help="Which labelled messages to score")
+    parser.add_argument("--llm-error-rate", type=float, default=0.1, help="Share of mocked LLM answers that are wrong")
+    parser.add_argument("--show-errors", action="store_true")
+    args = parser.parse_args()
+
+    if args.gemini:
+        from src.dependencies import get_embedding_function
+        embedding_function = get_embedding_function()
+    else:
+        embedding_function = HashEmbeddingFunction()
+
+    centroid = None if args.no_centroid else CentroidClassifier(embedding_function)
+    engine = IntentEngine(
+        centroid=centroid,
+        rules_min_confidence=args.rules_min_confidence,
+        centroid_min_confidence=args.centroid_min_confidence
+    )
+    asyncio.run(evaluate(engine, SETS[args.set], args.llm_error_rate, args.show_errors))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+Outbound Telegram replies against a local fake Bot API that enforces flood
+limits (per chat and global, answering 429 with parameters.retry_after).
+
+Sends C chats x M messages twice:
+
+- naive: every reply posted as soon as it is produced, retrying after the
+  server's retry_after on a 429 (what TelegramService did before)
+- queued: through OutboundSender (per-chat and global token buckets)
+
+Reports 429s, total time, delivery latency and per-chat ordering.
+
+Usage: python -m benchmarks.bench_outbound [--chats 30] [--messages 5]
+"""
+import argparse
+import asyncio
+import time
+
+import httpx
+
+from benchmarks.common import percentile
+from benchmarks.fake_telegram import FakeTelegramAPI
+from src.services.outbound import OutboundSender, TelegramTransport
+
+
+def in_order(sent) -> bool:
+    seen = {}
+    for message in sent:
+        seq = int(message["text"].split()[-1])
+        if seq < seen.get(message["chat_id"], -1):
+            return False
+        seen[message["chat_id"]] = seq
+    return True
+
+
+async def naive(args, fake: FakeTelegramAPI, client: httpx.AsyncClient) -> list:
+    url = f"{fake.base_url}/bot{fake.token}/sendMessage"
+    latencies = []
+
+    async def send(chat_id: int, seq: int):
+        start = time.monotonic()
+        for _ in range(10):
+            response = await client.post(url, json={"chat_id": chat_id, "text": f"reply {seq}"})
+            if response.status_code != 429:
+                break
+            await asyncio.sleep(response.json()["parameters"]["retry_after"])
+        latencies.append((time.monotonic() - start) * 1000)
+
+    await asyncio.gather(*(send(1000 + c, seq) for seq in range(args.messages) for c in range(args.chats)))
+    return latencies
+
+
+async def queued(args, fake: FakeTelegramAPI, client: httpx.AsyncClient) -> OutboundSender:
+    sender = OutboundSender(
+        TelegramTransport(client, f"{fake.base_url}/bot{fake.token}"),
+        per_recipient_per_second=args.chat_limit,
+        per_recipient_burst=1,
+        global_per_second=args.global_limit * 0.9,
+        workers=args.workers,
+    )
+    await sender.start()
+    for seq in range(args.messages):
+        for c in range(args.chats):
+            sender.enqueue(1000 + c, {"chat_id": 1000 + c, "text": f"reply {seq}"})
+    print(f"  queue depth after enqueueing: {sender.depth()}")
+    await sender.aclose(drain_timeout=300)
+    return sender
+
+
+def report(name: str, fake: FakeTelegramAPI, elapsed: float, latencies):
+    print(f"{name:7s} {len(fake.sent)} delivered in {elapsed:.1f} s, {fake.rejected} x 429 "
+          f"({fake.send_calls} sendMessage calls), latency p50 {percentile(latencies, 0.5):.0f} ms "
+          f"p99 {percentile(latencies, 0.99):.0f} ms, per-chat order {'kept' if in_order(fake.sent) else 'BROKEN'}")
+
+
+async def run(args):
+    async with httpx.AsyncClient(timeout=30, limits=httpx.Limits(max_connections=100)) as client:
+        fake = FakeTelegramAPI(per_chat_per_second=args.chat_limit, global_per_second=args.global_limit,
+                               latency_ms=args.latency_ms)
+        fake.start()
+        start = time.perf_counter()
+        latencies = await naive(args, fake, client)
+        report("naive", fake, time.perf_counter() - start, latencies)
+        fake.stop()
+
+        fake = FakeTelegramAPI(per_chat_per_second=args.chat_limit, global_per_second=args.global_limit,
+                               latency_ms=args.latency_ms)
+        fake.start()
+        start = time.perf_counter()
+        sender = await queued(args, fake, client)
+        elapsed = time.perf_counter() - start
+        stats = sender.stats()
+        print(f"queued  {len(fake.sent)} delivered in {elapsed:.1f} s, {fake.rejected} x 429 "
+              f"({fake.send_calls} sendMessage calls), latency p50 {stats['latency']['p50_ms']:.0f} ms "
+              f"p99 {stats['latency']['p99_ms']:.0f} ms, per-chat order {'kept' if in_order(fake.sent) else 'BROKEN'}")
+        print(f"        throttled locally {stats['throttled']} times, failed {stats['failed']}")
+        fake.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the outbound Telegram send queue")
+    parser.add_argument("--chats", type=int, default=30)
+    parser.add_argument("--messages", type=int, default=5, help="Replies per chat")
+    parser.add_argument("--chat-limit", type=float, default=1, help="Fake API sends per chat per second")
+    parser.add_argument("--global-limit", type=float, default=30, help="Fake API sends per second overall")
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--latency-ms", type=float, default=20.0, help="Fake API response time")
+    args = parser.parse_args()
+    print(f"{args.chats} chats x {args.messages} replies, fake limits {args.chat_limit}/s per chat, "
+          f"{args.global_limit}/s global\n")
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
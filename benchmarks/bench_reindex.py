@@ -0,0 +1,186 @@
+"""
+Zero-downtime re-index of the vendor collection into a shadow collection.
+
+Onboards N synthetic vendors, then migrates them with CollectionReindexer
+while a simulated server keeps searching and onboarding / updating /
+deleting vendors, and follows the alias switch the way ServiceContainer
+does. The embedder stands in for a remote API (fixed latency per call,
+throttled to --rate texts/s). The first attempt is killed part-way to
+exercise resume.
+
+Reports migration throughput, peak RSS growth, searches answered and failed
+during the migration, and whether the live collection ends up with exactly
+the vendors the server wrote.
+
+Usage: python -m benchmarks.bench_reindex [--vendors 50000] [--rate 0] [--latency-ms 20]
+"""
+import argparse
+import os
+import random
+import resource
+import tempfile
+import threading
+import time
+
+os.environ.setdefault("GOOGLE_API_KEY", "bench-dummy-key")
+
+import chromadb
+
+from benchmarks.common import CATEGORIES, HashEmbeddingFunction, synthetic_vendor
+from src.collection_aliases import CollectionAliases
+from src.embedding_backends import CachedEmbeddingFunction
+from src.models import VendorOnboardRequest, VendorSearchRequest
+from src.services.bulk_onboarding import BulkCheckpointStore, BulkOnboarder
+from src.services.reindex import CollectionReindexer, ReindexCheckpointStore, ReindexState
+from src.services.vendor_service import VendorService
+
+ALIAS = "vendor_profiles"
+
+
+class RemoteLikeEmbedding(CachedEmbeddingFunction):
+    """Hash embeddings behind a fixed per-call latency."""
+
+    def __init__(self, model_name: str, latency_ms: float, dim: int = 128):
+        super().__init__(model_name)
+        self.latency = latency_ms / 1000
+        self.hash = HashEmbeddingFunction(dim)
+        self.texts = 0
+
+    def _embed_uncached(self, texts):
+        time.sleep(self.latency)
+        self.texts += len(texts)
+        return self.hash(texts)
+
+
+class Crash(Exception):
+    pass
+
+
+class LiveServer(threading.Thread):
+    """Searches and writes continuously; swaps collection when the alias moves."""
+
+    def __init__(self, service: VendorService, client, aliases: CollectionAliases, new_ef, writes_per_second: float):
+        super().__init__(daemon=True)
+        self.service, self.client, self.aliases, self.new_ef = service, client, aliases, new_ef
+        self.interval = 1.0 / writes_per_second
+        self.expected = {}  # vendor id -> name, or None once deleted
+        self.searches = self.failures = self.writes = 0
+        self.stopping = threading.Event()
+
+    def run(self):
+        rng = random.Random(1)
+        last_poll, i = 0.0, 0
+        while not self.stopping.is_set():
+            if time.monotonic() - last_poll > 0.2:
+                last_poll = time.monotonic()
+                resolved = self.aliases.resolve(ALIAS)
+                if resolved and resolved[0] != self.service.collection.name:
+                    self.service.embedding_function = self.new_ef
+                    self.service.previous_collection = self.service.collection
+                    self.service.collection = self.client.get_collection(resolved[0], embedding_function=self.new_ef)
+            try:
+                self.service._retrieve(VendorSearchRequest(query=f"{rng.choice(CATEGORIES).lower()}", limit=5,
+                                                           summary="none"))
+                self.searches += 1
+                action = rng.random()
+                known = [v for v, name in self.expected.items() if name]
+                if action < 0.5 or not known:
+                    result = self.service.onboard_vendor(VendorOnboardRequest(
+                        name=f"Live Shop {i}", location="Pune", category=rng.choice(CATEGORIES), contact=f"+9180{i:08d}"))
+                    self.expected[result["id"]] = f"Live Shop {i}"
+                elif action < 0.8:
+                    vendor_id = rng.choice(known)
+                    meta = self.service.collection.get(ids=[vendor_id], include=["metadatas"])["metadatas"][0]
+                    name = f"{meta['name']} (renamed)"
+                    self.service.collection.update(ids=[vendor_id], metadatas=[{**meta, "name": name}])
+                    self.expected[vendor_id] = name
+                else:
+                    vendor_id = rng.choice(known)
+                    self.service.delete_vendor(vendor_id)
+                    self.expected[vendor_id] = None
+                self.writes += 1
+                i += 1
+            except Exception as e:
+                self.failures += 1
+                print(f"live request failed: {e}")
+            time.sleep(self.interval)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the streaming shadow-collection re-index")
+    parser.add_argument("--vendors", type=int, default=50000)
+    parser.add_argument("--page-size", type=int, default=500)
+    parser.add_argument("--embed-batch-size", type=int, default=100)
+    parser.add_argument("--rate", type=float, default=0, help="texts/s throttle (0 = off)")
+    parser.add_argument("--latency-ms", type=float, default=20, help="simulated embedding API latency per call")
+    parser.add_argument("--writes-per-second", type=float, default=20)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench_reindex_")
+    client = chromadb.PersistentClient(path=os.path.join(workdir, "chroma"))
+    old_ef = RemoteLikeEmbedding("bench/old", latency_ms=0, dim=256)
+    source = client.get_or_create_collection(ALIAS, embedding_function=old_ef)
+    onboarder = BulkOnboarder(source, old_ef, BulkCheckpointStore(os.path.join(workdir, "jobs.sqlite3")))
+    onboarder.run((synthetic_vendor(i) for i in range(args.vendors)), job_id="seed")
+    onboarder.close()
+    print(f"{source.count()} vendors in '{ALIAS}'")
+
+    aliases = CollectionAliases(os.path.join(workdir, "aliases.sqlite3"))
+    checkpoints = ReindexCheckpointStore(os.path.join(workdir, "reindex.sqlite3"))
+    new_ef = RemoteLikeEmbedding("bench/new", latency_ms=args.latency_ms)
+    target = client.get_or_create_collection(f"{ALIAS}-v2", embedding_function=new_ef, metadata={"hnsw:space": "cosine"})
+    state = ReindexState(target.name, ALIAS, ALIAS, new_ef.model_name)
+    checkpoints.save(state)
+
+    service = VendorService(collection=source, client=object(), embedding_function=old_ef, summary_cache=None)
+    server = LiveServer(service, client, aliases, new_ef, args.writes_per_second)
+    server.start()
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    def reindexer():
+        return CollectionReindexer(checkpoints, new_ef, page_size=args.page_size,
+                                   embed_batch_size=args.embed_batch_size, texts_per_second=args.rate)
+
+    def crash_half_way(progress: dict):
+        if progress["scanned"] >= args.vendors // 2:
+            raise Crash()
+
+    started = time.monotonic()
+    try:
+        reindexer().run(state, source, target, progress=crash_half_way)
+    except Crash:
+        print(f"killed after {state.scanned} vendors; resuming")
+    resumed = checkpoints.active(ALIAS)
+    result = reindexer().run(
+        resumed, source, target, grace_seconds=1.0,
+        switch=lambda: aliases.switch(ALIAS, target.name, new_ef.model_name, (ALIAS, old_ef.model_name))
+    )
+    elapsed = time.monotonic() - started
+    time.sleep(0.5)
+    server.stopping.set()
+    server.join()
+    rss_growth = (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss_before) / 1024
+
+    print(f"\nmigration: {elapsed:.1f} s, {args.vendors / elapsed:.0f} vendors/s, {result['sync_pass'] - 1} passes, "
+          f"{new_ef.texts} texts embedded for {args.vendors} vendors (+{result['embedded'] - args.vendors} re-embedded "
+          f"after live edits/resume), {result['updated']} metadata-only, {result['deleted']} deletes")
+    print(f"peak RSS growth during migration: {rss_growth:.0f} MB")
+    print(f"live server: {server.searches} searches, {server.writes} writes, {server.failures} failures; "
+          f"serving '{service.collection.name}'")
+
+    live = client.get_collection(aliases.resolve(ALIAS)[0])
+    wrong = 0
+    for vendor_id, name in server.expected.items():
+        found = live.get(ids=[vendor_id], include=["metadatas"])
+        actual = found["metadatas"][0]["name"] if found["ids"] else None
+        wrong += actual != name
+    print(f"consistency: {wrong} of {len(server.expected)} live-written vendors wrong in the new collection; "
+          f"{live.count()} vendors (source now has {source.count()})")
+
+    service.close()
+    checkpoints.close()
+    aliases.close()
+
+
+if __name__ == "__main__":
+    main()
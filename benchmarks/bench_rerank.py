@@ -0,0 +1,186 @@
+"""
+First-stage top-k vs over-fetch + second-stage re-ranking (SEARCH_RERANKER).
+
+Onboards N synthetic vendors through the bulk pipeline (Chroma + BM25) with
+the noise a real directory has: vendors whose text also names another
+category ("grocery, also stocks plumber supplies"), stale listings not
+updated for years, vendors registered twice with their city written another
+way ("Pune" / "Pune, India"), and owners who list several different shops
+under one phone number.
+Queries are free text as bots send them ("plumber in pune", no parsed
+filters). A result counts as relevant when its category and city match the
+query, it was updated within the last year, and it is not a repeat of a
+vendor already shown. Before timing, the run asserts that the re-ranker
+keeps shops sharing a phone number apart and still drops re-registrations.
+
+Setups: the first stage's top-k as is; over-fetch + features read from the
+candidates' Chroma metadata; over-fetch + features from the in-memory
+RerankFeatureIndex, where Chroma returns candidate IDs and distances only
+and documents are read for the final results. Reports precision@limit and
+p50/p99 of the whole retrieval per setup, then the per-stage timings the
+service records (/v1/metrics "search_pipeline").
+
+Usage: python -m benchmarks.bench_rerank [--vendors 20000] [--queries 300] [--limit 5] [--candidates 30,60]
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+os.environ.setdefault("GOOGLE_API_KEY", "bench-dummy-key")
+
+import chromadb
+import numpy as np
+
+from benchmarks.common import CATEGORIES, CITIES, HashEmbeddingFunction, percentile
+from src.config import get_settings
+from src.lexical_index import LexicalIndex
+from src.metrics import LatencyRecorder
+from src.models import VendorSearchRequest
+from src.reranker import FeatureReranker, RerankFeatureIndex, candidate_features
+from src.services.bulk_onboarding import BulkCheckpointStore, BulkOnboarder
+from src.services.vendor_service import SEARCH_STAGES, VendorService
+
+DAY = 86400
+STALE_SHARE = 0.3
+CROSS_MENTION_SHARE = 0.3
+DUPLICATE_SHARE = 0.1
+SHARED_PHONE_SHARE = 0.1
+
+
+def vendor_rows(count: int, rng: random.Random):
+    rows = []
+    for i in range(count):
+        category, city = rng.choice(CATEGORIES), rng.choice(CITIES)
+        text = f"{category} shop in {city} selling {category.lower()} item {rng.randint(1, 500)}"
+        if rng.random() < CROSS_MENTION_SHARE:
+            text += f", also stocks {rng.choice(CATEGORIES).lower()} supplies"
+        stale = rng.random() < STALE_SHARE
+        rows.append({
+            "name": f"{category} House {i}",
+            "location": city,
+            "category": category,
+            "contact": f"+91{9000000000 + i}",
+            "raw_text": text,
+            "age_days": rng.randint(400, 1500) if stale else rng.randint(0, 300),
+            "vendor": i,
+            "city": city,
+        })
+        if rng.random() < DUPLICATE_SHARE:
+            # Same vendor again with the city spelled differently: a different vendor ID, same phone
+            rows.append({**rows[-1], "location": f"{city}, India", "raw_text": text + " (new listing)"})
+        if rng.random() < SHARED_PHONE_SHARE:
+            # A second, different shop of the same owner: same phone, city and category
+            rows.append({**rows[-1], "name": f"{category} Corner {i}", "location": city,
+                         "raw_text": f"{category} corner in {city}, second branch", "vendor": -i - 1})
+    return rows
+
+
+def check_dedup(reranker: FeatureReranker):
+    base = {"category_key": "plumber", "city": "pune", "contact": "+91 98450 12345", "updated_at": None}
+    metas = [
+        {**base, "id": "a", "name": "Sharma Plumbing"},
+        {**base, "id": "b", "name": "Sharma Hardware"},  # same owner's other shop
+        {**base, "id": "c", "name": "sharma  plumbing", "contact": "098450-12345"},  # re-registration
+        {**base, "id": "d", "name": "Sharma Plumbing", "city": "mumbai"},  # same name and phone elsewhere
+    ]
+    kept = reranker.rerank("plumber in pune", candidate_features(metas), np.array([0.9, 0.8, 0.85, 0.7]))
+    kept_ids = sorted(metas[index]["id"] for index, _ in kept)
+    assert kept_ids == ["a", "b", "d"], f"shared-phone dedup kept {kept_ids}"
+
+
+def run(service: VendorService, queries, by_listing, limit: int):
+    latencies, relevant, total = [], 0, 0
+    for category, city in queries:
+        request = VendorSearchRequest(query=f"{category.lower()} in {city}", limit=limit, summary="none")
+        started = time.perf_counter()
+        vendors, _ = service._retrieve(request)
+        latencies.append((time.perf_counter() - started) * 1000)
+        seen = set()
+        for v in vendors:
+            row = by_listing[(v.name, v.location)]
+            total += 1
+            relevant += (row["category"] == category and row["city"] == city
+                         and row["age_days"] <= 365 and row["vendor"] not in seen)
+            seen.add(row["vendor"])
+    return relevant / total if total else 0.0, latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark candidate over-fetch + re-ranking for vendor search")
+    parser.add_argument("--vendors", type=int, default=20000)
+    parser.add_argument("--queries", type=int, default=300)
+    parser.add_argument("--limit", type=int, default=5)
+    parser.add_argument("--candidates", default="30,60", help="SEARCH_RERANK_CANDIDATES values")
+    args = parser.parse_args()
+
+    settings = get_settings()
+    rng = random.Random(23)
+    rows = vendor_rows(args.vendors, rng)
+    workdir = tempfile.mkdtemp(prefix="bench_rerank_")
+    client = chromadb.PersistentClient(path=os.path.join(workdir, "chroma"))
+    ef = HashEmbeddingFunction()
+    collection = client.get_or_create_collection("vendors", embedding_function=ef)
+    lexical = LexicalIndex(os.path.join(workdir, "lexical.sqlite3"))
+    onboarder = BulkOnboarder(collection, ef, BulkCheckpointStore(os.path.join(workdir, "jobs.sqlite3")),
+                              lexical_index=lexical)
+    onboarder.run(({k: v for k, v in row.items() if k not in ("age_days", "vendor", "city")} for row in rows),
+                  job_id="bench")
+    onboarder.close()
+
+    # Backdate updated_at to each vendor's synthetic age
+    now = time.time()
+    by_listing = {(row["name"], row["location"]): row for row in rows}
+    page = collection.get(include=["metadatas"])
+    metadatas = [
+        {**meta, "updated_at": int(now - by_listing[(meta["name"], meta["location"])]["age_days"] * DAY)}
+        for meta in page["metadatas"]
+    ]
+    batch = client.get_max_batch_size()
+    for start in range(0, len(metadatas), batch):
+        collection.update(ids=page["ids"][start:start + batch], metadatas=metadatas[start:start + batch])
+    print(f"{collection.count()} vendors ({sum(r['age_days'] > 365 for r in rows)} stale, "
+          f"{len(rows) - len({r['vendor'] for r in rows})} re-registrations, "
+          f"{sum(r['vendor'] < 0 for r in rows)} shops sharing an owner's phone)")
+
+    queries = [(rng.choice(CATEGORIES), rng.choice(CITIES)) for _ in range(args.queries)]
+    reranker = FeatureReranker(
+        settings.RERANK_WEIGHT_SIMILARITY, settings.RERANK_WEIGHT_CATEGORY, settings.RERANK_WEIGHT_LOCATION,
+        settings.RERANK_WEIGHT_FRESHNESS, settings.RERANK_FRESHNESS_HALF_LIFE_DAYS
+    )
+    check_dedup(reranker)
+    features = RerankFeatureIndex()
+    features.load(collection)
+    service = VendorService(collection=collection, client=object(), embedding_function=ef, summary_cache=None,
+                            lexical_index=lexical, reranker=reranker)
+
+    print(f"\n{'mode':7s} {'setup':32s} {'prec@' + str(args.limit):>8s} {'p50 ms':>8s} {'p99 ms':>8s}")
+    for mode in ("vector", "hybrid"):
+        settings.SEARCH_MODE = mode
+        setups = [("top-k, no re-rank", None, None, args.limit)]
+        for n in (int(c) for c in args.candidates.split(",")):
+            setups.append((f"{n} cand., metadata from Chroma", reranker, None, n))
+            setups.append((f"{n} cand., in-memory features", reranker, features, n))
+        for label, stage, table, candidates in setups:
+            service.reranker, service.rerank_features = stage, table
+            settings.SEARCH_RERANK_CANDIDATES = candidates
+            run(service, queries[:20], by_listing, args.limit)  # warm up
+            # Zero first-stage candidates (a city with no vendors) must be an empty result, not an error
+            empty = VendorSearchRequest(query="plumber", location="Patna", limit=args.limit, summary="none")
+            assert service._retrieve(empty) == ([], ""), label
+            service.stage_latency = {name: LatencyRecorder() for name in SEARCH_STAGES}
+            precision, latencies = run(service, queries, by_listing, args.limit)
+            print(f"{mode:7s} {label:32s} {precision:8.0%} {percentile(latencies, 0.5):8.2f} "
+                  f"{percentile(latencies, 0.99):8.2f}")
+        stages = service.search_stats()["stages"]
+        print("        per stage (last setup): " + ", ".join(
+            f"{name} p50 {stages[name]['p50_ms']:.2f} ms" for name in SEARCH_STAGES if stages[name]["count"]
+        ))
+
+    service.close()
+    lexical.close()
+
+
+if __name__ == "__main__":
+    main()
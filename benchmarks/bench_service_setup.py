@@ -0,0 +1,76 @@
+"""
+Per-request service setup overhead: before vs after the ServiceContainer.
+
+"Before" rebuilds the services the way the old get_*_service() dependencies did
+(one VendorService per service, plus a nested one inside Beckn/WhatsApp/Telegram).
+"After" resolves the shared instances from a container built once.
+
+No API calls are made; only client and collection setup is measured.
+
+Usage: python -m benchmarks.bench_service_setup [--requests 500]
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+os.environ.setdefault("GOOGLE_API_KEY", "bench-dummy-key")
+os.environ.setdefault("CHROMA_DB_DIR", tempfile.mkdtemp(prefix="bench_chroma_"))
+
+from src.container import ServiceContainer
+from src.services.vendor_service import VendorService
+from src.services.beckn_service import BecknService
+from src.services.whatsapp_service import WhatsAppService
+from src.services.telegram_service import TelegramService
+
+
+def per_request_before():
+    # Mirrors the old main.py: every dependency call built a new service graph
+    return [VendorService(), BecknService(), WhatsAppService(), TelegramService()]
+
+
+def per_request_after(container: ServiceContainer):
+    return [
+        container.vendor_service,
+        container.beckn_service,
+        container.whatsapp_service,
+        container.telegram_service,
+    ]
+
+
+def measure(fn, n: int) -> list:
+    samples = []
+    for _ in range(n):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def report(label: str, samples: list):
+    samples = sorted(samples)
+    p99 = samples[min(len(samples) - 1, int(len(samples) * 0.99))]
+    print(f"{label:<28} mean={statistics.mean(samples):8.3f} ms  "
+          f"p50={statistics.median(samples):8.3f} ms  p99={p99:8.3f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark per-request service setup")
+    parser.add_argument("--requests", type=int, default=500)
+    args = parser.parse_args()
+
+    print(f"Chroma dir: {os.environ['CHROMA_DB_DIR']}")
+    print(f"Simulated requests: {args.requests}\n")
+
+    # Warm the lru_cached clients so both paths start from the same state
+    container = ServiceContainer()
+
+    report("before (per-request build)", measure(per_request_before, args.requests))
+    report("after (shared container)", measure(lambda: per_request_after(container), args.requests))
+
+    container.close()
+
+
+if __name__ == "__main__":
+    main()
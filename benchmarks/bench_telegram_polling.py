@@ -0,0 +1,140 @@
+"""
+Telegram long-polling worker against a local fake Bot API.
+
+Queues N user messages over C chats in the fake API, then runs the
+TelegramPoller (with a simulated slow Gemini) in three phases:
+
+1. graceful stop part-way through (in-flight updates drain, offset is saved)
+2. hard crash: the worker and its running handlers are cancelled
+3. a fresh worker resumes from the durable offset and finishes
+
+Reports throughput and getUpdates calls per message, then checks that no
+update was lost, that replies within each chat are in order, and how many
+updates the crash caused to be re-processed (at-least-once delivery).
+
+Usage: python -m benchmarks.bench_telegram_polling [--updates 400] [--chats 40]
+"""
+import argparse
+import asyncio
+import os
+import re
+import tempfile
+import time
+
+os.environ.setdefault("GOOGLE_API_KEY", "bench-dummy-key")
+os.environ.setdefault("CHROMA_DB_DIR", tempfile.mkdtemp(prefix="bench-telegram-poll-"))
+
+from benchmarks.bench_async_throughput import fake_embed
+from benchmarks.bench_telegram_webhook import SlowGenAI
+from benchmarks.fake_telegram import FakeTelegramAPI
+from src.container import ServiceContainer
+from src.services.telegram_poller import TelegramOffsetStore, TelegramPoller
+
+
+def replies_by_chat(sent) -> dict:
+    received = {}
+    for message in sent:
+        # Replies echo the cleaned query, "hmm <seq>"
+        received.setdefault(message["chat_id"], []).append(int(re.search(r"hmm (\d+)", message["text"]).group(1)))
+    return received
+
+
+async def run(args):
+    fake = FakeTelegramAPI()
+    fake.start()
+
+    services = ServiceContainer()
+    services.embedding_function._embed_remote = fake_embed
+    if services.embedding_function.batcher:
+        services.embedding_function.batcher.embed_fn = fake_embed
+    llm = SlowGenAI(args.llm_latency_ms / 1000.0)
+    services.bot_core.client = llm
+    services.message_analyzer.client = llm
+    services.intent_engine.centroid = None
+    services.bot_core.rate_limiter = None
+    services.bot_core.analysis_cache_ttl = 0
+    telegram = services.telegram_service
+    telegram.base_url = f"{fake.base_url}/bot{fake.token}"
+    if telegram.outbound:
+        telegram.outbound.transport.base_url = telegram.base_url
+    await services.start()
+
+    expected = {}
+    for seq in range(args.updates):
+        chat_id = 1000 + seq % args.chats
+        fake.push(chat_id, f"hmm {seq} ?")
+        expected.setdefault(chat_id, []).append(seq)
+
+    offsets_path = os.path.join(os.environ["CHROMA_DB_DIR"], "telegram_offsets.sqlite3")
+
+    def new_poller() -> TelegramPoller:
+        return TelegramPoller(
+            telegram, services.http_client, TelegramOffsetStore(offsets_path), bot_key="bench",
+            batch_size=args.batch_size, poll_timeout=1, max_concurrency=args.concurrency
+        )
+
+    async def wait_for_replies(count: int):
+        while len(fake.sent) < count:
+            await asyncio.sleep(0.02)
+
+    start = time.perf_counter()
+
+    # 1. Graceful stop after a third of the replies
+    poller, stop = new_poller(), asyncio.Event()
+    task = asyncio.create_task(poller.run(stop))
+    await wait_for_replies(args.updates // 3)
+    stop.set()
+    await task
+    print(f"graceful stop: {len(fake.sent)} replies, offset saved at {poller.stats()['next_offset']}")
+
+    # 2. Hard crash after two thirds: handlers are killed mid-flight, nothing drains
+    poller = new_poller()
+    task = asyncio.create_task(poller.run())
+    await wait_for_replies(2 * args.updates // 3)
+    for handler in list(poller._pending.values()):
+        handler.cancel()
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
+    print(f"crash:         {len(fake.sent)} replies, offset saved at {poller.offsets.load('bench')}")
+
+    # 3. Resume from the checkpoint until every update has a reply
+    poller, stop = new_poller(), asyncio.Event()
+    task = asyncio.create_task(poller.run(stop))
+    while {c: sorted(set(v)) for c, v in replies_by_chat(fake.sent).items()} != expected:
+        await asyncio.sleep(0.05)
+    stop.set()
+    await task
+    elapsed = time.perf_counter() - start
+
+    received = replies_by_chat(fake.sent)
+    duplicates = len(fake.sent) - args.updates
+    print(f"\n{args.updates} updates in {elapsed:.1f} s ({args.updates / elapsed:.1f} updates/s), "
+          f"{fake.get_updates_calls} getUpdates calls ({fake.get_updates_calls / args.updates:.2f} per update)")
+    print(f"re-processed after the crash: {duplicates}")
+
+    for chat_id, seqs in expected.items():
+        deduped = []
+        for seq in received[chat_id]:
+            if seq not in deduped:
+                deduped.append(seq)
+        assert deduped == seqs, f"chat {chat_id}: replies out of order"
+    print("No update lost; replies in order within every chat.")
+
+    await services.aclose()
+    fake.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the Telegram long-polling worker")
+    parser.add_argument("--updates", type=int, default=400)
+    parser.add_argument("--chats", type=int, default=40)
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--llm-latency-ms", type=float, default=200.0)
+    args = parser.parse_args()
+    print(f"{args.updates} messages over {args.chats} chats, simulated LLM latency {args.llm_latency_ms} ms\n")
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""
+Telegram webhook ACK latency, redelivery de-duplication and per-chat ordering.
+
+Drives the real FastAPI app in-process with a slow simulated Gemini (default
+0.5 s per call) and a mock Bot API that records sendMessage calls. A fraction
+of updates is delivered twice, as Telegram does when the webhook is slow.
+Reports webhook p50/p99 and then checks, once the job queue has drained:
+
+- every update_id produced exactly one reply (redeliveries were skipped)
+- replies within each chat were sent in update order
+
+Usage: python -m benchmarks.bench_telegram_webhook [--updates 200] [--chats 50] [--backend memory|sqlite]
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import tempfile
+import time
+import types
+
+os.environ.setdefault("GOOGLE_API_KEY", "bench-dummy-key")
+os.environ.setdefault("CHROMA_DB_DIR", tempfile.mkdtemp(prefix="bench-telegram-"))
+
+import httpx
+
+import main
+from benchmarks.bench_async_throughput import fake_embed
+from benchmarks.common import percentile
+from src.config import get_settings
+
+
+class SlowGenAI:
+    def __init__(self, latency: float):
+        async def generate_content(model, contents, config=None):
+            await asyncio.sleep(latency)
+            return types.SimpleNamespace(text="search", parsed=None)
+        self.aio = types.SimpleNamespace(models=types.SimpleNamespace(generate_content=generate_content))
+
+
+def telegram_update(update_id: int, chat_id: int, seq: int) -> dict:
+    # Ambiguous text, so every update reaches the (slow) LLM tier
+    return {
+        "update_id": update_id,
+        "message": {"chat": {"id": chat_id}, "from": {"first_name": "Bench"}, "text": f"hmm {seq} ?"},
+    }
+
+
+async def run(args):
+    async with main.lifespan(main.app):
+        services = main.app.state.services
+        services.embedding_function._embed_remote = fake_embed
+        if services.embedding_function.batcher:
+            services.embedding_function.batcher.embed_fn = fake_embed
+        llm = SlowGenAI(args.llm_latency_ms / 1000.0)
+        services.bot_core.client = llm
+        services.message_analyzer.client = llm
+        services.intent_engine.centroid = None
+        services.bot_core.rate_limiter = None
+        services.bot_core.analysis_cache_ttl = 0
+
+        sent = []
+
+        def bot_api(request: httpx.Request) -> httpx.Response:
+            sent.append(json.loads(request.content))
+            return httpx.Response(200, json={"ok": True})
+
+        services.telegram_service.http_client = httpx.AsyncClient(transport=httpx.MockTransport(bot_api))
+        if services.telegram_service.outbound:
+            services.telegram_service.outbound.transport.http_client = services.telegram_service.http_client
+
+        rng = random.Random(7)
+        updates = [telegram_update(i, 1000 + rng.randrange(args.chats), i) for i in range(args.updates)]
+        deliveries = list(updates)
+        deliveries += [u for u in updates if rng.random() < args.redeliver]
+
+        latencies = []
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            for update in deliveries:
+                start = time.perf_counter()
+                resp = await client.post("/v1/telegram/webhook", json=update)
+                resp.raise_for_status()
+                latencies.append((time.perf_counter() - start) * 1000)
+
+        print(f"webhook ACK: p50={percentile(latencies, 0.50):6.2f} ms  p99={percentile(latencies, 0.99):6.2f} ms  "
+              f"({len(deliveries)} deliveries, {len(deliveries) - len(updates)} redelivered)")
+
+        start = time.perf_counter()
+        while len(sent) < len(updates) and time.perf_counter() - start < 120:
+            await asyncio.sleep(0.05)
+        await asyncio.sleep(0.2)  # let any duplicate replies surface
+        print(f"processed {len(sent)} replies in {time.perf_counter() - start:.1f} s after the last ACK")
+
+        assert len(sent) == len(updates), f"expected {len(updates)} replies, got {len(sent)}"
+        expected, received = {}, {}
+        for update in updates:
+            expected.setdefault(update["message"]["chat"]["id"], []).append(update["update_id"])
+        for message in sent:
+            # Replies echo the cleaned query, "hmm <seq>"
+            received.setdefault(message["chat_id"], []).append(int(re.search(r"hmm (\d+)", message["text"]).group(1)))
+        assert received == expected, "replies were duplicated, lost or out of order within a chat"
+        print(f"dedupe: {services.metrics()['telegram_updates']}")
+        print("Each update answered exactly once, in order within its chat.")
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Benchmark Telegram webhook ACKs")
+    parser.add_argument("--updates", type=int, default=200)
+    parser.add_argument("--chats", type=int, default=50)
+    parser.add_argument("--redeliver", type=float, default=0.2, help="Fraction of updates delivered twice")
+    parser.add_argument("--llm-latency-ms", type=float, default=500.0)
+    parser.add_argument("--backend", choices=["memory", "sqlite"], default="memory")
+    parser.add_argument("--workers", type=int, default=32)
+    args = parser.parse_args()
+
+    settings = get_settings()
+    settings.JOB_QUEUE_BACKEND = args.backend
+    settings.JOB_QUEUE_WORKERS = args.workers
+    settings.JOB_QUEUE_POLL_INTERVAL_SECONDS = 0.05
+    print(f"{args.updates} updates over {args.chats} chats, simulated LLM latency {args.llm_latency_ms} ms, "
+          f"{args.backend} queue with {args.workers} workers\n")
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main_cli()
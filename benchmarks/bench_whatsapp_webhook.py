@@ -0,0 +1,118 @@
+"""
+WhatsApp webhook latency in sync vs async reply mode.
+
+Drives the real FastAPI app in-process with a slow simulated Gemini and a
+local fake Twilio Messages API. Posts N Twilio-style form webhooks from S
+senders concurrently, once with the reply built inside the webhook (TwiML)
+and once in async mode (empty TwiML, reply sent through the Messages API by
+a job worker). Reports webhook p50/p99/max against Twilio's ~15 s timeout,
+then checks that in async mode every message got exactly one reply via the
+fake API, in order per sender.
+
+Usage: python -m benchmarks.bench_whatsapp_webhook [--messages 100] [--senders 20] [--llm-latency-ms 1500]
+"""
+import argparse
+import asyncio
+import os
+import re
+import tempfile
+import time
+
+os.environ.setdefault("GOOGLE_API_KEY", "bench-dummy-key")
+os.environ.setdefault("CHROMA_DB_DIR", tempfile.mkdtemp(prefix="bench-whatsapp-"))
+
+import httpx
+
+import main
+from benchmarks.bench_async_throughput import fake_embed
+from benchmarks.bench_telegram_webhook import SlowGenAI
+from benchmarks.common import percentile
+from benchmarks.fake_twilio import FakeTwilioAPI
+from src.config import get_settings
+
+TWILIO_TIMEOUT_MS = 15000
+
+
+async def post_all(client: httpx.AsyncClient, messages) -> list:
+    async def post(sender: str, seq: int) -> float:
+        # Same sender: wait for its previous message to be posted, as a user would
+        await asyncio.sleep(seq * 0.001)
+        start = time.perf_counter()
+        resp = await client.post("/v1/whatsapp/webhook", data={"Body": f"hmm {seq} ?", "From": sender})
+        resp.raise_for_status()
+        return (time.perf_counter() - start) * 1000
+
+    return await asyncio.gather(*(post(sender, seq) for seq, sender in messages))
+
+
+def report(mode: str, latencies):
+    late = sum(1 for ms in latencies if ms > TWILIO_TIMEOUT_MS)
+    print(f"{mode:5s} webhook: p50={percentile(latencies, 0.50):8.1f} ms  p99={percentile(latencies, 0.99):8.1f} ms  "
+          f"max={max(latencies):8.1f} ms  over Twilio's timeout: {late}")
+
+
+async def run(args, fake: FakeTwilioAPI):
+    async with main.lifespan(main.app):
+        services = main.app.state.services
+        services.embedding_function._embed_remote = fake_embed
+        if services.embedding_function.batcher:
+            services.embedding_function.batcher.embed_fn = fake_embed
+        llm = SlowGenAI(args.llm_latency_ms / 1000.0)
+        services.bot_core.client = llm
+        services.message_analyzer.client = llm
+        services.intent_engine.centroid = None
+        services.bot_core.rate_limiter = None
+        services.bot_core.analysis_cache_ttl = 0
+        whatsapp = services.whatsapp_service
+        assert whatsapp.replies_async, "async mode did not start; check the TWILIO_* settings"
+
+        messages = [(seq, f"whatsapp:+91990000{seq % args.senders:04d}") for seq in range(args.messages)]
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=300) as client:
+            outbound, whatsapp.outbound = whatsapp.outbound, None
+            report("sync", await post_all(client, messages))
+            whatsapp.outbound = outbound
+            report("async", await post_all(client, messages))
+
+        start = time.perf_counter()
+        while len(fake.sent) < len(messages) and time.perf_counter() - start < 120:
+            await asyncio.sleep(0.05)
+        await asyncio.sleep(0.2)
+        print(f"\nasync replies delivered {time.perf_counter() - start:.1f} s after the last webhook; "
+              f"outbound: {services.metrics()['whatsapp_outbound']['latency']}")
+
+        assert len(fake.sent) == len(messages), f"expected {len(messages)} replies, got {len(fake.sent)}"
+        expected, received = {}, {}
+        for seq, sender in messages:
+            expected.setdefault(sender, []).append(seq)
+        for form in fake.sent:
+            received.setdefault(form["To"], []).append(int(re.search(r"hmm (\d+)", form["Body"]).group(1)))
+        assert received == expected, "replies were duplicated, lost or out of order for a sender"
+        print("Each message answered exactly once through the Messages API, in order per sender.")
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Benchmark WhatsApp webhook reply modes")
+    parser.add_argument("--messages", type=int, default=100)
+    parser.add_argument("--senders", type=int, default=20)
+    parser.add_argument("--llm-latency-ms", type=float, default=1500.0)
+    args = parser.parse_args()
+
+    fake = FakeTwilioAPI()
+    fake.start()
+    settings = get_settings()
+    settings.WHATSAPP_REPLY_MODE = "async"
+    settings.TWILIO_ACCOUNT_SID = fake.account_sid
+    settings.TWILIO_AUTH_TOKEN = fake.auth_token
+    settings.TWILIO_PHONE_NUMBER = "+14155238886"
+    settings.TWILIO_API_BASE_URL = fake.base_url
+    settings.JOB_QUEUE_WORKERS = 32
+    print(f"{args.messages} messages from {args.senders} senders, simulated LLM latency {args.llm_latency_ms} ms\n")
+    try:
+        asyncio.run(run(args, fake))
+    finally:
+        fake.stop()
+
+
+if __name__ == "__main__":
+    main_cli()
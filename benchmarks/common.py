@@ -0,0 +1,56 @@
+"""
+Shared helpers for the benchmarks: a deterministic local embedder and a
+synthetic vendor generator, so runs are reproducible and need no API key.
+"""
+import hashlib
+import random
+
+import numpy as np
+from chromadb.api.types import Documents, EmbeddingFunction, Embeddings
+
+CATEGORIES = ["Bakery", "Electrician", "Plumber", "Grocery", "Electronics", "Tailor", "Pharmacy", "Florist"]
+CITIES = ["Bangalore", "Delhi", "Mumbai", "Chennai", "Pune", "Hyderabad", "Kolkata", "Jaipur"]
+
+
+def hash_embed(texts, dim: int = 256) -> np.ndarray:
+    """
+    Bag-of-words hashing embedder: texts sharing words get similar vectors,
+    which is enough structure for recall/latency measurements.
+    """
+    out = np.zeros((len(texts), dim), dtype=np.float32)
+    for row, text in enumerate(texts):
+        for token in text.lower().replace(".", " ").replace(",", " ").split():
+            digest = hashlib.blake2b(token.encode(), digest_size=8).digest()
+            h = int.from_bytes(digest, "little")
+            out[row, h % dim] += 1.0 if (h >> 32) & 1 else -1.0
+    norms = np.linalg.norm(out, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return out / norms
+
+
+class HashEmbeddingFunction(EmbeddingFunction):
+    def __init__(self, dim: int = 256):
+        self.dim = dim
+
+    def __call__(self, input: Documents) -> Embeddings:
+        return [v for v in hash_embed(list(input), self.dim)]
+
+
+def synthetic_vendor(i: int, rng: random.Random = None) -> dict:
+    rng = rng or random.Random(i)
+    category = rng.choice(CATEGORIES)
+    city = rng.choice(CITIES)
+    return {
+        "name": f"{category} House {i}",
+        "location": city,
+        "category": category,
+        "contact": f"+91{9000000000 + i}",
+        "product": f"{category.lower()} item {rng.randint(1, 500)}",
+    }
+
+
+def percentile(samples, p: float) -> float:
+    samples = sorted(samples)
+    if not samples:
+        return 0.0
+    return samples[min(len(samples) - 1, int(len(samples) * p))]
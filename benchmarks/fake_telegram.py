@@ -0,0 +1,128 @@
+"""
+Local fake of the Telegram Bot API for the benchmarks: getUpdates with offset
+confirmation and long polling, sendMessage recording, and optional flood
+limits that answer 429 with parameters.retry_after like the real API.
+Runs under uvicorn in a background thread.
+"""
+import asyncio
+import socket
+import threading
+import time
+from collections import defaultdict, deque
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class FakeTelegramAPI:
+    def __init__(self, token: str = "123456:bench", per_chat_per_second: float = 0, global_per_second: float = 0,
+                 latency_ms: float = 0):
+        self.token = token
+        self.port = free_port()
+        self.base_url = f"http://127.0.0.1:{self.port}"
+        self.updates = []  # pending (unconfirmed) updates, ascending update_id
+        self.next_update_id = 1
+        self.sent = []
+        self.get_updates_calls = 0
+        self.send_calls = 0
+        self.rejected = 0
+        self.per_chat_per_second = per_chat_per_second
+        self.global_per_second = global_per_second
+        self.latency = latency_ms / 1000.0
+        self._chat_sends = defaultdict(deque)
+        self._global_sends = deque()
+        self._lock = threading.Lock()
+        self._loop = None
+        self._new_updates = None
+
+        self.app = FastAPI()
+        self.app.post(f"/bot{token}/getUpdates")(self.get_updates)
+        self.app.post(f"/bot{token}/sendMessage")(self.send_message)
+        self.app.post(f"/bot{token}/deleteWebhook")(lambda: {"ok": True, "result": True})
+        self.server = uvicorn.Server(uvicorn.Config(self.app, host="127.0.0.1", port=self.port, log_level="error"))
+
+    def push(self, chat_id: int, text: str) -> int:
+        """Adds an incoming user message; callable from any thread."""
+        with self._lock:
+            update_id = self.next_update_id
+            self.next_update_id += 1
+            self.updates.append({
+                "update_id": update_id,
+                "message": {"message_id": update_id, "chat": {"id": chat_id},
+                            "from": {"first_name": f"User{chat_id}"}, "text": text},
+            })
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._new_updates.set)
+        return update_id
+
+    async def get_updates(self, request: Request):
+        body = await request.json()
+        offset = body.get("offset")
+        limit = body.get("limit", 100)
+        timeout = body.get("timeout", 0)
+        self.get_updates_calls += 1
+        if self._new_updates is None:
+            self._loop = asyncio.get_running_loop()
+            self._new_updates = asyncio.Event()
+        deadline = time.monotonic() + timeout
+        while True:
+            self._new_updates.clear()
+            with self._lock:
+                if offset is not None:
+                    # Everything below the offset is confirmed and forgotten
+                    self.updates = [u for u in self.updates if u["update_id"] >= offset]
+                batch = self.updates[:limit]
+            remaining = deadline - time.monotonic()
+            if batch or remaining <= 0:
+                return {"ok": True, "result": batch}
+            try:
+                await asyncio.wait_for(self._new_updates.wait(), timeout=remaining)
+            except asyncio.TimeoutError:
+                pass
+
+    async def send_message(self, request: Request):
+        body = await request.json()
+        self.send_calls += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        now = time.monotonic()
+        with self._lock:
+            retry_after = self._flood_wait(body["chat_id"], now)
+            if retry_after:
+                self.rejected += 1
+                return JSONResponse(status_code=429, content={
+                    "ok": False, "error_code": 429,
+                    "description": f"Too Many Requests: retry after {retry_after}",
+                    "parameters": {"retry_after": retry_after},
+                })
+            self._chat_sends[body["chat_id"]].append(now)
+            self._global_sends.append(now)
+            self.sent.append(body)
+        return {"ok": True, "result": {"message_id": len(self.sent), "chat": {"id": body["chat_id"]}}}
+
+    def _flood_wait(self, chat_id, now: float) -> int:
+        """Seconds to wait if this send would exceed a per-chat or global 1 s window."""
+        for window, limit in ((self._chat_sends[chat_id], self.per_chat_per_second),
+                              (self._global_sends, self.global_per_second)):
+            if not limit:
+                continue
+            while window and window[0] <= now - 1.0:
+                window.popleft()
+            if len(window) >= limit:
+                return 1
+        return 0
+
+    def start(self):
+        threading.Thread(target=self.server.run, daemon=True).start()
+        while not self.server.started:
+            time.sleep(0.05)
+
+    def stop(self):
+        self.server.should_exit = True
@@ -0,0 +1,69 @@
+"""
+Local fake of the Twilio Messages API for the benchmarks: checks basic auth,
+records sent messages and can answer 429 (error 20429) above a messages-per-
+second limit, like Twilio's queue overflow. Runs under uvicorn in a
+background thread.
+"""
+import asyncio
+import base64
+import threading
+import time
+from collections import deque
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+from benchmarks.fake_telegram import free_port
+
+
+class FakeTwilioAPI:
+    def __init__(self, account_sid: str = "ACbench", auth_token: str = "bench-token", per_second: float = 0,
+                 latency_ms: float = 0):
+        self.account_sid = account_sid
+        self.auth_token = auth_token
+        self.port = free_port()
+        self.base_url = f"http://127.0.0.1:{self.port}"
+        self.per_second = per_second
+        self.latency = latency_ms / 1000.0
+        self.sent = []
+        self.send_calls = 0
+        self.rejected = 0
+        self._sends = deque()
+        self._lock = threading.Lock()
+
+        self.app = FastAPI()
+        self.app.post(f"/2010-04-01/Accounts/{account_sid}/Messages.json")(self.create_message)
+        self.server = uvicorn.Server(uvicorn.Config(self.app, host="127.0.0.1", port=self.port, log_level="error"))
+
+    async def create_message(self, request: Request):
+        self.send_calls += 1
+        expected = "Basic " + base64.b64encode(f"{self.account_sid}:{self.auth_token}".encode()).decode()
+        if request.headers.get("authorization") != expected:
+            return JSONResponse(status_code=401, content={"code": 20003, "message": "Authenticate", "status": 401})
+        form = dict(await request.form())
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        now = time.monotonic()
+        with self._lock:
+            while self._sends and self._sends[0] <= now - 1.0:
+                self._sends.popleft()
+            if self.per_second and len(self._sends) >= self.per_second:
+                self.rejected += 1
+                return JSONResponse(status_code=429, content={
+                    "code": 20429, "message": "Too Many Requests", "status": 429
+                })
+            self._sends.append(now)
+            self.sent.append(form)
+        return JSONResponse(status_code=201, content={
+            "sid": f"SM{len(self.sent):032d}", "status": "queued", "to": form.get("To"), "from": form.get("From"),
+            "body": form.get("Body"),
+        })
+
+    def start(self):
+        threading.Thread(target=self.server.run, daemon=True).start()
+        while not self.server.started:
+            time.sleep(0.05)
+
+    def stop(self):
+        self.server.should_exit = True
@@ -0,0 +1,55 @@
+from dotenv import load_dotenv
+load_dotenv()
+
+import argparse
+import os
+import sys
+
+from src.container import build_bulk_onboarder
+from src.dependencies import get_collection, get_embedding_function, get_lexical_index, get_quantized_vectors
+from src.services.bulk_onboarding import iter_csv, iter_ndjson
+
+# Usage: python bulk_onboard.py <vendors.csv|vendors.ndjson> [--job-id district-01]
+# Re-run with the same --job-id to resume an interrupted import.
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk-onboard a vendor registry into the vector store")
+    parser.add_argument("path", help="CSV (with header row) or NDJSON file")
+    parser.add_argument("--job-id", help="Checkpoint key; defaults to the file name")
+    parser.add_argument("--format", choices=["csv", "ndjson"], help="Defaults to the file extension")
+    parser.add_argument("--chunk-size", type=int, help="Rows per embedding/Chroma write chunk")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.path):
+        print(f"File not found: {args.path}")
+        sys.exit(1)
+
+    fmt = args.format or ("csv" if args.path.lower().endswith(".csv") else "ndjson")
+    job_id = args.job_id or os.path.basename(args.path)
+
+    onboarder = build_bulk_onboarder(get_collection(), get_embedding_function(), lexical_index=get_lexical_index(),
+                                     quantized_vectors=get_quantized_vectors())
+    if args.chunk_size:
+        onboarder.chunk_size = args.chunk_size
+
+    resumed = onboarder.checkpoints.get(job_id)
+    if resumed and resumed["status"] != "done":
+        print(f"Resuming job '{job_id}' after row {resumed['rows_done']}")
+
+    def report(progress: dict):
+        print(f"  rows={progress['rows_done']:>9}  onboarded={progress['onboarded']:>9}  "
+              f"errors={progress['errors']:>6}  {progress['rows_per_second']:>8} rows/s", flush=True)
+
+    with open(args.path, newline="", encoding="utf-8-sig") as f:
+        rows = iter_csv(f) if fmt == "csv" else iter_ndjson(f)
+        result = onboarder.run(rows, job_id=job_id, progress=report)
+
+    onboarder.close()
+    print(f"Done: {result['onboarded']} vendors onboarded, {result['errors']} rows rejected "
+          f"({result['rows_per_second']} rows/s)")
+    for sample in result["error_samples"]:
+        print(f"  row {sample['row']}: {sample['error']}")
+
+
+if __name__ == "__main__":
+    main()
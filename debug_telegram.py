@@ -2,9 +2,9 @@ from dotenv import load_dotenv
 load_dotenv()
 
 from src.services.telegram_service import TelegramService
-import time
+import asyncio
 
-def debug_intent():
+async def debug_intent():
     service = TelegramService()
     
     test_messages = [
@@ -19,11 +19,11 @@ def debug_intent():
     for msg in test_messages:
         print(f"\nScanning: '{msg}'")
         try:
-            intent = service.classify_intent(msg)
+            intent = await service.core.classify_intent(msg)
             print(f"Result: '{intent}'")
         except Exception as e:
             print(f"Error: {e}")
-        time.sleep(1)
+        await asyncio.sleep(1)
 
 if __name__ == "__main__":
-    debug_intent()
+    asyncio.run(debug_intent())
@@ -1,100 +1,251 @@
-from fastapi import FastAPI, HTTPException, Depends, BackgroundTasks, Form
-from fastapi.responses import PlainTextResponse
-from src.models import VendorOnboardRequest, VendorSearchRequest, SearchResponse
+import asyncio
+from contextlib import asynccontextmanager
+from typing import List, Literal, Optional
+from fastapi import FastAPI, HTTPException, Depends, Form, Request
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from src.models import VendorOnboardRequest, VendorSearchRequest, SearchResponse, SummaryResponse
 from src.beckn_models import BecknSearchRequest, BecknAck
 from src.services.vendor_service import VendorService
 from src.services.beckn_service import BecknService
 from src.services.whatsapp_service import WhatsAppService
+from src.services.telegram_service import TelegramService, update_chat_id
+from src.services.bot_core import TestChannel
+from src.services.bulk_onboarding import BulkJobRunning, BulkOnboarder, aiter_rows
 from src.security import verify_admin_key
-from src.dependencies import get_chroma_client
+from src.container import ServiceContainer
+from src.embedding_backends import EmbeddingError
+from src.job_queue import JobQueue, QueueFullError
+from src.idempotency import IdempotencyStore
 from twilio.twiml.messaging_response import MessagingResponse
 import uvicorn
-import os
+import json
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Build the Chroma collection, GenAI client and services once per process
+    app.state.services = ServiceContainer()
+    await app.state.services.start()
+    try:
+        yield
+    finally:
+        await app.state.services.aclose()
 
 app = FastAPI(
     title="ONDC-Setu API",
     description="Intelligent ONDC Node for Vendor Digitization & Search",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Dependency to get service
-def get_service():
-    return VendorService()
+def get_service(request: Request) -> VendorService:
+    return request.app.state.services.vendor_service
 
 # Dependency for Beckn Service
-def get_beckn_service():
-    return BecknService()
+def get_beckn_service(request: Request) -> BecknService:
+    return request.app.state.services.beckn_service
+
+def get_whatsapp_service(request: Request) -> WhatsAppService:
+    return request.app.state.services.whatsapp_service
+
+def get_telegram_service(request: Request) -> TelegramService:
+    return request.app.state.services.telegram_service
+
+def get_test_channel(request: Request) -> TestChannel:
+    return request.app.state.services.test_channel
 
-def get_whatsapp_service():
-    return WhatsAppService()
+def get_telegram_updates(request: Request) -> IdempotencyStore:
+    return request.app.state.services.telegram_updates
+
+def get_job_queue(request: Request) -> JobQueue:
+    return request.app.state.services.job_queue
+
+def get_bulk_onboarder(request: Request) -> BulkOnboarder:
+    return request.app.state.services.bulk_onboarder
 
 @app.get("/")
 def health_check():
     return {"status": "ok", "service": "ONDC-Setu API", "beckn_ready": True}
 
+@app.get("/v1/metrics", dependencies=[Depends(verify_admin_key)])
+def metrics(request: Request):
+    """
+    Runtime counters (cache hit rates etc.) for the shared services.
+    """
+    return request.app.state.services.metrics()
+
 @app.post("/v1/beckn/search", response_model=BecknAck)
-def beckn_search(request: BecknSearchRequest, background_tasks: BackgroundTasks, service: BecknService = Depends(get_beckn_service)):
+async def beckn_search(request: BecknSearchRequest, queue: JobQueue = Depends(get_job_queue)):
     """
     ONDC /search endpoint.
     1. Returns ACK immediately.
-    2. Triggers background processing to find vendors.
+    2. Queues the search; a job worker finds vendors within context.ttl.
     3. Calls listener's /on_search later.
     """
     try:
-        # Simulate async processing
-        background_tasks.add_task(service.process_search, request)
+        # The ttl clock starts now, not when a worker picks the job up
+        await queue.enqueue("beckn.search", request.model_dump(mode="json"), ttl_seconds=request.context.ttl_seconds())
         return BecknAck()
+    except QueueFullError as e:
+        print(f"Rejecting Beckn request: {e}")
+        return BecknAck(message={"ack": {"status": "NACK"}}, error={"type": "CORE-ERROR", "message": str(e)})
     except Exception as e:
         print(f"Error processing Beckn request: {e}")
         return BecknAck(error={"type": "DOMAIN-ERROR", "message": str(e)})
 
 @app.post("/v1/vendor/onboard", dependencies=[Depends(verify_admin_key)])
-def onboard_vendor(request: VendorOnboardRequest, service: VendorService = Depends(get_service)):
+async def onboard_vendor(request: VendorOnboardRequest, service: VendorService = Depends(get_service)):
     try:
-        result = service.onboard_vendor(request)
+        result = await service.aonboard_vendor(request)
         return result
+    except EmbeddingError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/v1/vendor/onboard/bulk", dependencies=[Depends(verify_admin_key)])
+async def bulk_onboard(
+    vendors: List[VendorOnboardRequest],
+    job_id: Optional[str] = None,
+    onboarder: BulkOnboarder = Depends(get_bulk_onboarder)
+):
+    """
+    Onboards a JSON array of vendors in chunks (batched embeddings and Chroma writes).
+    Pass the same job_id again to resume an interrupted import.
+    """
+    loop = asyncio.get_running_loop()
+    try:
+        # Imports get their own threads so they cannot starve searches of Chroma workers
+        return await loop.run_in_executor(onboarder.job_executor, onboarder.run, vendors, job_id)
+    except BulkJobRunning as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/v1/vendor/onboard/bulk/upload", dependencies=[Depends(verify_admin_key)])
+async def bulk_onboard_upload(
+    request: Request,
+    format: Optional[Literal["ndjson", "csv"]] = None,
+    job_id: Optional[str] = None,
+    onboarder: BulkOnboarder = Depends(get_bulk_onboarder)
+):
+    """
+    Streaming bulk import. Send NDJSON or CSV (header row required) as the raw
+    request body; rows are processed as they arrive, never buffered whole.
+    """
+    fmt = format or ("csv" if "csv" in request.headers.get("content-type", "") else "ndjson")
+    try:
+        return await onboarder.arun(aiter_rows(request.stream(), fmt), job_id)
+    except BulkJobRunning as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/v1/vendor/onboard/bulk/{job_id}", dependencies=[Depends(verify_admin_key)])
+async def bulk_onboard_status(job_id: str, onboarder: BulkOnboarder = Depends(get_bulk_onboarder)):
+    status = onboarder.checkpoints.get(job_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail="Unknown bulk job")
+    return status
+
+@app.delete("/v1/vendor/{vendor_id}", dependencies=[Depends(verify_admin_key)])
+async def delete_vendor(vendor_id: str, service: VendorService = Depends(get_service)):
+    try:
+        return await service.adelete_vendor(vendor_id)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/v1/search", response_model=SearchResponse)
-def search_vendors(request: VendorSearchRequest, service: VendorService = Depends(get_service)):
+async def search_vendors(request: VendorSearchRequest, service: VendorService = Depends(get_service)):
+    """
+    Semantic vendor search. The `summary` field controls the AI summary:
+    inline (default), none, deferred (poll /v1/search/summary/{id}) or
+    stream (NDJSON: vendors first, then summary chunks; an "error" event if the summary fails).
+    """
     try:
-        result = service.search_vendors(request)
+        if request.summary == "stream":
+            # Retrieval runs up to the first event, so its errors map below before any 200 is sent
+            stream = service.astream_search(request)
+            first = await stream.__anext__()
+
+            async def events():
+                yield json.dumps(first) + "\n"
+                async for event in stream:
+                    yield json.dumps(event) + "\n"
+            return StreamingResponse(events(), media_type="application/x-ndjson")
+        result = await service.asearch_vendors(request)
         return result
+    except EmbeddingError as e:
+        # Vector search needs the embedding backend; mode="lexical" does not
+        raise HTTPException(status_code=503, detail=str(e))
+    except ValueError as e:
+        # e.g. a `near` place the gazetteer does not know
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-# ---- Telegram Integration ----
-
-from src.services.telegram_service import TelegramService
+@app.get("/v1/search/summary/{summary_id}", response_model=SummaryResponse)
+def get_search_summary(summary_id: str, service: VendorService = Depends(get_service)):
+    result = service.get_deferred_summary(summary_id)
+    if result is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired summary_id")
+    return result
 
-def get_telegram_service():
-    return TelegramService()
+# ---- Telegram Integration ----
 
 @app.post("/v1/telegram/webhook")
-async def telegram_webhook(update: dict, service: TelegramService = Depends(get_telegram_service)):
+async def telegram_webhook(
+    update: dict,
+    queue: JobQueue = Depends(get_job_queue),
+    seen_updates: IdempotencyStore = Depends(get_telegram_updates)
+):
     """
     Telegram Webhook Endpoint.
-    Receives JSON updates from Telegram.
+    Receives JSON updates from Telegram and ACKs immediately; a job worker
+    processes them, one at a time per chat. Redelivered update_ids are skipped.
     """
-    # Run in background or directly (Telegram needs 200 OK fast)
-    service.handle_incoming_update(update)
+    update_id = update.get("update_id")
+    if update_id is not None and not seen_updates.first_seen(update_id):
+        return {"status": "ok"}
+
+    chat_id = update_chat_id(update)
+    try:
+        await queue.enqueue(
+            "telegram.update", update, ordering_key=f"telegram:{chat_id}" if chat_id is not None else None
+        )
+    except QueueFullError:
+        # Not accepted: let Telegram redeliver it later
+        if update_id is not None:
+            seen_updates.forget(update_id)
+        raise HTTPException(status_code=503, detail="Busy, retry later")
     return {"status": "ok"}
 
 # ---- WhatsApp Integration ----
 
 @app.post("/v1/whatsapp/webhook")
-def whatsapp_webhook(
+async def whatsapp_webhook(
     Body: str = Form(...),
     From: str = Form(...),
-    service: WhatsAppService = Depends(get_whatsapp_service)
+    service: WhatsAppService = Depends(get_whatsapp_service),
+    queue: JobQueue = Depends(get_job_queue)
 ):
     """
     Twilio WhatsApp Webhook.
-    Receives incoming messages and auto-onboards vendors.
+    Receives incoming messages and auto-onboards vendors. In async reply mode
+    it answers with empty TwiML at once and a job worker sends the reply
+    through the Twilio API, in order per sender.
     """
+    if service.replies_async:
+        try:
+            await queue.enqueue(
+                "whatsapp.message", {"message": Body, "sender": From}, ordering_key=f"whatsapp:{From}"
+            )
+            return PlainTextResponse(content=str(MessagingResponse()), media_type="application/xml")
+        except QueueFullError:
+            # Busy: answer inline rather than drop the message
+            pass
     try:
-        reply_text = service.handle_incoming_message(message=Body, sender=From)
+        reply_text = await service.handle_incoming_message(message=Body, sender=From)
         # Build TwiML response
         twiml = MessagingResponse()
         twiml.message(reply_text)
@@ -106,12 +257,12 @@ def whatsapp_webhook(
         return PlainTextResponse(content=str(twiml), media_type="application/xml")
 
 @app.post("/v1/whatsapp/test")
-def test_whatsapp(message: str, sender: str = "test-user", service: WhatsAppService = Depends(get_whatsapp_service)):
+async def test_whatsapp(message: str, sender: str = "test-user", channel: TestChannel = Depends(get_test_channel)):
     """
     Test endpoint to simulate WhatsApp onboarding WITHOUT Twilio.
     Use this in Swagger UI or curl for demos.
     """
-    reply = service.handle_incoming_message(message=message, sender=sender)
+    reply = await channel.receive(sender, message)
     return {"reply": reply}
 
 if __name__ == "__main__":
@@ -0,0 +1,127 @@
+from dotenv import load_dotenv
+load_dotenv()
+
+import argparse
+import os
+import time
+
+from src.config import get_settings
+from src.dependencies import (
+    build_embedding_cache, build_embedding_function, get_chroma_client, get_collection_aliases, get_quantized_vectors,
+    hnsw_configuration, resolve_collection
+)
+from src.services.reindex import CollectionReindexer, ReindexCheckpointStore, ReindexState
+
+# Rebuilds the vendor collection (new embedding model, distance metric, HNSW
+# VECTOR_INDEX_* settings or re-embedded documents) without downtime:
+#
+#   python reindex_embeddings.py --model onnx/all-MiniLM-L6-v2 [--space cosine] [--rate 200]
+#       Streams the live collection into a new shadow collection, page by page,
+#       then catches up on vendors changed meanwhile. Resumable: re-run the same
+#       command after a crash.
+#   python reindex_embeddings.py --switch
+#       Final catch-up, then repoints VECTOR_COLLECTION_NAME to the shadow
+#       collection; running servers follow within COLLECTION_ALIAS_POLL_SECONDS.
+#       (--model ... --switch does both in one go.)
+#   python reindex_embeddings.py --model models/gemini-embedding-001@256 --space cosine --switch
+#       Compact index: Chroma keeps 256-dim truncated vectors, the full ones go
+#       to the int8 re-rank store (VECTOR_RERANK_*).
+#   python reindex_embeddings.py --rollback | --status
+
+def main():
+    settings = get_settings()
+    parser = argparse.ArgumentParser(description="Re-index the vendor collection into a shadow collection")
+    parser.add_argument("--model", help="Target EMBEDDING_MODEL_NAME (default: the current one)")
+    parser.add_argument("--space", choices=["l2", "cosine", "ip"],
+                        help="Distance metric of the new collection (default: VECTOR_INDEX_SPACE)")
+    parser.add_argument("--target", help="Shadow collection name (default: <alias>-<timestamp>)")
+    parser.add_argument("--switch", action="store_true", help="Go live on the shadow collection when caught up")
+    parser.add_argument("--rollback", action="store_true", help="Point the alias back at the previous collection")
+    parser.add_argument("--status", action="store_true")
+    parser.add_argument("--page-size", type=int, default=500)
+    parser.add_argument("--embed-batch-size", type=int, default=100)
+    parser.add_argument("--rate", type=float, default=0, help="Max texts embedded per second (0 = unthrottled)")
+    parser.add_argument("--grace-seconds", type=float, default=settings.COLLECTION_ALIAS_POLL_SECONDS * 2 + 1,
+                        help="Wait after switching before the last catch-up pass")
+    args = parser.parse_args()
+
+    alias = settings.VECTOR_COLLECTION_NAME
+    aliases = get_collection_aliases()
+    checkpoints = ReindexCheckpointStore(os.path.join(settings.CHROMA_DB_DIR, "reindex_jobs.sqlite3"))
+    current = resolve_collection()
+    state = checkpoints.active(alias)
+
+    if args.status:
+        print(f"'{alias}' -> collection '{current[0]}' ({current[1]})")
+        print(f"Migration: {state.as_dict() if state else 'none in progress'}")
+        return
+    if args.rollback:
+        previous = aliases.rollback(alias)
+        print(f"'{alias}' -> '{previous[0]}' ({previous[1]})" if previous else "Nothing to roll back to")
+        return
+
+    if state is None:
+        if not args.model and not args.space and not args.target:
+            raise SystemExit("No migration in progress; pass --model, --space or --target to start one")
+        target_name = args.target or f"{alias}-{time.strftime('%Y%m%d%H%M%S')}"
+        state = ReindexState(target_name, alias, current[0], args.model or current[1])
+        checkpoints.save(state)
+    elif args.model and args.model != state.embedding_model:
+        raise SystemExit(f"Migration to '{state.target}' ({state.embedding_model}) is in progress; finish it first")
+
+    cache = build_embedding_cache(state.embedding_model) if settings.EMBEDDING_CACHE_ENABLED else None
+    embedding_function = build_embedding_function(state.embedding_model, cache)
+    embedding_function.warm_up()
+
+    client = get_chroma_client()
+    source = client.get_collection(state.source)
+    # New collections get the VECTOR_INDEX_* settings (M, ef_construction, ...)
+    target = client.get_or_create_collection(
+        state.target,
+        embedding_function=embedding_function,
+        metadata={"embedding_model": state.embedding_model},
+        configuration=hnsw_configuration(args.space)
+    )
+    stored = (target.metadata or {}).get("embedding_model")
+    if stored and stored != state.embedding_model:
+        raise SystemExit(f"Collection '{state.target}' already holds {stored} vectors; pick another --target")
+
+    print(f"Re-indexing '{state.source}' ({source.count()} vendors) into '{state.target}' "
+          f"with {state.embedding_model}, pass {state.sync_pass} from offset {state.offset}")
+
+    def report(progress: dict):
+        print(f"  pass={progress['sync_pass']}  scanned={progress['scanned']:>9}  embedded={progress['embedded']:>9}  "
+              f"updated={progress['updated']:>7}  deleted={progress['deleted']:>7}  "
+              f"{progress['rows_per_second']:>8} rows/s", flush=True)
+
+    def switch():
+        aliases.switch(alias, state.target, state.embedding_model, current)
+        print(f"'{alias}' now serves '{state.target}'; final catch-up in {args.grace_seconds:.0f} s")
+
+    reindexer = CollectionReindexer(
+        checkpoints,
+        embedding_function,
+        page_size=args.page_size,
+        embed_batch_size=args.embed_batch_size,
+        texts_per_second=args.rate,
+        quantized_vectors=get_quantized_vectors()
+    )
+    result = reindexer.run(state, source, target, switch=switch if args.switch else None,
+                           grace_seconds=args.grace_seconds, progress=report)
+    embedding_function.close()
+    if cache:
+        cache.close()
+    checkpoints.close()
+    if reindexer.quantized_vectors is not None:
+        reindexer.quantized_vectors.close()
+
+    if result["status"] == "done":
+        print(f"Done: '{alias}' serves '{state.target}'. '{state.source}' is kept for --rollback; "
+              f"delete it once you are happy with the new collection.")
+    else:
+        print(f"Shadow collection '{state.target}' is caught up ({result['embedded']} embedded). "
+              f"Run with --switch to go live.")
+
+
+if __name__ == "__main__":
+    main()
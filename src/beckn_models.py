@@ -1,6 +1,23 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel
 from typing import List, Optional, Any
 from datetime import datetime
+import re
+
+_DURATION_RE = re.compile(
+    r"^P(?:(?P<days>\d+(?:\.\d+)?)D)?"
+    r"(?:T(?:(?P<hours>\d+(?:\.\d+)?)H)?(?:(?P<minutes>\d+(?:\.\d+)?)M)?(?:(?P<seconds>\d+(?:\.\d+)?)S)?)?$"
+)
+
+def parse_duration(value: str, default: float = 30.0) -> float:
+    """
+    Converts an ISO 8601 duration such as the context ttl ("PT30S") to seconds.
+    Falls back to `default` for missing or malformed values.
+    """
+    match = _DURATION_RE.match((value or "").strip().upper())
+    if not match or not any(match.groupdict().values()):
+        return default
+    parts = {k: float(v) if v else 0.0 for k, v in match.groupdict().items()}
+    return parts["days"] * 86400 + parts["hours"] * 3600 + parts["minutes"] * 60 + parts["seconds"]
 
 # --- ONDC / Beckn Core Models ---
 
@@ -19,6 +36,9 @@ class Context(BaseModel):
     timestamp: datetime
     ttl: str = "PT30S"
 
+    def ttl_seconds(self) -> float:
+        return parse_duration(self.ttl)
+
 class Descriptor(BaseModel):
     name: str
     code: Optional[str] = None
@@ -0,0 +1,69 @@
+import os
+import sqlite3
+import threading
+import time
+from typing import Optional, Tuple
+
+
+class CollectionAliases:
+    """
+    Maps a logical collection name (VECTOR_COLLECTION_NAME) to the physical
+    Chroma collection and embedding model serving it. A re-index builds a
+    shadow collection and then repoints the alias in one SQLite transaction;
+    running servers poll resolve() and swap over (ServiceContainer).
+    """
+
+    def __init__(self, db_path: str):
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        self._lock = threading.Lock()
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS collection_aliases ("
+            " alias TEXT PRIMARY KEY,"
+            " collection TEXT NOT NULL,"
+            " embedding_model TEXT NOT NULL,"
+            " previous_collection TEXT,"
+            " previous_model TEXT,"
+            " switched_at REAL)"
+        )
+        self._db.commit()
+
+    def resolve(self, alias: str) -> Optional[Tuple[str, str]]:
+        """(collection, embedding model), or None if the alias was never switched."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT collection, embedding_model FROM collection_aliases WHERE alias = ?", (alias,)
+            ).fetchone()
+        return tuple(row) if row else None
+
+    def switch(self, alias: str, collection: str, embedding_model: str, current: Tuple[str, str]):
+        """Points `alias` at `collection`; `current` is remembered for rollback()."""
+        with self._lock:
+            with self._db:
+                self._db.execute(
+                    "INSERT INTO collection_aliases"
+                    " (alias, collection, embedding_model, previous_collection, previous_model, switched_at)"
+                    " VALUES (?, ?, ?, ?, ?, ?)"
+                    " ON CONFLICT(alias) DO UPDATE SET collection = excluded.collection,"
+                    " embedding_model = excluded.embedding_model,"
+                    " previous_collection = excluded.previous_collection,"
+                    " previous_model = excluded.previous_model, switched_at = excluded.switched_at",
+                    (alias, collection, embedding_model, current[0], current[1], time.time())
+                )
+
+    def rollback(self, alias: str) -> Optional[Tuple[str, str]]:
+        """Points `alias` back at the collection it served before the last switch."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT collection, embedding_model, previous_collection, previous_model"
+                " FROM collection_aliases WHERE alias = ?", (alias,)
+            ).fetchone()
+        if not row or not row[2]:
+            return None
+        self.switch(alias, row[2], row[3], (row[0], row[1]))
+        return row[2], row[3]
+
+    def close(self):
+        with self._lock:
+            self._db.close()
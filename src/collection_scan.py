@@ -0,0 +1,53 @@
+from typing import Dict, List
+
+
+class MetadataLoader:
+    """Scan consumer that feeds each page to an in-memory index's add_metadata()."""
+
+    def __init__(self, index):
+        self.index = index
+
+    def page(self, ids: List[str], metadatas: List[dict]):
+        self.index.add_metadata(ids, metadatas)
+
+    def finish(self) -> int:
+        return len(self.index)
+
+
+def scan_metadata(collection, consumers: Dict[str, object], batch_size: int = 1000) -> Dict[str, object]:
+    """
+    One paged pass over `collection`'s metadata shared by every consumer
+    (objects with page(ids, metadatas) and finish()), instead of one full
+    scan each. A consumer that raises is dropped from the rest of the pass
+    without stopping the others; its entry in the result is the exception.
+    Returns {name: finish() result or exception}.
+    """
+    active = {name: consumer for name, consumer in consumers.items() if consumer is not None}
+    results: Dict[str, object] = {}
+    offset = 0
+    while active:
+        page = collection.get(include=["metadatas"], limit=batch_size, offset=offset)
+        if not page["ids"]:
+            break
+        for name, consumer in list(active.items()):
+            try:
+                consumer.page(page["ids"], page["metadatas"])
+            except Exception as e:
+                results[name] = e
+                del active[name]
+        offset += len(page["ids"])
+    for name, consumer in active.items():
+        try:
+            results[name] = consumer.finish()
+        except Exception as e:
+            results[name] = e
+    return results
+
+
+
+def scan_one(collection, consumer, batch_size: int = 1000):
+    """scan_metadata() for a single consumer; its error is raised rather than returned."""
+    result = scan_metadata(collection, {"scan": consumer}, batch_size)["scan"]
+    if isinstance(result, Exception):
+        raise result
+    return result
@@ -1,21 +1,166 @@
 from pydantic_settings import BaseSettings
 from functools import lru_cache
-import os
 
 class Settings(BaseSettings):
     GOOGLE_API_KEY: str
     CHROMA_DB_DIR: str = "data/vector_store"
     # Using the models proven to work in Phase 1
     GEMINI_MODEL_NAME: str = "models/gemini-flash-latest"  
+    # Backend by prefix: "models/..." = Gemini API, "onnx/<model>" = local CPU model.
+    # A "@<dims>" suffix ("models/gemini-embedding-001@256") is the compact index
+    # mode: Chroma keeps truncated vectors, full ones go to the re-rank store
     EMBEDDING_MODEL_NAME: str = "models/gemini-embedding-001"
+    # Logical collection name. reindex_embeddings.py builds a shadow collection and
+    # repoints this alias to it (<CHROMA_DB_DIR>/collection_aliases.sqlite3); once
+    # switched, the alias' collection and embedding model win over these settings
+    VECTOR_COLLECTION_NAME: str = "vendor_profiles"
+    COLLECTION_ALIAS_POLL_SECONDS: float = 5.0  # running servers pick up a switch (0 = off)
+    # HNSW index. Space, M and ef_construction are fixed when a collection is
+    # created (rebuild with reindex_embeddings.py to change them); ef_search is
+    # applied to the serving collection at startup. Defaults are Chroma's.
+    VECTOR_INDEX_SPACE: str = "l2"  # "l2", "cosine" or "ip"
+    VECTOR_INDEX_M: int = 16
+    VECTOR_INDEX_EF_CONSTRUCTION: int = 100
+    VECTOR_INDEX_EF_SEARCH: int = 100
+
+    # Local ONNX backend (empty dir -> Chroma's cache, ~/.cache/chroma/onnx_models/<model>/onnx)
+    EMBEDDING_LOCAL_MODEL_DIR: str = ""
+    EMBEDDING_LOCAL_THREADS: int = 0  # ONNX Runtime intra-op threads, 0 = one per core
+    EMBEDDING_LOCAL_BATCH_SIZE: int = 64
+    EMBEDDING_LOCAL_MAX_LENGTH: int = 256
+    EMBEDDING_WARMUP_ENABLED: bool = True  # load the local model at startup, not on the first query
+
+    # Embedding Cache (empty path -> <CHROMA_DB_DIR>/embedding_cache.sqlite3)
+    EMBEDDING_CACHE_ENABLED: bool = True
+    EMBEDDING_CACHE_MAX_ITEMS: int = 10000
+    EMBEDDING_CACHE_MAX_DISK_ROWS: int = 20000  # ~12 KB per 3072-dim vector, 0 = unbounded
+    EMBEDDING_CACHE_PATH: str = ""
+
+    # Embedding Micro-batching (flush on size or after the wait window)
+    EMBEDDING_BATCHING_ENABLED: bool = True
+    EMBEDDING_BATCH_MAX_SIZE: int = 32
+    EMBEDDING_BATCH_MAX_WAIT_MS: float = 10.0
+    EMBEDDING_BATCH_MAX_CONCURRENCY: int = 4
+
+    # AI Summary Cache (semantic mode reuses summaries for near-duplicate queries)
+    SUMMARY_CACHE_ENABLED: bool = True
+    SUMMARY_CACHE_TTL_SECONDS: int = 600
+    SUMMARY_CACHE_MAX_ENTRIES: int = 2000
+    SUMMARY_CACHE_SEMANTIC_ENABLED: bool = False
+    SUMMARY_CACHE_SEMANTIC_THRESHOLD: float = 0.95
+
+    # Async request path: bounded pool for blocking Chroma work + shared HTTP client
+    CHROMA_THREAD_POOL_SIZE: int = 8
+    HTTP_TIMEOUT_SECONDS: float = 10.0
+    HTTP_MAX_CONNECTIONS: int = 100
+    HTTP_MAX_KEEPALIVE_CONNECTIONS: int = 20
+
+    # Job Queue ("memory" or durable "sqlite"; empty path -> <CHROMA_DB_DIR>/jobs.sqlite3)
+    JOB_QUEUE_BACKEND: str = "memory"
+    JOB_QUEUE_WORKERS: int = 4
+    JOB_QUEUE_MAX_DEPTH: int = 10000
+    JOB_QUEUE_PATH: str = ""
+    JOB_QUEUE_POLL_INTERVAL_SECONDS: float = 0.5
+
+    # Onboarding: upsert on a stable name/location/contact ID instead of a fresh uuid4
+    ONBOARD_UPSERT_ENABLED: bool = True
+
+    # Geo search (opt-in): onboarding geocodes `location` with an offline gazetteer
+    # (empty path -> bundled src/data/gazetteer_in.csv) into lat/lon metadata
+    GEO_ENABLED: bool = False
+    GEO_GAZETTEER_PATH: str = ""
+    GEO_CELL_DEGREES: float = 0.05
+    GEO_NEAR_RADIUS_KM: float = 5.0  # bots: "electrician near Koramangala"
+    GEO_MAX_CANDIDATES: int = 2000  # nearest vendors handed to semantic ranking
+    GEO_DISTANCE_WEIGHT: float = 0.5  # added to the embedding distance per radius of distance
+
+    # Search retrieval: "vector" (Chroma only), "hybrid" (Chroma + BM25 fused with
+    # reciprocal-rank fusion) or "lexical" (BM25 only, no embedding call);
+    # empty index path -> <CHROMA_DB_DIR>/lexical_index.sqlite3. "hybrid" and
+    # "lexical" are opt-in and need LEXICAL_INDEX_ENABLED
+    SEARCH_MODE: str = "vector"
+    LEXICAL_INDEX_ENABLED: bool = False
+    LEXICAL_INDEX_PATH: str = ""
+    SEARCH_FUSION_DEPTH: int = 20  # candidates taken from each retriever before fusion
+    SEARCH_RRF_K: int = 60
+    # Compact index mode: candidates taken from the truncated vectors and re-scored
+    # against int8 full vectors (empty path -> <CHROMA_DB_DIR>/quantized_vectors.sqlite3)
+    VECTOR_RERANK_ENABLED: bool = True
+    VECTOR_RERANK_DEPTH: int = 50
+    VECTOR_RERANK_STORE_PATH: str = ""
+    # Second search stage: SEARCH_RERANK_CANDIDATES first-stage results re-scored
+    # into a 0-1 relevance ("features": similarity + category/location match +
+    # freshness, near-duplicates dropped; "none": first-stage order, the default)
+    SEARCH_RERANKER: str = "none"
+    SEARCH_RERANK_CANDIDATES: int = 30
+    RERANK_WEIGHT_SIMILARITY: float = 0.6
+    RERANK_WEIGHT_CATEGORY: float = 0.15
+    RERANK_WEIGHT_LOCATION: float = 0.15
+    RERANK_WEIGHT_FRESHNESS: float = 0.1
+    RERANK_FRESHNESS_HALF_LIFE_DAYS: float = 180.0
+
+    # Bulk Onboarding (empty path -> <CHROMA_DB_DIR>/bulk_jobs.sqlite3)
+    BULK_ONBOARD_CHUNK_SIZE: int = 500
+    BULK_ONBOARD_EMBED_BATCH_SIZE: int = 100
+    BULK_ONBOARD_EMBED_CONCURRENCY: int = 4
+    BULK_ONBOARD_MAX_JOBS: int = 2  # concurrent imports, on their own threads (not CHROMA_THREAD_POOL_SIZE)
+    BULK_ONBOARD_CHECKPOINT_PATH: str = ""
+
+    # Deferred summaries (summary="deferred" on /v1/search)
+    DEFERRED_SUMMARY_WORKERS: int = 4
+    DEFERRED_SUMMARY_MAX_PENDING: int = 1000
+
+    # Chat intent engine: regex rules -> embedding centroids -> LLM fallback
+    INTENT_RULES_MIN_CONFIDENCE: float = 0.8
+    INTENT_CENTROID_ENABLED: bool = True
+    INTENT_CENTROID_MIN_CONFIDENCE: float = 0.8
+    # One structured-output call for intent + vendor fields + search query (opt-in)
+    BOT_COMBINED_ANALYSIS_ENABLED: bool = False
+    # Shared bot pipeline: per-sender rate limit (0 = off) and message analysis cache
+    BOT_RATE_LIMIT_PER_MINUTE: float = 0
+    BOT_RATE_LIMIT_BURST: float = 5
+    BOT_ANALYSIS_CACHE_TTL_SECONDS: float = 300
+    BOT_ANALYSIS_CACHE_MAX_ENTRIES: int = 5000
 
     # Twilio Settings
     TWILIO_ACCOUNT_SID: str = ""
     TWILIO_AUTH_TOKEN: str = ""
     TWILIO_PHONE_NUMBER: str = ""
+    TWILIO_API_BASE_URL: str = "https://api.twilio.com"
+    # "sync": the reply goes back in the webhook's TwiML (must beat Twilio's ~15 s timeout)
+    # "async": empty TwiML at once, reply sent later via the Messages API (needs SID/token/number)
+    WHATSAPP_REPLY_MODE: str = "sync"
+    WHATSAPP_SEND_GLOBAL_PER_SECOND: float = 50
     
+    # Beckn Settings (off = mock mode, /on_search is built but not sent)
+    BECKN_SEND_CALLBACKS: bool = False
+    BECKN_CALLBACK_MAX_CONCURRENCY_PER_HOST: int = 8
+    BECKN_CALLBACK_MAX_RETRIES: int = 5
+    BECKN_CALLBACK_BACKOFF_SECONDS: float = 0.25
+    # context.city as a hard city filter when the intent names no place. Turn on only once
+    # every vendor's city key is trusted (backfill_vendor_filters.py has run); off, it only
+    # ranks vendors in that city higher (needs SEARCH_RERANKER)
+    BECKN_CONTEXT_CITY_FILTER: bool = False
+
     # Telegram Settings
     TELEGRAM_BOT_TOKEN: str = ""
+    # Webhook redeliveries of an update_id seen within this window are ACKed and skipped
+    TELEGRAM_DEDUPE_TTL_SECONDS: float = 3600
+    TELEGRAM_DEDUPE_MAX_ENTRIES: int = 100000
+    TELEGRAM_API_BASE_URL: str = "https://api.telegram.org"
+    # Outbound replies go through a background send queue within Telegram's limits
+    TELEGRAM_SEND_QUEUE_ENABLED: bool = True
+    TELEGRAM_SEND_PER_CHAT_PER_SECOND: float = 1.0
+    TELEGRAM_SEND_PER_CHAT_BURST: float = 3
+    TELEGRAM_SEND_GLOBAL_PER_SECOND: float = 30
+    OUTBOUND_WORKERS: int = 8
+    OUTBOUND_MAX_QUEUE: int = 10000
+    OUTBOUND_MAX_RETRIES: int = 5
+    # Long-polling worker (telegram_poll.py); empty path -> <CHROMA_DB_DIR>/telegram_offsets.sqlite3
+    TELEGRAM_POLL_BATCH_SIZE: int = 100
+    TELEGRAM_POLL_TIMEOUT_SECONDS: int = 25
+    TELEGRAM_POLL_MAX_CONCURRENCY: int = 16
+    TELEGRAM_POLL_OFFSET_PATH: str = ""
     
     class Config:
         env_file = ".env"
@@ -0,0 +1,360 @@
+import asyncio
+import httpx
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from src.beckn_models import BecknSearchRequest
+from src.collection_scan import MetadataLoader, scan_metadata
+from src.config import get_settings
+from src.dependencies import (
+    apply_index_settings, build_embedding_cache, build_embedding_function, get_chroma_client, get_collection,
+    get_collection_aliases, get_embedding_cache, get_embedding_function, get_gazetteer, get_geo_index,
+    get_intent_engine, get_lexical_index, get_llm_client, get_quantized_vectors, get_rerank_features, get_reranker,
+    get_summary_cache, resolve_collection
+)
+from src.embedding_backends import EmbeddingError
+from src.idempotency import IdempotencyStore
+from src.intent_engine import CentroidClassifier
+from src.job_queue import InMemoryJobQueue, Job, JobQueue, SQLiteJobQueue
+from src.services.vendor_service import VendorService
+from src.services.beckn_service import BecknService
+from src.services.callback_dispatcher import CallbackDispatcher
+from src.services.message_analyzer import MessageAnalyzer
+from src.services.outbound import OutboundSender, TelegramTransport, TwilioTransport
+from src.services.bot_core import BotCore, TestChannel
+from src.services.bulk_onboarding import BulkCheckpointStore, BulkOnboarder
+from src.services.whatsapp_service import WhatsAppService
+from src.services.telegram_service import TelegramService
+
+
+class ServiceContainer:
+    """
+    Process-wide holder for the Chroma collection, GenAI client and services.
+    Built once in the FastAPI lifespan and shared by every request, so the hot
+    endpoints no longer pay for get_or_create_collection on each call.
+    """
+
+    def __init__(self):
+        settings = get_settings()
+        self.chroma_client = get_chroma_client()
+        self.embedding_function = get_embedding_function()
+        self.collection = get_collection()
+        self.llm_client = get_llm_client()
+        self.summary_cache = get_summary_cache()
+        self.intent_engine = get_intent_engine()
+        self.geo_index = get_geo_index()
+        self.lexical_index = get_lexical_index()
+        self.quantized_vectors = get_quantized_vectors()
+        self.reranker = get_reranker()
+        self.rerank_features = get_rerank_features()
+
+        # Bounded pool for blocking Chroma work and one pooled HTTP client for
+        # outbound Telegram calls (Beckn callbacks get per-BAP pools below)
+        self.chroma_executor = ThreadPoolExecutor(
+            max_workers=settings.CHROMA_THREAD_POOL_SIZE, thread_name_prefix="chroma"
+        )
+        self.http_client = httpx.AsyncClient(
+            timeout=settings.HTTP_TIMEOUT_SECONDS,
+            limits=httpx.Limits(
+                max_connections=settings.HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.HTTP_MAX_KEEPALIVE_CONNECTIONS
+            )
+        )
+
+        self.vendor_service = VendorService(
+            collection=self.collection,
+            client=self.llm_client,
+            embedding_function=self.embedding_function,
+            summary_cache=self.summary_cache,
+            executor=self.chroma_executor,
+            geo_index=self.geo_index,
+            lexical_index=self.lexical_index,
+            quantized_vectors=self.quantized_vectors,
+            reranker=self.reranker,
+            rerank_features=self.rerank_features
+        )
+        self.callback_dispatcher = CallbackDispatcher(
+            max_concurrency_per_host=settings.BECKN_CALLBACK_MAX_CONCURRENCY_PER_HOST,
+            max_retries=settings.BECKN_CALLBACK_MAX_RETRIES,
+            backoff_seconds=settings.BECKN_CALLBACK_BACKOFF_SECONDS,
+            request_timeout=settings.HTTP_TIMEOUT_SECONDS
+        )
+        self.beckn_service = BecknService(vendor_service=self.vendor_service, dispatcher=self.callback_dispatcher)
+        self.message_analyzer = MessageAnalyzer(
+            self.llm_client, self.intent_engine, combined=settings.BOT_COMBINED_ANALYSIS_ENABLED
+        )
+        # One bot pipeline; each chat channel is a thin adapter around it
+        self.bot_core = BotCore(
+            vendor_service=self.vendor_service,
+            client=self.llm_client,
+            intent_engine=self.intent_engine,
+            analyzer=self.message_analyzer
+        )
+        self.whatsapp_service = WhatsAppService(core=self.bot_core)
+        if settings.WHATSAPP_REPLY_MODE == "async":
+            if settings.TWILIO_ACCOUNT_SID and settings.TWILIO_AUTH_TOKEN and settings.TWILIO_PHONE_NUMBER:
+                self.whatsapp_service.outbound = OutboundSender(
+                    TwilioTransport(
+                        self.http_client, settings.TWILIO_ACCOUNT_SID, settings.TWILIO_AUTH_TOKEN,
+                        settings.TWILIO_PHONE_NUMBER, base_url=settings.TWILIO_API_BASE_URL
+                    ),
+                    per_recipient_per_second=0,
+                    global_per_second=settings.WHATSAPP_SEND_GLOBAL_PER_SECOND,
+                    workers=settings.OUTBOUND_WORKERS,
+                    max_queue=settings.OUTBOUND_MAX_QUEUE,
+                    max_retries=settings.OUTBOUND_MAX_RETRIES
+                )
+            else:
+                print("WHATSAPP_REPLY_MODE=async needs the TWILIO_* credentials; replying in the webhook instead")
+        self.telegram_service = TelegramService(core=self.bot_core, http_client=self.http_client)
+        if settings.TELEGRAM_SEND_QUEUE_ENABLED:
+            self.telegram_service.outbound = OutboundSender(
+                TelegramTransport(self.http_client, self.telegram_service.base_url),
+                per_recipient_per_second=settings.TELEGRAM_SEND_PER_CHAT_PER_SECOND,
+                per_recipient_burst=settings.TELEGRAM_SEND_PER_CHAT_BURST,
+                global_per_second=settings.TELEGRAM_SEND_GLOBAL_PER_SECOND,
+                workers=settings.OUTBOUND_WORKERS,
+                max_queue=settings.OUTBOUND_MAX_QUEUE,
+                max_retries=settings.OUTBOUND_MAX_RETRIES
+            )
+        self.test_channel = TestChannel(core=self.bot_core)
+        self.telegram_updates = IdempotencyStore(
+            ttl_seconds=settings.TELEGRAM_DEDUPE_TTL_SECONDS, max_entries=settings.TELEGRAM_DEDUPE_MAX_ENTRIES
+        )
+        self.bulk_onboarder = build_bulk_onboarder(
+            self.collection, self.embedding_function, self.summary_cache, geo_index=self.geo_index,
+            lexical_index=self.lexical_index, quantized_vectors=self.quantized_vectors,
+            rerank_features=self.rerank_features
+        )
+
+        # Beckn searches and bot messages run on the job queue, not in the web handlers
+        self.job_queue = build_job_queue()
+        self.job_queue.register("beckn.search", self._run_beckn_search)
+        self.job_queue.register("telegram.update", self._run_telegram_update)
+        self.job_queue.register("whatsapp.message", self._run_whatsapp_message)
+        self._alias_watcher = None
+        # Embedding functions replaced by a collection switch; closed with the container
+        self._retired_embedding_functions = []
+
+    def _outbound_senders(self):
+        return [s.outbound for s in (self.telegram_service, self.whatsapp_service) if s.outbound]
+
+    async def start(self):
+        if get_settings().EMBEDDING_WARMUP_ENABLED:
+            started = time.monotonic()
+            try:
+                await asyncio.get_running_loop().run_in_executor(self.chroma_executor, self.embedding_function.warm_up)
+                print(f"Embeddings: {self.embedding_function.model_name} ready in {time.monotonic() - started:.1f} s")
+            except EmbeddingError as e:
+                # Lexical search still works; vector search answers 503 until the backend loads
+                print(f"Embedding warm-up failed: {e}")
+        # The in-memory indexes and the SQLite stores' catch-up share one paged
+        # pass over the collection's metadata instead of a full scan each
+        consumers = {
+            "Geo index": MetadataLoader(self.geo_index) if self.geo_index is not None else None,
+            "Re-rank features": MetadataLoader(self.rerank_features) if self.rerank_features is not None else None,
+            # Catches up on vendors written while the index was off or by another process
+            "Lexical index": self.lexical_index.syncer(self.collection) if self.lexical_index is not None else None,
+            # Compact collection: full vectors for vendors written without the store
+            "Re-rank store": (
+                self.quantized_vectors.syncer(self.collection, self.embedding_function)
+                if self.quantized_vectors is not None and self.embedding_function.dimensions else None
+            ),
+        }
+        if any(consumers.values()):
+            started = time.monotonic()
+            results = await asyncio.get_running_loop().run_in_executor(
+                self.chroma_executor, scan_metadata, self.collection, consumers
+            )
+            for name, result in results.items():
+                if isinstance(result, EmbeddingError):
+                    # Unstored vendors are ranked on their truncated vectors meanwhile
+                    print(f"{name} sync failed: {result}")
+                elif isinstance(result, Exception):
+                    raise result
+                else:
+                    print(f"{name}: {result}")
+            print(f"Startup scan: {', '.join(results)} in {time.monotonic() - started:.1f} s")
+        for sender in self._outbound_senders():
+            await sender.start()
+        await self.job_queue.start()
+        if get_settings().COLLECTION_ALIAS_POLL_SECONDS > 0:
+            self._alias_watcher = asyncio.create_task(self._watch_collection_alias())
+
+    async def _watch_collection_alias(self):
+        """Follows reindex_embeddings.py switching VECTOR_COLLECTION_NAME to a new collection."""
+        interval = get_settings().COLLECTION_ALIAS_POLL_SECONDS
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                name, model = await loop.run_in_executor(self.chroma_executor, resolve_collection)
+                if name != self.collection.name:
+                    await loop.run_in_executor(self.chroma_executor, self.switch_collection, name, model)
+            except Exception as e:
+                print(f"Collection alias check failed: {e}")
+
+    def switch_collection(self, name: str, model: str):
+        """
+        Points every service at collection `name`, with a new embedding function
+        if it was built with another model. In-flight requests finish on the old one.
+        """
+        settings = get_settings()
+        embedding_function = self.embedding_function
+        if model != embedding_function.model_name:
+            cache = build_embedding_cache(model) if settings.EMBEDDING_CACHE_ENABLED else None
+            embedding_function = build_embedding_function(model, cache)
+            embedding_function.warm_up()
+        collection = self.chroma_client.get_collection(name, embedding_function=embedding_function)
+        apply_index_settings(collection)
+
+        if embedding_function is not self.embedding_function:
+            self._retired_embedding_functions.append(self.embedding_function)
+            self.embedding_function = embedding_function
+            self.vendor_service.embedding_function = embedding_function
+            self.bulk_onboarder.embedding_function = embedding_function
+            if self.intent_engine.centroid is not None:
+                self.intent_engine.centroid = CentroidClassifier(embedding_function)
+            if self.summary_cache:
+                # Cached query embeddings are from the old model
+                self.summary_cache.clear()
+        self.vendor_service.previous_collection = self.collection
+        self.collection = collection
+        self.vendor_service.collection = collection
+        self.bulk_onboarder.collection = collection
+        print(f"Switched to collection '{name}' ({model})")
+
+    async def _run_beckn_search(self, job: Job):
+        request = BecknSearchRequest.model_validate(job.payload)
+        remaining = job.remaining()
+        deadline = time.monotonic() + remaining if remaining is not None else None
+        await self.beckn_service.process_search(request, deadline)
+
+    async def _run_telegram_update(self, job: Job):
+        await self.telegram_service.handle_incoming_update(job.payload)
+
+    async def _run_whatsapp_message(self, job: Job):
+        await self.whatsapp_service.reply_to_message(
+            message=job.payload["message"], sender=job.payload["sender"]
+        )
+
+    def metrics(self) -> dict:
+        cache = self.embedding_function.cache
+        batcher = self.embedding_function.batcher
+        return {
+            "embedding_cache": cache.stats() if cache else None,
+            "embedding_batcher": batcher.stats() if batcher else None,
+            "summary_cache": self.summary_cache.stats() if self.summary_cache else None,
+            "beckn_callbacks": self.callback_dispatcher.stats(),
+            "job_queue": self.job_queue.stats(),
+            "intent_engine": self.intent_engine.stats(),
+            "geo_index": self.geo_index.stats() if self.geo_index is not None else None,
+            "lexical_index": self.lexical_index.stats() if self.lexical_index is not None else None,
+            "vector_index": {
+                key: value for key, value in ((self.collection.configuration or {}).get("hnsw") or {}).items()
+                if key in ("space", "max_neighbors", "ef_construction", "ef_search")
+            },
+            "rerank_store": {
+                "dimensions": self.embedding_function.dimensions,
+                "vectors": self.quantized_vectors.count(self.collection.name),
+            } if self.quantized_vectors is not None and self.embedding_function.dimensions else None,
+            "search_pipeline": {
+                **self.vendor_service.search_stats(),
+                "features": self.rerank_features.stats() if self.rerank_features is not None else None,
+            },
+            "bots": self.bot_core.stats(),
+            "telegram_updates": self.telegram_updates.stats(),
+            "telegram_outbound": self.telegram_service.outbound.stats() if self.telegram_service.outbound else None,
+            "whatsapp_outbound": self.whatsapp_service.outbound.stats() if self.whatsapp_service.outbound else None,
+        }
+
+    async def aclose(self):
+        """
+        Closes the async resources (shared HTTP client, async GenAI sessions),
+        then everything close() handles.
+        """
+        if self._alias_watcher is not None:
+            self._alias_watcher.cancel()
+        await self.job_queue.aclose()
+        for sender in self._outbound_senders():
+            await sender.aclose()
+        await self.http_client.aclose()
+        await self.callback_dispatcher.aclose()
+        try:
+            await self.llm_client.aio.aclose()
+        except Exception as e:
+            print(f"Failed to close async GenAI client: {e}")
+        self.close()
+
+    def close(self):
+        """
+        Releases the HTTP sessions held by the GenAI clients and drops the cached
+        factories so a fresh container (e.g. after a reload) starts clean.
+        """
+        self.vendor_service.close()
+        self.bulk_onboarder.close()
+        self.bulk_onboarder.checkpoints.close()
+        self.chroma_executor.shutdown(wait=True)
+        if self.lexical_index is not None:
+            self.lexical_index.close()
+        if self.quantized_vectors is not None:
+            self.quantized_vectors.close()
+
+        try:
+            self.llm_client.close()
+        except Exception as e:
+            print(f"Failed to close GenAI client: {e}")
+
+        for embedding_function in (*self._retired_embedding_functions, self.embedding_function):
+            embedding_function.close()
+            if embedding_function.cache:
+                embedding_function.cache.close()
+
+        get_llm_client.cache_clear()
+        get_embedding_function.cache_clear()
+        get_embedding_cache.cache_clear()
+        get_summary_cache.cache_clear()
+        get_intent_engine.cache_clear()
+        get_gazetteer.cache_clear()
+        get_geo_index.cache_clear()
+        get_lexical_index.cache_clear()
+        get_quantized_vectors.cache_clear()
+        get_reranker.cache_clear()
+        get_rerank_features.cache_clear()
+        get_collection_aliases().close()
+        get_collection_aliases.cache_clear()
+        get_chroma_client.cache_clear()
+
+
+def build_job_queue() -> JobQueue:
+    settings = get_settings()
+    if settings.JOB_QUEUE_BACKEND == "sqlite":
+        db_path = settings.JOB_QUEUE_PATH or os.path.join(settings.CHROMA_DB_DIR, "jobs.sqlite3")
+        return SQLiteJobQueue(
+            db_path,
+            workers=settings.JOB_QUEUE_WORKERS,
+            max_depth=settings.JOB_QUEUE_MAX_DEPTH,
+            poll_interval=settings.JOB_QUEUE_POLL_INTERVAL_SECONDS
+        )
+    return InMemoryJobQueue(workers=settings.JOB_QUEUE_WORKERS, max_depth=settings.JOB_QUEUE_MAX_DEPTH)
+
+
+def build_bulk_onboarder(collection, embedding_function, summary_cache=None, geo_index=None,
+                         lexical_index=None, quantized_vectors=None, rerank_features=None) -> BulkOnboarder:
+    settings = get_settings()
+    db_path = settings.BULK_ONBOARD_CHECKPOINT_PATH or os.path.join(settings.CHROMA_DB_DIR, "bulk_jobs.sqlite3")
+    return BulkOnboarder(
+        collection,
+        embedding_function,
+        BulkCheckpointStore(db_path),
+        summary_cache=summary_cache,
+        geo_index=geo_index,
+        lexical_index=lexical_index,
+        quantized_vectors=quantized_vectors,
+        rerank_features=rerank_features,
+        chunk_size=settings.BULK_ONBOARD_CHUNK_SIZE,
+        embed_batch_size=settings.BULK_ONBOARD_EMBED_BATCH_SIZE,
+        embed_concurrency=settings.BULK_ONBOARD_EMBED_CONCURRENCY,
+        max_jobs=settings.BULK_ONBOARD_MAX_JOBS,
+        stable_ids=settings.ONBOARD_UPSERT_ENABLED
+    )
@@ -1,42 +1,100 @@
 from functools import lru_cache
+from typing import Callable, Dict, Optional
 import chromadb
-from chromadb.api.types import Documents, EmbeddingFunction, Embeddings
 from google import genai
-from google.genai import types
 from src.config import get_settings
+from src.embedding_backends import (
+    CachedEmbeddingFunction, GoogleGenAIEmbeddingFunction, OnnxEmbeddingFunction, split_dimensions
+)
+from src.embedding_cache import EmbeddingCache
+from src.collection_aliases import CollectionAliases
+from src.summary_cache import SummaryCache
+from src.intent_engine import CentroidClassifier, IntentEngine
+from src.geo import Gazetteer, GeoIndex
+from src.lexical_index import LexicalIndex
+from src.quantized_vectors import QuantizedVectorStore
+from src.reranker import FeatureReranker, RerankFeatureIndex
 import os
 
 settings = get_settings()
 
-# Custom Embedding Function for ChromaDB using new google-genai SDK
-class GoogleGenAIEmbeddingFunction(EmbeddingFunction):
-    def __init__(self, api_key: str, model_name: str):
-        self.client = genai.Client(api_key=api_key)
-        self.model_name = model_name
-
-    def __call__(self, input: Documents) -> Embeddings:
-        try:
-            response = self.client.models.embed_content(
-                model=self.model_name,
-                contents=input
-            )
-            if response.embeddings:
-                 return [e.values for e in response.embeddings]
-            return []
-        except Exception as e:
-            print(f"ERROR: Embedding failed: {e}")
-            return []
+# Embedding backends, picked by the EMBEDDING_MODEL_NAME prefix. Each factory
+# takes (model_name, cache) and returns a CachedEmbeddingFunction.
+EMBEDDING_BACKENDS: Dict[str, Callable[[str, Optional[EmbeddingCache]], CachedEmbeddingFunction]] = {}
+
+def register_embedding_backend(*prefixes: str):
+    def decorator(factory):
+        for prefix in prefixes:
+            EMBEDDING_BACKENDS[prefix] = factory
+        return factory
+    return decorator
+
+def _batching_options() -> dict:
+    return {
+        "batching": settings.EMBEDDING_BATCHING_ENABLED,
+        "max_batch_size": settings.EMBEDDING_BATCH_MAX_SIZE,
+        "max_wait_ms": settings.EMBEDDING_BATCH_MAX_WAIT_MS,
+        "max_concurrent_batches": settings.EMBEDDING_BATCH_MAX_CONCURRENCY,
+    }
+
+@register_embedding_backend("models/", "gemini")
+def _gemini_backend(model_name: str, cache: Optional[EmbeddingCache]):
+    return GoogleGenAIEmbeddingFunction(
+        api_key=settings.GOOGLE_API_KEY, model_name=model_name, cache=cache, **_batching_options()
+    )
+
+@register_embedding_backend("onnx/")
+def _onnx_backend(model_name: str, cache: Optional[EmbeddingCache]):
+    return OnnxEmbeddingFunction(
+        model_name,
+        model_dir=settings.EMBEDDING_LOCAL_MODEL_DIR,
+        threads=settings.EMBEDDING_LOCAL_THREADS,
+        batch_size=settings.EMBEDDING_LOCAL_BATCH_SIZE,
+        max_length=settings.EMBEDDING_LOCAL_MAX_LENGTH,
+        cache=cache,
+        **_batching_options()
+    )
+
+def build_embedding_function(model_name: str, cache: Optional[EmbeddingCache] = None) -> CachedEmbeddingFunction:
+    for prefix, factory in EMBEDDING_BACKENDS.items():
+        if model_name.startswith(prefix):
+            return factory(model_name, cache)
+    raise ValueError(f"No embedding backend for {model_name!r}; known prefixes: {', '.join(EMBEDDING_BACKENDS)}")
 
 @lru_cache()
 def get_chroma_client():
     os.makedirs(settings.CHROMA_DB_DIR, exist_ok=True)
     return chromadb.PersistentClient(path=settings.CHROMA_DB_DIR)
 
+@lru_cache()
+def get_embedding_cache():
+    if not settings.EMBEDDING_CACHE_ENABLED:
+        return None
+    return build_embedding_cache(resolve_collection()[1])
+
+def build_embedding_cache(model_name: str) -> EmbeddingCache:
+    # One file for every model: the model name is part of each entry's key.
+    # Entries are full vectors, so "@<dims>" variants share them.
+    db_path = settings.EMBEDDING_CACHE_PATH or os.path.join(settings.CHROMA_DB_DIR, "embedding_cache.sqlite3")
+    return EmbeddingCache(
+        model_name=split_dimensions(model_name)[0],
+        db_path=db_path,
+        max_memory_items=settings.EMBEDDING_CACHE_MAX_ITEMS,
+        max_disk_rows=settings.EMBEDDING_CACHE_MAX_DISK_ROWS
+    )
+
 @lru_cache()
 def get_embedding_function():
-    return GoogleGenAIEmbeddingFunction(
-        api_key=settings.GOOGLE_API_KEY,
-        model_name=settings.EMBEDDING_MODEL_NAME
+    return build_embedding_function(resolve_collection()[1], get_embedding_cache())
+
+@lru_cache()
+def get_summary_cache():
+    if not settings.SUMMARY_CACHE_ENABLED:
+        return None
+    return SummaryCache(
+        ttl_seconds=settings.SUMMARY_CACHE_TTL_SECONDS,
+        max_entries=settings.SUMMARY_CACHE_MAX_ENTRIES,
+        semantic_threshold=settings.SUMMARY_CACHE_SEMANTIC_THRESHOLD if settings.SUMMARY_CACHE_SEMANTIC_ENABLED else None
     )
 
 @lru_cache()
@@ -44,7 +102,123 @@ def get_llm_client():
     """Returns the raw Google GenAI Client"""
     return genai.Client(api_key=settings.GOOGLE_API_KEY)
 
+@lru_cache()
+def get_intent_engine():
+    centroid = CentroidClassifier(get_embedding_function()) if settings.INTENT_CENTROID_ENABLED else None
+    return IntentEngine(
+        centroid=centroid,
+        rules_min_confidence=settings.INTENT_RULES_MIN_CONFIDENCE,
+        centroid_min_confidence=settings.INTENT_CENTROID_MIN_CONFIDENCE
+    )
+
+@lru_cache()
+def get_collection_aliases():
+    return CollectionAliases(os.path.join(settings.CHROMA_DB_DIR, "collection_aliases.sqlite3"))
+
+def resolve_collection():
+    """(collection name, embedding model) currently serving VECTOR_COLLECTION_NAME."""
+    resolved = get_collection_aliases().resolve(settings.VECTOR_COLLECTION_NAME)
+    return resolved or (settings.VECTOR_COLLECTION_NAME, settings.EMBEDDING_MODEL_NAME)
+
+def hnsw_configuration(space: Optional[str] = None) -> dict:
+    """Chroma collection configuration for a new collection, from the VECTOR_INDEX_* settings."""
+    return {
+        "hnsw": {
+            "space": space or settings.VECTOR_INDEX_SPACE,
+            "max_neighbors": settings.VECTOR_INDEX_M,
+            "ef_construction": settings.VECTOR_INDEX_EF_CONSTRUCTION,
+            "ef_search": settings.VECTOR_INDEX_EF_SEARCH,
+        }
+    }
+
+def collection_space(collection) -> str:
+    """Distance space of an existing collection ("l2", "cosine" or "ip")."""
+    hnsw = (collection.configuration or {}).get("hnsw") or {}
+    return hnsw.get("space") or (collection.metadata or {}).get("hnsw:space", "l2")
+
+def apply_index_settings(collection):
+    """
+    Sets ef_search on an existing collection. Chroma reads it when the index
+    is loaded, so this has to run before the collection's first query in the
+    process. The settings fixed at creation are only compared, since changing
+    them means rebuilding the index.
+    """
+    current = (collection.configuration or {}).get("hnsw") or {}
+    wanted = hnsw_configuration()["hnsw"]
+    if current.get("ef_search") != wanted["ef_search"]:
+        collection.modify(configuration={"hnsw": {"ef_search": wanted["ef_search"]}})
+    fixed = [key for key in ("space", "max_neighbors", "ef_construction") if current.get(key, wanted[key]) != wanted[key]]
+    if fixed:
+        print(f"Collection '{collection.name}' keeps its {', '.join(f'{k}={current[k]}' for k in fixed)}; "
+              f"run reindex_embeddings.py to rebuild it with the VECTOR_INDEX_* settings")
+
 def get_collection():
     client = get_chroma_client()
     ef = get_embedding_function()
-    return client.get_or_create_collection(name="vendor_profiles", embedding_function=ef)
+    name, model = resolve_collection()
+    collection = client.get_or_create_collection(
+        name=name,
+        embedding_function=ef,
+        metadata={"embedding_model": model},
+        configuration=hnsw_configuration()
+    )
+    # Vectors from another model are meaningless (or the wrong size) for this one
+    stored = (collection.metadata or {}).get("embedding_model")
+    if stored and stored != ef.model_name:
+        raise RuntimeError(
+            f"Collection '{collection.name}' was embedded with {stored}, not {ef.model_name}; "
+            f"run reindex_embeddings.py to migrate it"
+        )
+    apply_index_settings(collection)
+    return collection
+
+@lru_cache()
+def get_gazetteer():
+    if not settings.GEO_ENABLED:
+        return None
+    return Gazetteer.load(settings.GEO_GAZETTEER_PATH)
+
+@lru_cache()
+def get_geo_index():
+    """Empty until loaded from the collection (ServiceContainer.start)."""
+    if not settings.GEO_ENABLED:
+        return None
+    return GeoIndex(cell_degrees=settings.GEO_CELL_DEGREES)
+
+@lru_cache()
+def get_lexical_index():
+    """BM25 index beside the vector store; synced with the collection in ServiceContainer.start."""
+    if not settings.LEXICAL_INDEX_ENABLED:
+        return None
+    return LexicalIndex(settings.LEXICAL_INDEX_PATH or os.path.join(settings.CHROMA_DB_DIR, "lexical_index.sqlite3"))
+
+@lru_cache()
+def get_quantized_vectors():
+    """Re-rank store for compact ("@<dims>") collections; unused while the collection holds full vectors."""
+    if not settings.VECTOR_RERANK_ENABLED:
+        return None
+    return QuantizedVectorStore(
+        settings.VECTOR_RERANK_STORE_PATH or os.path.join(settings.CHROMA_DB_DIR, "quantized_vectors.sqlite3")
+    )
+
+@lru_cache()
+def get_reranker():
+    """Second search stage picked by SEARCH_RERANKER; None keeps the first-stage order."""
+    if settings.SEARCH_RERANKER == "none":
+        return None
+    if settings.SEARCH_RERANKER == "features":
+        return FeatureReranker(
+            similarity_weight=settings.RERANK_WEIGHT_SIMILARITY,
+            category_weight=settings.RERANK_WEIGHT_CATEGORY,
+            location_weight=settings.RERANK_WEIGHT_LOCATION,
+            freshness_weight=settings.RERANK_WEIGHT_FRESHNESS,
+            freshness_half_life_days=settings.RERANK_FRESHNESS_HALF_LIFE_DAYS,
+        )
+    raise ValueError(f"Unknown SEARCH_RERANKER: {settings.SEARCH_RERANKER}")
+
+@lru_cache()
+def get_rerank_features():
+    """Empty until loaded from the collection (ServiceContainer.start)."""
+    if settings.SEARCH_RERANKER == "none":
+        return None
+    return RerankFeatureIndex()
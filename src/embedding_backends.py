@@ -0,0 +1,236 @@
+import os
+import threading
+from typing import List, Optional, Tuple
+
+import numpy as np
+from chromadb.api.types import Documents, EmbeddingFunction, Embeddings
+from google import genai
+
+from src.embedding_batcher import EmbeddingBatcher
+from src.embedding_cache import EmbeddingCache
+
+
+class EmbeddingError(RuntimeError):
+    """An embedding backend could not embed its input."""
+
+
+def split_dimensions(model_name: str) -> Tuple[str, int]:
+    """"models/gemini-embedding-001@256" -> ("models/gemini-embedding-001", 256); no suffix -> 0 (full size)."""
+    base, sep, dims = model_name.rpartition("@")
+    if not sep or not dims.isdigit():
+        return model_name, 0
+    return base, int(dims)
+
+
+def truncate_embeddings(vectors, dimensions: int) -> np.ndarray:
+    """
+    Matryoshka-style truncation: the leading `dimensions` components,
+    re-normalized to unit length (what Gemini's output_dimensionality returns).
+    """
+    out = np.asarray(vectors, dtype=np.float32)[:, :dimensions]
+    norms = np.linalg.norm(out, axis=1, keepdims=True)
+    return out / np.clip(norms, 1e-12, None)
+
+
+class CachedEmbeddingFunction(EmbeddingFunction):
+    """
+    Chroma embedding function front shared by the backends: the two-tier
+    embedding cache, then micro-batching of concurrent misses, then the
+    backend's _embed_uncached. Failures raise EmbeddingError; returning []
+    would only make Chroma fail later with a less useful error.
+
+    A "@<dims>" suffix on model_name (compact index mode) makes __call__
+    return truncated vectors; embed_full() still returns the model's full
+    vectors, which are what the cache holds.
+    """
+
+    def __init__(
+        self,
+        model_name: str,
+        cache: EmbeddingCache = None,
+        batching: bool = False,
+        max_batch_size: int = 32,
+        max_wait_ms: float = 10.0,
+        max_concurrent_batches: int = 4,
+    ):
+        self.model_name = model_name
+        self.base_model, self.dimensions = split_dimensions(model_name)
+        self.cache = cache
+        # Concurrent cache misses are coalesced into one backend call
+        self.batcher = EmbeddingBatcher(
+            self._embed_uncached,
+            max_batch_size=max_batch_size,
+            max_wait_ms=max_wait_ms,
+            max_concurrent_batches=max_concurrent_batches
+        ) if batching else None
+
+    def __call__(self, input: Documents) -> Embeddings:
+        vectors = self.embed_full(input)
+        return self.compact(vectors) if self.dimensions else vectors
+
+    def compact(self, vectors) -> Embeddings:
+        """Full vectors -> what the collection stores for this model."""
+        if not self.dimensions:
+            return list(vectors)
+        return list(truncate_embeddings(vectors, self.dimensions))
+
+    def embed_full(self, input: Documents, batched: bool = True) -> Embeddings:
+        """
+        Full vectors for input. batched=False skips the shared micro-batcher
+        (the cache still applies) for callers that already send large batches.
+        """
+        texts = list(input)
+        vectors = self.cache.get_many(texts) if self.cache else {}
+        missing = [i for i in range(len(texts)) if i not in vectors]
+        if not missing:
+            return [vectors[i] for i in range(len(texts))]
+
+        to_embed = [texts[i] for i in missing]
+        try:
+            if self.batcher and batched:
+                fresh = self.batcher.embed(to_embed)
+            else:
+                fresh = self._embed_uncached(to_embed)
+        except EmbeddingError:
+            raise
+        except Exception as e:
+            raise EmbeddingError(f"Embedding with {self.base_model} failed: {e}") from e
+        if len(fresh) != len(missing):
+            raise EmbeddingError(f"{self.base_model} returned {len(fresh)} embeddings for {len(missing)} texts")
+
+        if self.cache:
+            self.cache.put_many(to_embed, fresh)
+        for i, vector in zip(missing, fresh):
+            vectors[i] = vector
+        return [vectors[i] for i in range(len(texts))]
+
+    def _embed_uncached(self, texts: List[str]) -> Embeddings:
+        raise NotImplementedError
+
+    def warm_up(self):
+        """Loads whatever the first real query would otherwise wait for."""
+
+    def close(self):
+        if self.batcher:
+            self.batcher.close()
+
+
+class GoogleGenAIEmbeddingFunction(CachedEmbeddingFunction):
+    """
+    Gemini embedding API (EMBEDDING_MODEL_NAME="models/gemini-embedding-001").
+    Always requests the full 3072 dimensions; "@<dims>" truncation happens
+    locally so the re-rank store can keep the full vectors.
+    """
+
+    def __init__(self, api_key: str, model_name: str, **kwargs):
+        self.client = genai.Client(api_key=api_key)
+        super().__init__(model_name, **kwargs)
+
+    def _embed_uncached(self, texts: List[str]) -> Embeddings:
+        return self._embed_remote(texts)
+
+    def _embed_remote(self, texts: list) -> Embeddings:
+        response = self.client.models.embed_content(
+            model=self.base_model,
+            contents=texts
+        )
+        if response.embeddings:
+            return [e.values for e in response.embeddings]
+        return []
+
+    def close(self):
+        super().close()
+        try:
+            self.client.close()
+        except Exception as e:
+            print(f"Failed to close GenAI client: {e}")
+
+
+# Where Chroma's own default embedding function keeps all-MiniLM-L6-v2
+CHROMA_ONNX_CACHE = os.path.join(os.path.expanduser("~"), ".cache", "chroma", "onnx_models")
+
+
+class OnnxEmbeddingFunction(CachedEmbeddingFunction):
+    """
+    Local CPU embeddings from a sentence-transformers model exported to ONNX
+    (EMBEDDING_MODEL_NAME="onnx/all-MiniLM-L6-v2"). model_dir holds model.onnx
+    and tokenizer.json. Texts are length-sorted and run in padded batches, then
+    mean-pooled and L2-normalized.
+    """
+
+    def __init__(self, model_name: str, model_dir: str = "", threads: int = 0, batch_size: int = 64,
+                 max_length: int = 256, **kwargs):
+        super().__init__(model_name, **kwargs)
+        self.model_dir = model_dir or os.path.join(CHROMA_ONNX_CACHE, self.base_model.split("/", 1)[-1], "onnx")
+        self.threads = threads
+        self.batch_size = max(1, batch_size)
+        self.max_length = max_length
+        self._session = None
+        self._tokenizer = None
+        self._load_lock = threading.Lock()
+
+    def _load(self):
+        if self._session is not None:
+            return
+        with self._load_lock:
+            if self._session is None:
+                self._load_model()
+
+    def _load_model(self):
+        try:
+            import onnxruntime
+            from tokenizers import Tokenizer
+        except ImportError as e:
+            raise EmbeddingError(f"Local embeddings need onnxruntime and tokenizers: {e}") from e
+        model_path = os.path.join(self.model_dir, "model.onnx")
+        tokenizer_path = os.path.join(self.model_dir, "tokenizer.json")
+        if not os.path.exists(model_path) and self.base_model == "onnx/all-MiniLM-L6-v2":
+            # Same files Chroma's default embedding function uses; fetched once
+            from chromadb.utils.embedding_functions import ONNXMiniLM_L6_V2
+            try:
+                ONNXMiniLM_L6_V2()._download_model_if_not_exists()
+            except Exception as e:
+                raise EmbeddingError(f"Could not download {self.base_model}: {e}") from e
+        if not (os.path.exists(model_path) and os.path.exists(tokenizer_path)):
+            raise EmbeddingError(f"model.onnx and tokenizer.json not found in {self.model_dir}")
+
+        tokenizer = Tokenizer.from_file(tokenizer_path)
+        tokenizer.enable_truncation(max_length=self.max_length)
+        tokenizer.enable_padding(pad_id=0, pad_token="[PAD]")  # to the longest text in the batch
+
+        options = onnxruntime.SessionOptions()
+        options.intra_op_num_threads = self.threads  # 0 = one per core
+        options.inter_op_num_threads = 1
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        session = onnxruntime.InferenceSession(model_path, options, providers=["CPUExecutionProvider"])
+        self._inputs = {i.name for i in session.get_inputs()}
+        self._tokenizer, self._session = tokenizer, session
+
+    def _embed_uncached(self, texts: List[str]) -> Embeddings:
+        self._load()
+        # Similar lengths share a batch, so little compute goes to padding
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        out: List[Optional[np.ndarray]] = [None] * len(texts)
+        for start in range(0, len(order), self.batch_size):
+            batch = order[start:start + self.batch_size]
+            for i, vector in zip(batch, self._forward([texts[i] for i in batch])):
+                out[i] = vector
+        return out
+
+    def _forward(self, texts: List[str]) -> np.ndarray:
+        encoded = self._tokenizer.encode_batch(texts)
+        input_ids = np.array([e.ids for e in encoded], dtype=np.int64)
+        mask = np.array([e.attention_mask for e in encoded], dtype=np.int64)
+        feeds = {"input_ids": input_ids, "attention_mask": mask}
+        if "token_type_ids" in self._inputs:
+            feeds["token_type_ids"] = np.zeros_like(input_ids)
+        hidden = self._session.run(None, {k: v for k, v in feeds.items() if k in self._inputs})[0]
+        if hidden.ndim == 3:
+            weights = mask[:, :, None].astype(np.float32)
+            hidden = (hidden * weights).sum(axis=1) / np.clip(weights.sum(axis=1), 1e-9, None)
+        norms = np.linalg.norm(hidden, axis=1, keepdims=True)
+        return (hidden / np.clip(norms, 1e-12, None)).astype(np.float32)
+
+    def warm_up(self):
+        # Session load plus a first run that sizes ONNX Runtime's buffers
+        self._embed_uncached(["warm up"])
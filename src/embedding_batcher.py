@@ -0,0 +1,148 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, List, Sequence
+
+# Pushed onto the queue to stop the collector thread
+_STOP = object()
+
+
+class EmbeddingBatcher:
+    """
+    Groups concurrent embedding requests into one batched remote call.
+
+    Callers block in embed() while a collector thread gathers pending texts and
+    flushes them when max_batch_size texts are waiting or max_wait_ms has passed
+    since the first one arrived. Each caller gets back exactly its own vectors.
+    """
+
+    def __init__(
+        self,
+        embed_fn: Callable[[List[str]], List[List[float]]],
+        max_batch_size: int = 32,
+        max_wait_ms: float = 10.0,
+        max_concurrent_batches: int = 4,
+    ):
+        self.embed_fn = embed_fn
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+
+        self._queue: "queue.Queue" = queue.Queue()
+        # Guards _closed so nothing can be enqueued behind _STOP
+        self._lock = threading.Lock()
+        self._closed = False
+        self._executor = ThreadPoolExecutor(
+            max_workers=max(1, max_concurrent_batches), thread_name_prefix="embedding-batch"
+        )
+
+        self._stats_lock = threading.Lock()
+        self.requests = 0
+        self.batches = 0
+        self.texts_embedded = 0
+        self.largest_batch = 0
+
+        self._thread = threading.Thread(target=self._collect, name="embedding-batcher", daemon=True)
+        self._thread.start()
+
+    def embed(self, texts: Sequence[str]) -> List[List[float]]:
+        texts = list(texts)
+        if not texts:
+            return []
+        future: Future = Future()
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("EmbeddingBatcher is closed")
+            self._queue.put((texts, future))
+        return future.result()
+
+    def _collect(self):
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                return
+
+            batch = [item]
+            pending = len(item[0])
+            deadline = time.monotonic() + self.max_wait
+            stopping = False
+
+            while pending < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+                pending += len(item[0])
+
+            self._executor.submit(self._flush, batch)
+            if stopping:
+                return
+
+    def _flush(self, batch: list):
+        # Identical texts from different callers (popular queries) are embedded once
+        unique: List[str] = []
+        index = {}
+        for texts, _ in batch:
+            for text in texts:
+                if text not in index:
+                    index[text] = len(unique)
+                    unique.append(text)
+
+        try:
+            vectors: List[List[float]] = []
+            for start in range(0, len(unique), self.max_batch_size):
+                chunk = unique[start:start + self.max_batch_size]
+                result = self.embed_fn(chunk)
+                if len(result) != len(chunk):
+                    raise RuntimeError(f"Expected {len(chunk)} embeddings, got {len(result)}")
+                vectors.extend(result)
+                with self._stats_lock:
+                    self.batches += 1
+                    self.texts_embedded += len(chunk)
+                    self.largest_batch = max(self.largest_batch, len(chunk))
+        except Exception as e:
+            for _, future in batch:
+                future.set_exception(e)
+            return
+
+        with self._stats_lock:
+            self.requests += len(batch)
+        for texts, future in batch:
+            future.set_result([vectors[index[text]] for text in texts])
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            return {
+                "requests": self.requests,
+                "batches": self.batches,
+                "texts_embedded": self.texts_embedded,
+                "largest_batch": self.largest_batch,
+                "avg_batch_size": round(self.texts_embedded / self.batches, 2) if self.batches else 0.0,
+                "queued": self._queue.qsize(),
+            }
+
+    def close(self):
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._queue.put(_STOP)
+        self._thread.join(timeout=5)
+        self._executor.shutdown(wait=True)
+
+        # Whatever the collector did not take (it timed out, or died) would
+        # otherwise leave its callers blocked in future.result() forever
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not _STOP and not item[1].done():
+                item[1].set_exception(RuntimeError("EmbeddingBatcher is closed"))
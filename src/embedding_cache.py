@@ -0,0 +1,170 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import unicodedata
+from array import array
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence
+
+
+def normalize_text(text: str) -> str:
+    """
+    Canonical form used for cache keys: NFKC, lower-cased, whitespace collapsed.
+    "Bakery  near me" and "bakery near me" therefore share one vector.
+    """
+    text = unicodedata.normalize("NFKC", text or "")
+    return " ".join(text.lower().split())
+
+
+def embedding_key(model_name: str, text: str) -> str:
+    # The model name is part of the key so switching EMBEDDING_MODEL_NAME can
+    # never silently return vectors produced by the previous model.
+    payload = f"{model_name}\x00{normalize_text(text)}".encode("utf-8")
+    return hashlib.sha256(payload).hexdigest()
+
+
+class EmbeddingCache:
+    """
+    Two-tier embedding cache keyed by (model name, normalized text hash).
+
+    - Tier 1: bounded in-memory LRU of float32 arrays (~12 KB per 3072-dim
+      vector instead of ~100 KB as a list of Python floats).
+    - Tier 2: SQLite file (usually next to CHROMA_DB_DIR) that survives
+      restarts, capped at max_disk_rows; the oldest writes are evicted first.
+    """
+
+    def __init__(
+        self,
+        model_name: str,
+        db_path: Optional[str] = None,
+        max_memory_items: int = 10000,
+        max_disk_rows: int = 20000,
+    ):
+        self.model_name = model_name
+        self.max_memory_items = max_memory_items
+        self.max_disk_rows = max_disk_rows
+        self._memory: "OrderedDict[str, array]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.disk_evictions = 0
+
+        self._db = None
+        self._disk_rows = 0
+        if db_path:
+            os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings ("
+                " key TEXT PRIMARY KEY,"
+                " model TEXT NOT NULL,"
+                " vector BLOB NOT NULL)"
+            )
+            self._db.commit()
+            # Counted once here; put_many and eviction keep it current
+            self._disk_rows = self._db.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    def get_many(self, texts: Sequence[str]) -> Dict[int, List[float]]:
+        """
+        Looks up every text and returns {position: vector} for the hits.
+        Positions missing from the result must be embedded by the caller.
+        """
+        found: Dict[int, List[float]] = {}
+        disk_lookups: Dict[str, List[int]] = {}
+
+        with self._lock:
+            for i, text in enumerate(texts):
+                key = embedding_key(self.model_name, text)
+                vector = self._memory.get(key)
+                if vector is not None:
+                    self._memory.move_to_end(key)
+                    self.memory_hits += 1
+                    found[i] = vector.tolist()
+                else:
+                    disk_lookups.setdefault(key, []).append(i)
+
+            if disk_lookups and self._db is not None:
+                keys = list(disk_lookups)
+                # Stay well below SQLite's bound-parameter limit
+                for start in range(0, len(keys), 500):
+                    chunk = keys[start:start + 500]
+                    placeholders = ",".join("?" * len(chunk))
+                    rows = self._db.execute(
+                        f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})",
+                        chunk
+                    ).fetchall()
+                    for key, blob in rows:
+                        vector = array("f", blob)
+                        self._remember(key, vector)
+                        values = vector.tolist()
+                        for i in disk_lookups.pop(key):
+                            self.disk_hits += 1
+                            found[i] = values
+
+            self.misses += sum(len(positions) for positions in disk_lookups.values())
+
+        return found
+
+    def put_many(self, texts: Sequence[str], vectors: Sequence[List[float]]):
+        rows = {}
+        with self._lock:
+            for text, vector in zip(texts, vectors):
+                key = embedding_key(self.model_name, text)
+                vector = array("f", vector)
+                self._remember(key, vector)
+                rows[key] = (key, self.model_name, vector.tobytes())
+
+            if rows and self._db is not None:
+                # Delete-then-insert instead of INSERT OR REPLACE: same effect
+                # (a rewritten key gets a new rowid), but the row counts tell
+                # how many keys are new, so the table is never re-counted
+                replaced = self._db.executemany(
+                    "DELETE FROM embeddings WHERE key = ?", [(key,) for key in rows]
+                ).rowcount
+                self._db.executemany("INSERT INTO embeddings (key, model, vector) VALUES (?, ?, ?)", rows.values())
+                self._disk_rows += len(rows) - max(replaced, 0)
+                self._evict_disk()
+                self._db.commit()
+
+    def _evict_disk(self):
+        # A rewritten key gets a new rowid, so the lowest rowids are the
+        # entries written longest ago
+        excess = self._disk_rows - self.max_disk_rows
+        if self.max_disk_rows <= 0 or excess <= 0:
+            return
+        self._db.execute(
+            "DELETE FROM embeddings WHERE rowid IN (SELECT rowid FROM embeddings ORDER BY rowid LIMIT ?)",
+            (excess,)
+        )
+        self._disk_rows -= excess
+        self.disk_evictions += excess
+
+    def _remember(self, key: str, vector: array):
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_items:
+            self._memory.popitem(last=False)
+
+    def stats(self) -> dict:
+        hits = self.memory_hits + self.disk_hits
+        lookups = hits + self.misses
+        return {
+            "model": self.model_name,
+            "memory_items": len(self._memory),
+            "disk_rows": self._disk_rows,
+            "disk_evictions": self.disk_evictions,
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+        }
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
@@ -0,0 +1,301 @@
+import csv
+import math
+import os
+import re
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from src.collection_scan import MetadataLoader, scan_one
+from src.embedding_cache import normalize_text
+from src.vendor_filters import CITY_ALIASES, normalize_city
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE_LAT = 111.32
+
+# Bundled offline gazetteer: Indian city centres and well-known localities.
+# GEO_GAZETTEER_PATH can point to a larger file with the same columns.
+DEFAULT_GAZETTEER_PATH = os.path.join(os.path.dirname(__file__), "data", "gazetteer_in.csv")
+
+_COORDS_RE = re.compile(r"^\s*(-?\d{1,2}(?:\.\d+)?)\s*,\s*(-?\d{1,3}(?:\.\d+)?)\s*$")
+_NEAR_RE = re.compile(r"\b(?:near|nearby|around|close to|in|at)\s+(?P<place>[^?!.]+?)\s*[?!.]*$", re.IGNORECASE)
+# Hinglish puts the place first: "plumber andheri mein", "bakery koramangala ke paas"
+_POSTFIX_NEAR_RE = re.compile(
+    r"^(?P<rest>.+?)\s+(?P<place>\S+(?:\s+\S+)?)\s+(?:mein|me|ke paas|ke pass|ke nazdeek|के पास|में)\s*[?!.]*$",
+    re.IGNORECASE,
+)
+_TOKEN_RE = re.compile(r"[^\w]+")
+_GEOHASH_ALPHABET = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+
+def haversine_km(lat1: float, lon1: float, lat2, lon2):
+    """Great-circle distance; lat2/lon2 may be numpy arrays."""
+    lat1, lon1 = math.radians(lat1), math.radians(lon1)
+    lat2, lon2 = np.radians(lat2), np.radians(lon2)
+    a = np.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
+
+
+def geohash_encode(lat: float, lon: float, precision: int = 7) -> str:
+    """Standard base32 geohash (precision 7 is about 150 m)."""
+    lat_range, lon_range = [-90.0, 90.0], [-180.0, 180.0]
+    bits, bit_count, even, out = 0, 0, True, []
+    while len(out) < precision:
+        rng, value = (lon_range, lon) if even else (lat_range, lat)
+        mid = (rng[0] + rng[1]) / 2
+        bits <<= 1
+        if value >= mid:
+            bits |= 1
+            rng[0] = mid
+        else:
+            rng[1] = mid
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            out.append(_GEOHASH_ALPHABET[bits])
+            bits, bit_count = 0, 0
+    return "".join(out)
+
+
+def parse_coordinates(value) -> Optional[Tuple[float, float]]:
+    """"12.97,77.59" (ONDC gps format) -> (lat, lon), or None."""
+    match = _COORDS_RE.match(str(value or ""))
+    if not match:
+        return None
+    lat, lon = float(match.group(1)), float(match.group(2))
+    if -90 <= lat <= 90 and -180 <= lon <= 180:
+        return lat, lon
+    return None
+
+
+class Place:
+    __slots__ = ("name", "city", "lat", "lon", "kind")
+
+    def __init__(self, name: str, city: str, lat: float, lon: float, kind: str):
+        self.name = name
+        self.city = city
+        self.lat = lat
+        self.lon = lon
+        self.kind = kind  # "locality", "city" or "point" (explicit coordinates)
+
+    def __repr__(self):
+        return f"Place({self.name!r}, {self.city!r}, {self.lat}, {self.lon}, {self.kind!r})"
+
+
+class Gazetteer:
+    """
+    Offline geocoder: matches locality and city names (and their aliases)
+    inside free-text locations such as "Shop 4, 5th Block Koramangala".
+    """
+
+    def __init__(self, places: List[Place]):
+        self._localities: Dict[str, List[Place]] = {}
+        self._cities: Dict[str, Place] = {}
+        for place in places:
+            if place.kind == "city":
+                self._cities[place.city] = place
+            else:
+                self._localities.setdefault(normalize_text(place.name), []).append(place)
+        self._max_words = max((len(name.split()) for name in self._localities), default=1)
+
+    @classmethod
+    def load(cls, path: str = "") -> "Gazetteer":
+        places = []
+        with open(path or DEFAULT_GAZETTEER_PATH, newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                places.append(Place(row["name"], row["city"], float(row["lat"]), float(row["lon"]), row["kind"]))
+        return cls(places)
+
+    def __len__(self) -> int:
+        return len(self._cities) + sum(len(p) for p in self._localities.values())
+
+    def geocode(self, text: Optional[str]) -> Optional[Place]:
+        """Most specific match: coordinates, then a locality, then the city centre."""
+        coords = parse_coordinates(text)
+        if coords:
+            return Place(str(text).strip(), "", coords[0], coords[1], "point")
+        normalized = normalize_text(text or "")
+        if not normalized or normalized == "unknown":
+            return None
+
+        # Cities beyond the alias table (a larger gazetteer) are matched by the last part ("Ward 4, Ranchi")
+        city = normalize_city(normalized) or normalized.split(",")[-1].strip()
+        tokens = [t for t in _TOKEN_RE.split(normalized) if t]
+        for size in range(min(self._max_words, len(tokens)), 0, -1):
+            for i in range(len(tokens) - size + 1):
+                candidates = self._localities.get(" ".join(tokens[i:i + size]))
+                if candidates:
+                    # Same locality name in several cities: prefer the one the text mentions
+                    for place in candidates:
+                        if place.city == city:
+                            return place
+                    return candidates[0]
+        if city in CITY_ALIASES or city in self._cities:
+            return self._cities.get(city)
+        return None
+
+    def split_place(self, query: str) -> Tuple[str, Optional[Place]]:
+        """
+        "electrician near Koramangala" -> ("electrician", <Koramangala>).
+        The query comes back unchanged when it names no known place.
+        """
+        match = _NEAR_RE.search(query or "")
+        if match:
+            place = self.geocode(match.group("place"))
+            rest = query[:match.start()].strip(" ,")
+            if place is not None and rest:
+                return rest, place
+        match = _POSTFIX_NEAR_RE.match(query or "")
+        if match:
+            place = self.geocode(match.group("place"))
+            if place is not None:
+                return match.group("rest").strip(" ,"), place
+        return query, None
+
+
+class GeoIndex:
+    """
+    In-memory grid index over vendor coordinates: fixed lat/lon cells of
+    `cell_degrees` (0.05 deg is about 5.5 km) holding numpy coordinate
+    arrays, so radius and nearest-k queries only touch nearby cells.
+    Thread-safe; onboarding and searches run on the Chroma thread pool.
+    """
+
+    def __init__(self, cell_degrees: float = 0.05):
+        self.cell_degrees = cell_degrees
+        self._cells: Dict[Tuple[int, int], "_Cell"] = {}
+        self._where: Dict[str, Tuple[int, int]] = {}
+        self._lock = threading.Lock()
+        self.queries = 0
+        self.candidates_scanned = 0
+
+    def _cell_of(self, lat: float, lon: float) -> Tuple[int, int]:
+        return int(math.floor(lat / self.cell_degrees)), int(math.floor(lon / self.cell_degrees))
+
+    def __len__(self) -> int:
+        return len(self._where)
+
+    def add(self, vendor_id: str, lat: float, lon: float):
+        with self._lock:
+            self._remove(vendor_id)
+            key = self._cell_of(lat, lon)
+            cell = self._cells.get(key)
+            if cell is None:
+                cell = self._cells[key] = _Cell()
+            cell.add(vendor_id, lat, lon)
+            self._where[vendor_id] = key
+
+    def add_many(self, rows):
+        """rows: iterable of (vendor_id, lat, lon)."""
+        for vendor_id, lat, lon in rows:
+            self.add(vendor_id, lat, lon)
+
+    def remove(self, vendor_id: str):
+        with self._lock:
+            self._remove(vendor_id)
+
+    def _remove(self, vendor_id: str):
+        key = self._where.pop(vendor_id, None)
+        if key is not None:
+            cell = self._cells[key]
+            cell.remove(vendor_id)
+            if not cell.ids:
+                del self._cells[key]
+
+    def add_metadata(self, ids: List[str], metadatas: List[dict]):
+        """Indexes (or un-indexes) vendors from their Chroma metadata."""
+        for vendor_id, meta in zip(ids, metadatas):
+            if meta and "lat" in meta and "lon" in meta:
+                self.add(vendor_id, meta["lat"], meta["lon"])
+            else:
+                self.remove(vendor_id)
+
+    def load(self, collection, batch_size: int = 5000) -> int:
+        """Builds the index from the lat/lon stored in the collection's metadata."""
+        return scan_one(collection, MetadataLoader(self), batch_size)
+
+    def within(self, lat: float, lon: float, radius_km: float, limit: Optional[int] = None) -> List[Tuple[str, float]]:
+        """(vendor_id, km) within radius_km, nearest first."""
+        dlat = radius_km / KM_PER_DEGREE_LAT
+        dlon = radius_km / (KM_PER_DEGREE_LAT * max(math.cos(math.radians(min(abs(lat) + dlat, 89.9))), 1e-6))
+        lo, hi = self._cell_of(lat - dlat, lon - dlon), self._cell_of(lat + dlat, lon + dlon)
+        with self._lock:
+            cells = [
+                self._cells[(i, j)].arrays()
+                for i in range(lo[0], hi[0] + 1) for j in range(lo[1], hi[1] + 1) if (i, j) in self._cells
+            ]
+        return self._rank(lat, lon, cells, radius_km, limit)
+
+    def nearest(self, lat: float, lon: float, k: int, max_radius_km: float = 500.0) -> List[Tuple[str, float]]:
+        """The k nearest vendors (within max_radius_km), nearest first."""
+        ci, cj = self._cell_of(lat, lon)
+        max_ring = int(max_radius_km / (KM_PER_DEGREE_LAT * self.cell_degrees * max(math.cos(math.radians(lat)), 0.1))) + 1
+        found, ring = 0, 0
+        with self._lock:
+            # Grow square rings of cells until they hold k vendors...
+            while ring <= max_ring:
+                for i in range(ci - ring, ci + ring + 1):
+                    for j in range(cj - ring, cj + ring + 1):
+                        if max(abs(i - ci), abs(j - cj)) == ring and (i, j) in self._cells:
+                            found += len(self._cells[(i, j)].ids)
+                if found >= k:
+                    break
+                ring += 1
+        if not found:
+            return []
+        # ...then an exact radius query out to the farthest corner of those rings
+        radius = min(max_radius_km, (ring + 1) * self.cell_degrees * KM_PER_DEGREE_LAT * math.sqrt(2))
+        return self.within(lat, lon, radius, limit=k)
+
+    def _rank(self, lat, lon, cells, radius_km, limit) -> List[Tuple[str, float]]:
+        self.queries += 1
+        if not cells:
+            return []
+        ids = np.concatenate([c[0] for c in cells])
+        lats = np.concatenate([c[1] for c in cells])
+        lons = np.concatenate([c[2] for c in cells])
+        self.candidates_scanned += len(ids)
+        km = haversine_km(lat, lon, lats, lons)
+        inside = np.flatnonzero(km <= radius_km)
+        if limit is not None and len(inside) > limit:
+            inside = inside[np.argpartition(km[inside], limit - 1)[:limit]]
+        order = inside[np.argsort(km[inside], kind="stable")]
+        return list(zip(ids[order].tolist(), km[order].tolist()))
+
+    def stats(self) -> dict:
+        return {
+            "vendors": len(self._where),
+            "cells": len(self._cells),
+            "queries": self.queries,
+            "avg_candidates": round(self.candidates_scanned / self.queries, 1) if self.queries else 0.0,
+        }
+
+
+class _Cell:
+    __slots__ = ("ids", "lats", "lons", "_arrays")
+
+    def __init__(self):
+        self.ids: List[str] = []
+        self.lats: List[float] = []
+        self.lons: List[float] = []
+        self._arrays = None
+
+    def add(self, vendor_id: str, lat: float, lon: float):
+        self.ids.append(vendor_id)
+        self.lats.append(lat)
+        self.lons.append(lon)
+        self._arrays = None
+
+    def remove(self, vendor_id: str):
+        i = self.ids.index(vendor_id)
+        for values in (self.ids, self.lats, self.lons):
+            values[i] = values[-1]
+            values.pop()
+        self._arrays = None
+
+    def arrays(self):
+        # Cached numpy view, rebuilt only after the cell changes
+        if self._arrays is None:
+            self._arrays = (np.array(self.ids, dtype=object), np.asarray(self.lats), np.asarray(self.lons))
+        return self._arrays
@@ -0,0 +1,49 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Hashable
+
+
+class IdempotencyStore:
+    """
+    Remembers recently seen keys (e.g. Telegram update_ids) for ttl_seconds so
+    redelivered webhooks are acknowledged without being processed again.
+    Bounded by max_entries; the oldest keys are evicted first.
+    """
+
+    def __init__(self, ttl_seconds: float = 3600, max_entries: int = 100000):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._seen: "OrderedDict[Hashable, float]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.duplicates = 0
+
+    def first_seen(self, key: Hashable) -> bool:
+        """Records `key`; returns False if it was already seen inside the TTL window."""
+        now = time.monotonic()
+        with self._lock:
+            self._expire(now)
+            if key in self._seen:
+                self.duplicates += 1
+                return False
+            self._seen[key] = now + self.ttl_seconds
+            if len(self._seen) > self.max_entries:
+                self._seen.popitem(last=False)
+            return True
+
+    def forget(self, key: Hashable):
+        """Drops `key`, e.g. when it could not be queued and must be accepted on redelivery."""
+        with self._lock:
+            self._seen.pop(key, None)
+
+    def _expire(self, now: float):
+        # Insertion order == expiry order, so expired keys are at the front
+        while self._seen:
+            key, expires_at = next(iter(self._seen.items()))
+            if expires_at > now:
+                break
+            self._seen.popitem(last=False)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"entries": len(self._seen), "duplicates": self.duplicates}
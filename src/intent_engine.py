@@ -0,0 +1,244 @@
+import asyncio
+import math
+import re
+import threading
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+INTENTS = ("onboard", "search", "unknown")
+
+# ---- Tier 1: compiled keyword / regex rules (English, Hindi, Hinglish) ----
+# Each pattern carries a weight; strong phrases ("register my shop") decide on
+# their own, weak cues ("my shop", "near me") need support from another match.
+# "want/need to <list, register, sell, ...>" is onboarding, so the generic
+# want/need search cues skip it instead of outvoting the onboard match.
+_ONBOARD_VERBS = r"(list|register|add|enrol+|onboard|sign ?up|join|sell|put)"
+
+_RULES: Dict[str, List[Tuple[str, float]]] = {
+    "onboard": [
+        (r"\b(register|registration|enrol+|onboard|sign ?up)\b", 1.0),
+        (r"\b(list|add|join|put)\b.{0,20}\b(my|our)\b.{0,20}\b(shop|store|business|dukaa?n|company|stall)\b", 1.0),
+        (r"\b(join|list on|sell on)\b.{0,10}\bondc\b", 1.0),
+        (r"\b(want|wants|like|need|wish|how (can|do) (i|we)|help (me|us))\b.{0,5}\bto " + _ONBOARD_VERBS + r"\b", 1.0),
+        (r"\b(add|list|register|onboard) (me|us)\b|\bas an? (seller|vendor|merchant)\b", 1.0),
+        (r"\bget (my|our)\b.{0,25}\blisted\b", 1.0),
+        (r"\b(i|we) (sell|run|own|have a|make)\b", 0.6),
+        (r"\b(my|our) (shop|store|business|bakery|restaurant|salon|workshop|stall)\b", 0.5),
+        # Hinglish
+        (r"\b(meri|mera|hamari|hamara) (dukaa?n|shop|business|dhanda|kaam)\b", 0.6),
+        (r"\b(register|add|jod|judna|jodna|listing)\b.{0,15}\b(karo|karna|kar do|karwana|hai)\b", 1.0),
+        (r"\b(bechta|bechti|bechte) (hu|hoon|hain|hai)\b", 0.6),
+        (r"\b(apni|apna|meri|mera|hamari|hamara) (dukaa?n|shop|store|business)\b.{0,20}\b(add|online|list|register|daal)", 1.0),
+        # Hindi (Devanagari); \b does not apply to these scripts
+        (r"(रजिस्टर|पंजीकरण|पंजीकृत|जोड़ना|जोड़ें|जुड़ना)", 1.0),
+        (r"(मेरी दुकान|मेरा व्यवसाय|मेरा बिज़नेस|हमारी दुकान)", 0.6),
+        (r"(बेचता|बेचती|बेचते)", 0.6),
+    ],
+    "search": [
+        (r"\b(find|search|searching|looking for|look for|locate)\b", 1.0),
+        (r"\b(where can i|where to|who sells|who can|any .{0,20} (near|in|around))\b", 1.0),
+        (r"\b(i|we) (need|want|require)\b(?!.{0,5}\bto " + _ONBOARD_VERBS + r"\b)", 0.7),
+        (r"\b(need|want|buy|get me|show me|recommend|suggest)\b(?!.{0,5}\bto " + _ONBOARD_VERBS + r"\b)", 0.5),
+        (r"\b(near me|nearby|near by|around me|close to)\b", 0.6),
+        # Hinglish
+        (r"\b(chahiye|chaiye|chahie|dhoondh?o?|dhundh?o?|dhund raha|batao|kahan mileg[ai]|kaha mileg[ai]|kahan hai)\b", 1.0),
+        (r"\b(paas mein|nazdeek)\b", 0.6),
+        # Hindi (Devanagari)
+        (r"(चाहिए|ढूंढ|ढूँढ|खोज|कहाँ मिलेग|कहां मिलेग|बताइए|बताओ)", 1.0),
+        (r"(पास में|नज़दीक|नजदीक)", 0.6),
+    ],
+    "unknown": [
+        (r"^\W*(hi+|hello+|hey+|hii+|namaste|namaskar|good (morning|evening|afternoon)|thanks?|thank you|ok(ay)?|"
+         r"नमस्ते|नमस्कार|धन्यवाद)\W*$", 1.0),
+    ],
+}
+
+_COMPILED = {
+    intent: [(re.compile(pattern, re.IGNORECASE), weight) for pattern, weight in rules]
+    for intent, rules in _RULES.items()
+}
+
+# Request phrasing stripped from search messages before they are embedded
+_SEARCH_FILLER = re.compile(
+    r"\b(please|pls|plz|can you|could you|kindly|i am|i'm|im|we are|"
+    r"find( me)?|search( for)?|searching( for)?|looking for|look for|locate|show me|get me|"
+    r"i need|we need|i want( to buy)?|we want( to buy)?|need|want to buy|where can i (get|buy|find)|who sells|"
+    r"recommend|suggest|some|any|a good|good|"
+    r"mujhe|hume|humein|koi|chahiye|chaiye|chahie|batao|bataiye|dhoondh?o?|dhundh?o?|dhund raha( hoon| hu)?|"
+    r"kahan mileg[ai]|kaha mileg[ai])\b"
+    r"|(मुझे|हमें|कोई|चाहिए|बताइए|बताओ|ढूंढ रहा हूँ|ढूंढ रही हूँ|कहाँ मिलेग[ाी]|कहां मिलेग[ाी])",
+    re.IGNORECASE,
+)
+
+
+def extract_search_query(message: str) -> str:
+    """
+    Local stand-in for the LLM's cleaned search query: drops request phrasing
+    ("find me", "chahiye", ...) so the embedding reflects what is wanted.
+    Returns the original text if nothing meaningful is left.
+    """
+    cleaned = _SEARCH_FILLER.sub(" ", message or "")
+    cleaned = re.sub(r"\s+", " ", re.sub(r"^[\s,.!?]+|[\s,.!?]+$", "", cleaned)).strip()
+    cleaned = re.sub(r"^(a|an|the|ek)\s+", "", cleaned, flags=re.IGNORECASE)
+    return cleaned if len(cleaned) >= 2 else (message or "").strip()
+
+
+# ---- Tier 2: labelled examples for the nearest-centroid classifier ----
+SEED_EXAMPLES: Dict[str, List[str]] = {
+    "onboard": [
+        "Register my bakery in Delhi",
+        "I want to list my grocery store on ONDC",
+        "Please add my electronics shop in Indiranagar",
+        "We sell handmade pottery in Jaipur, how do we join",
+        "I run a tailoring shop in Pune and want more customers",
+        "Sign up my restaurant, we are in Koramangala",
+        "meri dukaan register karo, kapde bechta hoon",
+        "mera kirana store hai Lucknow mein, list karna hai",
+        "मेरी दुकान को ONDC पर जोड़ना है",
+        "मैं दिल्ली में मिठाई बेचता हूँ, रजिस्टर करें",
+    ],
+    "search": [
+        "Find electricians nearby",
+        "I need a plumber in Bangalore",
+        "Looking for organic vegetables",
+        "Where can I buy a laptop charger",
+        "Any bakery near Koramangala",
+        "Show me tailors in Pune",
+        "mujhe electrician chahiye",
+        "paas mein koi medical store batao",
+        "मुझे प्लंबर चाहिए",
+        "दिल्ली में अच्छी मिठाई की दुकान कहाँ मिलेगी",
+    ],
+    "unknown": [
+        "Hi",
+        "Hello there",
+        "Thanks",
+        "What is this?",
+        "Who are you",
+        "ok",
+        "namaste",
+        "How does this work",
+        "नमस्ते",
+        "good morning",
+    ],
+}
+
+
+class IntentResult:
+    __slots__ = ("intent", "confidence", "tier")
+
+    def __init__(self, intent: str, confidence: float, tier: str):
+        self.intent = intent
+        self.confidence = confidence
+        self.tier = tier
+
+    def __repr__(self):
+        return f"IntentResult({self.intent!r}, confidence={self.confidence:.2f}, tier={self.tier!r})"
+
+
+def classify_rules(message: str) -> IntentResult:
+    """
+    Tier 1. Confidence is the winning intent's share of the matched weight,
+    scaled down when the evidence is only weak cues.
+    """
+    text = (message or "").strip()
+    scores = {intent: 0.0 for intent in INTENTS}
+    for intent, rules in _COMPILED.items():
+        for pattern, weight in rules:
+            if pattern.search(text):
+                scores[intent] += weight
+
+    total = sum(scores.values())
+    if total == 0:
+        return IntentResult("unknown", 0.0, "rules")
+    intent = max(scores, key=scores.get)
+    confidence = (scores[intent] / total) * min(1.0, scores[intent])
+    return IntentResult(intent, round(confidence, 4), "rules")
+
+
+def _normalize(vector) -> List[float]:
+    norm = math.sqrt(sum(x * x for x in vector)) or 1.0
+    return [x / norm for x in vector]
+
+
+class CentroidClassifier:
+    """
+    Tier 2. Mean embedding per intent over the labelled examples; a message is
+    assigned to the closest centroid. Confidence is the softmax probability of
+    the winning centroid, so near-ties between intents come out low.
+    Embeddings go through the shared embedding function and therefore its cache.
+    """
+
+    def __init__(self, embedding_function, examples: Dict[str, List[str]] = None, temperature: float = 0.05):
+        self.embedding_function = embedding_function
+        self.examples = examples or SEED_EXAMPLES
+        self.temperature = temperature
+        self._centroids: Optional[Dict[str, List[float]]] = None
+        self._lock = threading.Lock()
+
+    def _ensure_centroids(self) -> Dict[str, List[float]]:
+        with self._lock:
+            if self._centroids is None:
+                centroids = {}
+                for intent, texts in self.examples.items():
+                    vectors = [_normalize(v) for v in self.embedding_function(texts)]
+                    if len(vectors) != len(texts):
+                        raise RuntimeError("Could not embed intent examples")
+                    centroids[intent] = _normalize([sum(col) / len(vectors) for col in zip(*vectors)])
+                self._centroids = centroids
+            return self._centroids
+
+    def classify(self, message: str) -> IntentResult:
+        centroids = self._ensure_centroids()
+        embeddings = self.embedding_function([message])
+        if not len(embeddings):
+            return IntentResult("unknown", 0.0, "centroid")
+        vector = _normalize(embeddings[0])
+        sims = {intent: sum(a * b for a, b in zip(vector, c)) for intent, c in centroids.items()}
+        peak = max(sims.values())
+        weights = {intent: math.exp((s - peak) / self.temperature) for intent, s in sims.items()}
+        intent = max(sims, key=sims.get)
+        return IntentResult(intent, round(weights[intent] / sum(weights.values()), 4), "centroid")
+
+
+class IntentEngine:
+    """
+    Tiered intent classification for the chat bots:
+    1. regex rules (microseconds), 2. nearest centroid over cached embeddings,
+    3. the LLM, only when both local tiers are below their confidence thresholds.
+    """
+
+    def __init__(
+        self,
+        centroid: Optional[CentroidClassifier] = None,
+        rules_min_confidence: float = 0.8,
+        centroid_min_confidence: float = 0.8,
+    ):
+        self.centroid = centroid
+        self.rules_min_confidence = rules_min_confidence
+        self.centroid_min_confidence = centroid_min_confidence
+        self.tier_counts = {"rules": 0, "centroid": 0, "llm": 0}
+        self.intent_counts = {intent: 0 for intent in INTENTS}
+
+    async def classify(self, message: str, llm_fallback: Callable[[str], Awaitable[str]] = None) -> IntentResult:
+        result = classify_rules(message)
+        if result.confidence < self.rules_min_confidence and self.centroid is not None:
+            try:
+                candidate = await asyncio.to_thread(self.centroid.classify, message)
+                if candidate.confidence >= self.centroid_min_confidence:
+                    result = candidate
+            except Exception as e:
+                print(f"Centroid intent classification failed: {e}")
+        if result.tier == "rules" and result.confidence < self.rules_min_confidence and llm_fallback is not None:
+            result = IntentResult(await llm_fallback(message), 1.0, "llm")
+
+        self.tier_counts[result.tier] += 1
+        self.intent_counts[result.intent] = self.intent_counts.get(result.intent, 0) + 1
+        return result
+
+    def stats(self) -> dict:
+        answered = sum(self.tier_counts.values())
+        return {
+            "tiers": dict(self.tier_counts),
+            "intents": dict(self.intent_counts),
+            "llm_rate": round(self.tier_counts["llm"] / answered, 4) if answered else 0.0,
+        }
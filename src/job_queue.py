@@ -0,0 +1,301 @@
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional
+
+from src.metrics import LatencyRecorder
+
+
+class QueueFullError(Exception):
+    """Raised by enqueue() when the queue is at max_depth (backpressure)."""
+
+
+class Job:
+    __slots__ = ("id", "kind", "payload", "enqueued_at", "deadline", "ordering_key")
+
+    def __init__(self, kind: str, payload: dict, deadline: Optional[float] = None,
+                 job_id: Optional[str] = None, enqueued_at: Optional[float] = None,
+                 ordering_key: Optional[str] = None):
+        self.id = job_id or str(uuid.uuid4())
+        self.kind = kind
+        self.payload = payload
+        # Jobs sharing an ordering key (e.g. one Telegram chat) run one at a time, in order
+        self.ordering_key = ordering_key
+        # Wall-clock seconds, so deadlines survive a restart of the durable backend
+        self.enqueued_at = enqueued_at if enqueued_at is not None else time.time()
+        self.deadline = deadline
+
+    def remaining(self) -> Optional[float]:
+        if self.deadline is None:
+            return None
+        return self.deadline - time.time()
+
+
+JobHandler = Callable[[Job], Awaitable[Any]]
+
+
+class JobQueue:
+    """
+    Base class for the work queue that runs Beckn searches and bot messages
+    outside the request handlers.
+
+    A fixed pool of asyncio workers pulls jobs, drops ones whose deadline has
+    already passed (e.g. a Beckn search past its context ttl) and runs the
+    handler registered for the job kind, bounded by the remaining deadline.
+    Jobs with the same ordering_key never run concurrently: a worker that
+    takes a job whose key is busy parks it behind the running one, and the
+    worker owning the key drains the parked jobs in arrival order. This relies
+    on _take() handing out jobs in queue order.
+    Subclasses only implement storage: _put, _take, _finish and depth.
+    """
+
+    def __init__(self, workers: int = 4, max_depth: int = 10000):
+        self.workers = workers
+        self.max_depth = max_depth
+        self._handlers: Dict[str, JobHandler] = {}
+        self._tasks = []
+        self._active_keys: Dict[str, Deque[Job]] = {}
+        self._parked = 0
+
+        self.enqueued = 0
+        self.completed = 0
+        self.failed = 0
+        self.expired = 0
+        self.rejected = 0
+        self.wait_time = LatencyRecorder()
+        self.run_time = LatencyRecorder()
+
+    def register(self, kind: str, handler: JobHandler):
+        self._handlers[kind] = handler
+
+    async def enqueue(self, kind: str, payload: dict, ttl_seconds: Optional[float] = None,
+                      ordering_key: Optional[str] = None) -> str:
+        if kind not in self._handlers:
+            raise ValueError(f"No handler registered for job kind '{kind}'")
+        if self.depth() + self._parked >= self.max_depth:
+            self.rejected += 1
+            raise QueueFullError(f"Job queue is full ({self.max_depth} pending)")
+        deadline = time.time() + ttl_seconds if ttl_seconds is not None else None
+        job = Job(kind, payload, deadline, ordering_key=ordering_key)
+        await self._put(job)
+        self.enqueued += 1
+        return job.id
+
+    async def start(self):
+        for i in range(self.workers):
+            self._tasks.append(asyncio.create_task(self._worker(), name=f"job-worker-{i}"))
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks.clear()
+
+    async def _worker(self):
+        while True:
+            job = await self._take()
+            self.wait_time.record((time.time() - job.enqueued_at) * 1000)
+            key = job.ordering_key
+            if key is None:
+                await self._run(job)
+                continue
+            if key in self._active_keys:
+                # Another worker is running this key; it will pick this job up next
+                self._active_keys[key].append(job)
+                self._parked += 1
+                continue
+            parked = self._active_keys[key] = deque()
+            try:
+                while job is not None:
+                    await self._run(job)
+                    job = parked.popleft() if parked else None
+                    if job is not None:
+                        self._parked -= 1
+            finally:
+                del self._active_keys[key]
+
+    async def _run(self, job: Job):
+        remaining = job.remaining()
+        if remaining is not None and remaining <= 0:
+            self.expired += 1
+            print(f"Job {job.kind}/{job.id} expired before it started")
+            await self._finish(job, "expired")
+            return
+
+        start = time.monotonic()
+        try:
+            await asyncio.wait_for(self._handlers[job.kind](job), timeout=remaining)
+            self.completed += 1
+            await self._finish(job, "done")
+        except asyncio.TimeoutError:
+            self.expired += 1
+            print(f"Job {job.kind}/{job.id} ran past its deadline")
+            await self._finish(job, "expired")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.failed += 1
+            print(f"Job {job.kind}/{job.id} failed: {e}")
+            await self._finish(job, "failed")
+        finally:
+            self.run_time.record((time.monotonic() - start) * 1000)
+
+    async def _put(self, job: Job):
+        raise NotImplementedError
+
+    async def _take(self) -> Job:
+        raise NotImplementedError
+
+    async def _finish(self, job: Job, status: str):
+        pass
+
+    def depth(self) -> int:
+        raise NotImplementedError
+
+    def stats(self) -> dict:
+        return {
+            "backend": type(self).__name__,
+            "workers": self.workers,
+            "depth": self.depth(),
+            "parked": self._parked,
+            "enqueued": self.enqueued,
+            "completed": self.completed,
+            "failed": self.failed,
+            "expired": self.expired,
+            "rejected": self.rejected,
+            "wait_time": self.wait_time.summary(),
+            "run_time": self.run_time.summary(),
+        }
+
+    async def aclose(self):
+        await self.stop()
+
+
+class InMemoryJobQueue(JobQueue):
+    """asyncio.Queue backend: fastest, but pending jobs are lost on restart."""
+
+    def __init__(self, workers: int = 4, max_depth: int = 10000):
+        super().__init__(workers, max_depth)
+        self._queue: "asyncio.Queue[Job]" = asyncio.Queue()
+
+    async def _put(self, job: Job):
+        self._queue.put_nowait(job)
+
+    async def _take(self) -> Job:
+        return await self._queue.get()
+
+    def depth(self) -> int:
+        return self._queue.qsize()
+
+
+class SQLiteJobQueue(JobQueue):
+    """
+    Durable backend: jobs are rows in a SQLite file and survive restarts.
+    Jobs that were running when the process died are re-queued on start.
+    """
+
+    def __init__(self, db_path: str, workers: int = 4, max_depth: int = 10000, poll_interval: float = 0.5):
+        super().__init__(workers, max_depth)
+        self.poll_interval = poll_interval
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        self._db = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            " id TEXT PRIMARY KEY,"
+            " kind TEXT NOT NULL,"
+            " payload TEXT NOT NULL,"
+            " status TEXT NOT NULL DEFAULT 'queued',"
+            " enqueued_at REAL NOT NULL,"
+            " deadline REAL,"
+            " ordering_key TEXT)"
+        )
+        columns = {row[1] for row in self._db.execute("PRAGMA table_info(jobs)")}
+        if "ordering_key" not in columns:
+            self._db.execute("ALTER TABLE jobs ADD COLUMN ordering_key TEXT")
+        self._db.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, enqueued_at)")
+        self._lock = threading.Lock()
+        self._wakeup: Optional[asyncio.Event] = None
+        # Claims are serialised so workers receive jobs in queue order (ordering keys)
+        self._claim_lock: Optional[asyncio.Lock] = None
+        self._depth = self._count_queued()
+
+    def _count_queued(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM jobs WHERE status = 'queued'").fetchone()[0]
+
+    async def start(self):
+        self._wakeup = asyncio.Event()
+        self._claim_lock = asyncio.Lock()
+        with self._lock:
+            recovered = self._db.execute("UPDATE jobs SET status = 'queued' WHERE status = 'running'").rowcount
+        if recovered:
+            print(f"Re-queued {recovered} job(s) interrupted by the last shutdown")
+        self._depth = self._count_queued()
+        await super().start()
+
+    async def _put(self, job: Job):
+        def insert():
+            with self._lock:
+                self._db.execute(
+                    "INSERT INTO jobs (id, kind, payload, enqueued_at, deadline, ordering_key)"
+                    " VALUES (?, ?, ?, ?, ?, ?)",
+                    (job.id, job.kind, json.dumps(job.payload), job.enqueued_at, job.deadline, job.ordering_key)
+                )
+        await asyncio.to_thread(insert)
+        self._depth += 1
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def _claim(self) -> Optional[Job]:
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._db.execute(
+                    "SELECT id, kind, payload, enqueued_at, deadline, ordering_key FROM jobs"
+                    " WHERE status = 'queued' ORDER BY enqueued_at, rowid LIMIT 1"
+                ).fetchone()
+                if row:
+                    self._db.execute("UPDATE jobs SET status = 'running' WHERE id = ?", (row[0],))
+                self._db.execute("COMMIT")
+            except Exception:
+                self._db.execute("ROLLBACK")
+                raise
+        if not row:
+            return None
+        return Job(row[1], json.loads(row[2]), deadline=row[4], job_id=row[0], enqueued_at=row[3], ordering_key=row[5])
+
+    async def _take(self) -> Job:
+        while True:
+            async with self._claim_lock:
+                # Cleared before claiming: an enqueue() that lands while the
+                # claim runs leaves the event set, so its wake is not lost
+                self._wakeup.clear()
+                job = await asyncio.to_thread(self._claim)
+            if job is not None:
+                self._depth = max(0, self._depth - 1)
+                return job
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _finish(self, job: Job, status: str):
+        def delete():
+            # Finished jobs are removed; only queued/running rows are kept
+            with self._lock:
+                self._db.execute("DELETE FROM jobs WHERE id = ?", (job.id,))
+        await asyncio.to_thread(delete)
+
+    def depth(self) -> int:
+        return self._depth
+
+    async def aclose(self):
+        await super().aclose()
+        with self._lock:
+            self._db.close()
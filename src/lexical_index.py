@@ -0,0 +1,190 @@
+import os
+import re
+import sqlite3
+import threading
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+from src.collection_scan import scan_one
+from src.embedding_cache import normalize_text
+
+_WORD_RE = re.compile(r"\w+")
+# Query words that never help a lexical match ("bakery near me" -> bakery)
+_STOPWORDS = {
+    "a", "an", "the", "in", "at", "on", "of", "for", "to", "and", "or", "near", "me", "my", "with", "from",
+    "is", "are", "i", "we", "ka", "ki", "ke", "mein", "me", "se", "aur",
+}
+# bm25() column weights: name, place, category, contact, body
+_WEIGHTS = (4.0, 2.0, 2.0, 4.0, 1.0)
+
+
+def _contact_terms(contact: Optional[str]) -> str:
+    # "+91 98765-43210" -> "919876543210 9876543210", so the bare 10-digit
+    # number and its prefixes ("9876*") match too
+    digits = re.sub(r"\D", "", contact or "")
+    if not digits:
+        return normalize_text(contact or "")
+    return f"{digits} {digits[-10:]}" if len(digits) > 10 else digits
+
+
+def match_expression(query: str) -> str:
+    """
+    FTS5 MATCH expression for a free-text query: any of its words, with
+    number fragments (4+ digits) matched as prefixes.
+    """
+    terms = []
+    for word in _WORD_RE.findall(normalize_text(query)):
+        if word in _STOPWORDS:
+            continue
+        term = f'"{word}"'
+        if word.isdigit() and len(word) >= 4:
+            term += "*"
+        if term not in terms:
+            terms.append(term)
+    return " OR ".join(terms)
+
+
+class LexicalIndex:
+    """
+    BM25 retriever over vendor name, place, category, contact and document
+    text, backed by a SQLite FTS5 inverted index next to the vector store.
+    Updated on every onboard/delete, so lexical search needs no embedding
+    call and keeps working when the embedding API is slow or down.
+    """
+
+    def __init__(self, db_path: str):
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        self._lock = threading.Lock()
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS lexical_docs ("
+            " rowid INTEGER PRIMARY KEY,"
+            " vendor_id TEXT UNIQUE NOT NULL,"
+            " city TEXT,"
+            " category_key TEXT,"
+            " doc_hash TEXT)"
+        )
+        self._db.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS lexical_fts USING fts5("
+            " name, place, category, contact, body,"
+            " tokenize='unicode61 remove_diacritics 2', prefix='4')"
+        )
+        self._db.commit()
+        self.queries = 0
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM lexical_docs").fetchone()[0]
+
+    def upsert(self, vendor_id: str, metadata: dict, document: str):
+        self.upsert_many([(vendor_id, metadata, document)])
+
+    def upsert_many(self, records: Iterable[Tuple[str, dict, str]]):
+        """records: (vendor_id, Chroma metadata, embedded document text)."""
+        with self._lock:
+            with self._db:
+                for vendor_id, meta, document in records:
+                    self._delete(vendor_id)
+                    cursor = self._db.execute(
+                        "INSERT INTO lexical_docs (vendor_id, city, category_key, doc_hash) VALUES (?, ?, ?, ?)",
+                        (vendor_id, meta.get("city", ""), meta.get("category_key", ""), meta.get("doc_hash", ""))
+                    )
+                    self._db.execute(
+                        "INSERT INTO lexical_fts (rowid, name, place, category, contact, body) VALUES (?, ?, ?, ?, ?, ?)",
+                        (cursor.lastrowid, meta.get("name", ""), meta.get("location", ""), meta.get("category", ""),
+                         _contact_terms(meta.get("contact")), document or "")
+                    )
+
+    def remove(self, vendor_id: str):
+        with self._lock:
+            with self._db:
+                self._delete(vendor_id)
+
+    def _delete(self, vendor_id: str):
+        row = self._db.execute("SELECT rowid FROM lexical_docs WHERE vendor_id = ?", (vendor_id,)).fetchone()
+        if row:
+            self._db.execute("DELETE FROM lexical_fts WHERE rowid = ?", row)
+            self._db.execute("DELETE FROM lexical_docs WHERE rowid = ?", row)
+
+    def search(self, query: str, limit: int, city: Optional[str] = None, category_key: Optional[str] = None,
+               ids: Optional[Sequence[str]] = None) -> List[Tuple[str, float]]:
+        """(vendor_id, bm25 score) best first; higher scores are better matches."""
+        expression = match_expression(query)
+        if not expression or limit <= 0:
+            return []
+        sql = (
+            f"SELECT d.vendor_id, bm25(lexical_fts, {', '.join(map(str, _WEIGHTS))}) AS rank"
+            " FROM lexical_fts JOIN lexical_docs d ON d.rowid = lexical_fts.rowid"
+            " WHERE lexical_fts MATCH ?"
+        )
+        params: list = [expression]
+        if city:
+            sql += " AND d.city = ?"
+            params.append(city)
+        if category_key:
+            sql += " AND d.category_key = ?"
+            params.append(category_key)
+        if ids is not None:
+            if not ids:
+                return []
+            sql += f" AND d.vendor_id IN ({', '.join('?' * len(ids))})"
+            params.extend(ids)
+        sql += " ORDER BY rank LIMIT ?"
+        params.append(limit)
+        with self._lock:
+            self.queries += 1
+            rows = self._db.execute(sql, params).fetchall()
+        # FTS5's bm25() is negated so that ORDER BY ascending puts the best first
+        return [(vendor_id, -rank) for vendor_id, rank in rows]
+
+    def sync(self, collection, batch_size: int = 1000) -> dict:
+        """
+        Brings the index in line with the collection: indexes vendors that are
+        missing, whose document changed (doc_hash) or whose filter keys were
+        rewritten (backfill_vendor_filters.py), and drops deleted ones. Only
+        the changed vendors' documents are read from Chroma.
+        """
+        return scan_one(collection, self.syncer(collection), batch_size)
+
+    def syncer(self, collection) -> "_LexicalSync":
+        """sync() as a scan_metadata consumer, so startup can share one pass over the collection."""
+        return _LexicalSync(self, collection)
+
+    def stats(self) -> dict:
+        return {"documents": len(self), "queries": self.queries}
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+class _LexicalSync:
+    def __init__(self, index: LexicalIndex, collection):
+        self.index = index
+        self.collection = collection
+        with index._lock:
+            self.known = {
+                vendor_id: tuple(keys) for vendor_id, *keys in
+                index._db.execute("SELECT vendor_id, doc_hash, city, category_key FROM lexical_docs")
+            }
+        self.seen = set()
+        self.added = 0
+
+    def page(self, ids: List[str], metadatas: List[dict]):
+        stale = [
+            vendor_id for vendor_id, meta in zip(ids, metadatas)
+            if self.known.get(vendor_id) != tuple(
+                (meta or {}).get(key, "") for key in ("doc_hash", "city", "category_key")
+            )
+        ]
+        self.seen.update(ids)
+        if stale:
+            docs = self.collection.get(ids=stale, include=["metadatas", "documents"])
+            self.index.upsert_many(zip(docs["ids"], [m or {} for m in docs["metadatas"]], docs["documents"]))
+            self.added += len(stale)
+
+    def finish(self) -> dict:
+        removed = [vendor_id for vendor_id in self.known if vendor_id not in self.seen]
+        for vendor_id in removed:
+            self.index.remove(vendor_id)
+        return {"indexed": self.added, "removed": len(removed), "total": len(self.seen)}
@@ -0,0 +1,41 @@
+import threading
+from collections import deque
+from typing import Deque
+
+
+class LatencyRecorder:
+    """
+    Keeps the most recent latency samples (milliseconds) and reports percentiles.
+    Bounded, so it is safe to leave running in a long-lived process.
+    """
+
+    def __init__(self, max_samples: int = 2048):
+        self._samples: Deque[float] = deque(maxlen=max_samples)
+        self._lock = threading.Lock()
+        self.count = 0
+        self.total_ms = 0.0
+
+    def record(self, ms: float):
+        with self._lock:
+            self._samples.append(ms)
+            self.count += 1
+            self.total_ms += ms
+
+    def summary(self) -> dict:
+        with self._lock:
+            samples = sorted(self._samples)
+            count, total = self.count, self.total_ms
+
+        def pct(p: float) -> float:
+            if not samples:
+                return 0.0
+            return round(samples[min(len(samples) - 1, int(len(samples) * p))], 3)
+
+        return {
+            "count": count,
+            "avg_ms": round(total / count, 3) if count else 0.0,
+            "p50_ms": pct(0.50),
+            "p95_ms": pct(0.95),
+            "p99_ms": pct(0.99),
+            "max_ms": round(samples[-1], 3) if samples else 0.0,
+        }
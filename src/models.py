@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Literal
 
 # --- Requests ---
 class VendorOnboardRequest(BaseModel):
@@ -13,6 +13,22 @@ class VendorOnboardRequest(BaseModel):
 class VendorSearchRequest(BaseModel):
     query: str
     limit: int = 3
+    # inline: summary in the response | none: skip the LLM
+    # deferred: fetch later via summary_id | stream: NDJSON vendors then summary
+    summary: Literal["inline", "none", "deferred", "stream"] = "inline"
+    # Optional filters, matched on normalized city / category ("Bangalore" == "bengaluru")
+    location: Optional[str] = None
+    category: Optional[str] = None
+    # Soft city: vendors there rank higher (with a re-ranker), nobody is filtered out
+    prefer_location: Optional[str] = None
+    # Geo search around a point (lat/lon, or a place / "lat,lon" in `near`):
+    # within radius_km, or the nearest vendors when no radius is given
+    near: Optional[str] = None
+    lat: Optional[float] = Field(default=None, ge=-90, le=90)
+    lon: Optional[float] = Field(default=None, ge=-180, le=180)
+    radius_km: Optional[float] = Field(default=None, gt=0)
+    # Retrieval mode; defaults to SEARCH_MODE. "lexical" needs no embedding call
+    mode: Optional[Literal["vector", "hybrid", "lexical"]] = None
 
 # --- Responses ---
 class VendorResponse(BaseModel):
@@ -21,8 +37,26 @@ class VendorResponse(BaseModel):
     location: str
     category: str
     contact: str
-    score: float
+    score: float  # first-stage distance, lower is better
+    relevance: Optional[float] = None  # 0-1, higher is better; set when SEARCH_RERANKER is on
+    distance_km: Optional[float] = None  # set for geo searches
 
 class SearchResponse(BaseModel):
     ai_summary: str
     vendors: List[VendorResponse]
+    summary_status: Literal["complete", "skipped", "pending"] = "complete"
+    summary_id: Optional[str] = None
+
+class SummaryResponse(BaseModel):
+    summary_id: str
+    summary_status: Literal["complete", "pending", "failed"]
+    ai_summary: Optional[str] = None
+
+# --- Bots ---
+class MessageAnalysis(BaseModel):
+    """Structured output of the combined intent + vendor extraction LLM call."""
+    intent: Literal["onboard", "search", "unknown"]
+    name: Optional[str] = None
+    location: Optional[str] = None
+    category: Optional[str] = None
+    search_query: Optional[str] = None
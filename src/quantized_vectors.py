@@ -0,0 +1,153 @@
+import os
+import sqlite3
+import threading
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from src.collection_scan import scan_one
+
+
+def quantize_int8(vectors) -> Tuple[np.ndarray, np.ndarray]:
+    """Symmetric per-vector int8: x ~= codes * scale, scale = max|x| / 127."""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    scales = np.abs(vectors).max(axis=1) / 127.0
+    scales[scales == 0] = 1.0
+    codes = np.clip(np.rint(vectors / scales[:, None]), -127, 127).astype(np.int8)
+    return codes, scales.astype(np.float32)
+
+
+class QuantizedVectorStore:
+    """
+    Full-dimensional vendor embeddings as int8 (a quarter of float32), kept in
+    SQLite beside a compact ("@<dims>") collection. The collection's HNSW
+    index only holds truncated vectors, so it stays small enough for RAM; its
+    top candidates are re-scored here against the full query vector, which
+    recovers most of the recall truncation loses. Rows are keyed by collection,
+    so a shadow collection built by a re-index gets its own set.
+    """
+
+    def __init__(self, db_path: str):
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        self._lock = threading.Lock()
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS quantized_vectors ("
+            " collection TEXT NOT NULL,"
+            " vendor_id TEXT NOT NULL,"
+            " doc_hash TEXT NOT NULL,"
+            " scale REAL NOT NULL,"
+            " norm REAL NOT NULL,"
+            " codes BLOB NOT NULL,"
+            " PRIMARY KEY (collection, vendor_id)) WITHOUT ROWID"
+        )
+        self._db.commit()
+
+    def upsert(self, collection: str, vendor_ids: Sequence[str], vectors, doc_hashes: Optional[Sequence[str]] = None):
+        if not len(vendor_ids):
+            return
+        codes, scales = quantize_int8(vectors)
+        # Norm of the dequantized vector, so scores() is a cosine without recomputing it
+        norms = np.linalg.norm(codes.astype(np.float32), axis=1) * scales
+        doc_hashes = doc_hashes or [""] * len(vendor_ids)
+        with self._lock:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO quantized_vectors (collection, vendor_id, doc_hash, scale, norm, codes)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                [
+                    (collection, vendor_id, doc_hash, float(scale), float(norm), row.tobytes())
+                    for vendor_id, doc_hash, scale, norm, row in zip(vendor_ids, doc_hashes, scales, norms, codes)
+                ]
+            )
+            self._db.commit()
+
+    def remove(self, collection: str, vendor_ids: Sequence[str]):
+        with self._lock:
+            self._db.executemany(
+                "DELETE FROM quantized_vectors WHERE collection = ? AND vendor_id = ?",
+                [(collection, vendor_id) for vendor_id in vendor_ids]
+            )
+            self._db.commit()
+
+    def drop(self, collection: str):
+        with self._lock:
+            self._db.execute("DELETE FROM quantized_vectors WHERE collection = ?", (collection,))
+            self._db.commit()
+
+    def scores(self, collection: str, query_vector, vendor_ids: Sequence[str]) -> Dict[str, float]:
+        """Cosine similarity of `query_vector` to each stored vendor; vendors not stored are left out."""
+        if not len(vendor_ids):
+            return {}
+        with self._lock:
+            rows = self._db.execute(
+                f"SELECT vendor_id, scale, norm, codes FROM quantized_vectors WHERE collection = ?"
+                f" AND vendor_id IN ({', '.join('?' * len(vendor_ids))})", (collection, *vendor_ids)
+            ).fetchall()
+        if not rows:
+            return {}
+        query = np.asarray(query_vector, dtype=np.float32)
+        query = query / max(float(np.linalg.norm(query)), 1e-12)
+        codes = np.frombuffer(b"".join(row[3] for row in rows), dtype=np.int8).reshape(len(rows), -1)
+        if codes.shape[1] != query.shape[0]:
+            raise ValueError(f"Stored vectors have {codes.shape[1]} dimensions, the query has {query.shape[0]}")
+        scales = np.array([row[1] for row in rows], dtype=np.float32)
+        norms = np.array([row[2] for row in rows], dtype=np.float32)
+        similarities = (codes.astype(np.float32) @ query) * scales / np.clip(norms, 1e-12, None)
+        return {row[0]: float(s) for row, s in zip(rows, similarities)}
+
+    def count(self, collection: str) -> int:
+        with self._lock:
+            return self._db.execute(
+                "SELECT COUNT(*) FROM quantized_vectors WHERE collection = ?", (collection,)
+            ).fetchone()[0]
+
+    def sync(self, collection, embedding_function, batch_size: int = 500) -> dict:
+        """
+        Brings the store in line with `collection`: embeds vendors that are
+        missing or whose document changed (doc_hash) and drops deleted ones.
+        Documents come from the embedding cache when they were embedded before.
+        """
+        return scan_one(collection, self.syncer(collection, embedding_function, batch_size), batch_size)
+
+    def syncer(self, collection, embedding_function, embed_batch: int = 500) -> "_QuantizedSync":
+        """sync() as a scan_metadata consumer, so startup can share one pass over the collection."""
+        return _QuantizedSync(self, collection, embedding_function, embed_batch)
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+class _QuantizedSync:
+    def __init__(self, store: QuantizedVectorStore, collection, embedding_function, embed_batch: int):
+        self.store = store
+        self.collection = collection
+        self.embedding_function = embedding_function
+        self.embed_batch = embed_batch
+        with store._lock:
+            self.known = dict(store._db.execute(
+                "SELECT vendor_id, doc_hash FROM quantized_vectors WHERE collection = ?", (collection.name,)
+            ))
+        self.seen = set()
+        self.added = 0
+
+    def page(self, ids: List[str], metadatas: List[dict]):
+        stale = [
+            vendor_id for vendor_id, meta in zip(ids, metadatas)
+            if vendor_id not in self.known or self.known[vendor_id] != (meta or {}).get("doc_hash", "")
+        ]
+        self.seen.update(ids)
+        # Shared scan pages can be larger than one embedding round trip should be
+        for start in range(0, len(stale), self.embed_batch):
+            chunk = stale[start:start + self.embed_batch]
+            docs = self.collection.get(ids=chunk, include=["metadatas", "documents"])
+            vectors = self.embedding_function.embed_full([doc or "" for doc in docs["documents"]])
+            self.store.upsert(self.collection.name, docs["ids"], vectors,
+                              [(meta or {}).get("doc_hash", "") for meta in docs["metadatas"]])
+            self.added += len(chunk)
+
+    def finish(self) -> dict:
+        removed = [vendor_id for vendor_id in self.known if vendor_id not in self.seen]
+        self.store.remove(self.collection.name, removed)
+        return {"embedded": self.added, "removed": len(removed), "total": len(self.seen)}
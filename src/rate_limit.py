@@ -0,0 +1,83 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Hashable, Optional
+
+
+class TokenBucket:
+    """
+    Classic token bucket: `rate` tokens per second, holding at most `burst`.
+    Not thread-safe on its own; KeyedRateLimiter serialises access.
+    """
+
+    __slots__ = ("rate", "burst", "tokens", "updated")
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_take(self, tokens: float = 1.0, now: Optional[float] = None) -> bool:
+        self._refill(now if now is not None else time.monotonic())
+        if self.tokens >= tokens:
+            self.tokens -= tokens
+            return True
+        return False
+
+    def take_or_wait(self, tokens: float = 1.0, now: Optional[float] = None) -> float:
+        """Takes `tokens` and returns 0, or returns the seconds to wait without taking any."""
+        wait = self.wait_time(tokens, now)
+        if wait == 0.0:
+            self.tokens -= tokens
+        return wait
+
+    def wait_time(self, tokens: float = 1.0, now: Optional[float] = None) -> float:
+        """Seconds until `tokens` are available (0 if they already are)."""
+        self._refill(now if now is not None else time.monotonic())
+        if self.tokens >= tokens or self.rate <= 0:
+            return 0.0
+        return (tokens - self.tokens) / self.rate
+
+
+class KeyedRateLimiter:
+    """
+    One token bucket per key (chat, sender, host...). Buckets live in an LRU
+    bounded by max_keys, so a flood of one-off senders cannot grow it forever.
+    """
+
+    def __init__(self, rate_per_second: float, burst: float, max_keys: int = 10000):
+        self.rate = rate_per_second
+        self.burst = burst
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[Hashable, TokenBucket]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _bucket(self, key: Hashable) -> TokenBucket:
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = TokenBucket(self.rate, self.burst)
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+        return bucket
+
+    def allow(self, key: Hashable, tokens: float = 1.0) -> bool:
+        with self._lock:
+            return self._bucket(key).try_take(tokens)
+
+    def wait_time(self, key: Hashable, tokens: float = 1.0) -> float:
+        with self._lock:
+            return self._bucket(key).wait_time(tokens)
+
+    def take_or_wait(self, key: Hashable, tokens: float = 1.0) -> float:
+        with self._lock:
+            return self._bucket(key).take_or_wait(tokens)
+
+    def __len__(self) -> int:
+        return len(self._buckets)
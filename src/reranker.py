@@ -0,0 +1,195 @@
+import sys
+import threading
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from src.collection_scan import MetadataLoader, scan_one
+from src.embedding_cache import normalize_text
+from src.vendor_filters import mentioned_category, mentioned_city, normalize_category
+
+SECONDS_PER_DAY = 86400.0
+
+
+def duplicate_key(meta: dict) -> str:
+    """
+    Same vendor registered twice: the same normalized name in the same city,
+    and the same phone number when one is known. A phone alone is not enough
+    (bot users register every shop they own under their own number, and
+    listed head-office numbers are shared); it only stands in for the name
+    when the name is missing.
+    """
+    digits = "".join(ch for ch in str(meta.get("contact") or "") if ch.isdigit())[-10:]
+    name = normalize_text(meta.get("name") or "")
+    if name == "unknown":
+        name = ""
+    city = meta.get("city") or ""
+    if len(digits) == 10:
+        if name:
+            return f"contact:{digits}|name:{name}|{city}"
+        if city:
+            return f"contact:{digits}|city:{city}"
+    if not name:
+        return f"id:{meta.get('id')}"
+    return f"name:{name}|{city}"
+
+
+def _feature_row(meta: dict) -> tuple:
+    updated_at = meta.get("updated_at")
+    return (
+        sys.intern(meta.get("category_key") or ""),
+        sys.intern(meta.get("city") or ""),
+        float(updated_at) if updated_at is not None else np.nan,
+        hash(duplicate_key(meta)),
+    )
+
+
+def _feature_arrays(rows: Sequence[tuple]) -> Dict[str, np.ndarray]:
+    columns = list(zip(*rows)) if rows else [(), (), (), ()]
+    return {
+        "category_key": np.array(columns[0], dtype=object),
+        "city": np.array(columns[1], dtype=object),
+        "updated_at": np.array(columns[2], dtype=np.float64),
+        "duplicate": np.array(columns[3], dtype=np.int64),
+    }
+
+
+def candidate_features(metadatas: Sequence[dict]) -> Dict[str, np.ndarray]:
+    """Re-ranking feature columns for candidates whose metadata was read from Chroma."""
+    return _feature_arrays([_feature_row(meta or {}) for meta in metadatas])
+
+
+class RerankFeatureIndex:
+    """
+    In-memory copy of the metadata the re-ranker scores on (category_key,
+    city, updated_at, duplicate key), so the first stage can ask Chroma for
+    candidate IDs and distances only and read documents for the final
+    results alone. Kept current by onboarding, bulk onboarding and deletes;
+    vendors it has not seen (written by another process) are read from the
+    collection on first use. Thread-safe.
+    """
+
+    def __init__(self):
+        self._rows: Dict[str, tuple] = {}
+        self._lock = threading.Lock()
+        self.lookups = 0
+        self.filled = 0
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def add_metadata(self, ids: List[str], metadatas: List[dict]):
+        rows = [(vendor_id, _feature_row(meta)) for vendor_id, meta in zip(ids, metadatas) if meta]
+        with self._lock:
+            self._rows.update(rows)
+
+    def remove(self, vendor_id: str):
+        with self._lock:
+            self._rows.pop(vendor_id, None)
+
+    def load(self, collection, batch_size: int = 5000) -> int:
+        """Builds the index from the collection's metadata."""
+        return scan_one(collection, MetadataLoader(self), batch_size)
+
+    def features(self, collection, ids: List[str]) -> Dict[str, np.ndarray]:
+        """Feature columns for `ids`, in order; unknown vendors are read from `collection` first."""
+        with self._lock:
+            self.lookups += 1
+            missing = [vendor_id for vendor_id in ids if vendor_id not in self._rows]
+        if missing:
+            fetched = collection.get(ids=missing, include=["metadatas"])
+            self.add_metadata(fetched["ids"], fetched["metadatas"])
+            self.filled += len(fetched["ids"])
+        with self._lock:
+            # Deleted meanwhile: neutral features, keyed apart so dedup keeps them
+            rows = [self._rows.get(vendor_id) or ("", "", np.nan, hash(f"id:{vendor_id}")) for vendor_id in ids]
+        return _feature_arrays(rows)
+
+    def stats(self) -> dict:
+        return {"vendors": len(self), "lookups": self.lookups, "filled_from_collection": self.filled}
+
+
+class FeatureReranker:
+    """
+    Second search stage over the first-stage candidates, scored as one numpy
+    batch. Relevance is the weighted mean of the features that apply to the
+    query, each in [0, 1], so it is comparable across queries (1 = best):
+
+      similarity  first-stage similarity (embedding or fused rank)
+      category    candidate category_key == the requested category, or one named in the query
+      location    geo searches: 1 / (1 + km / scale); otherwise candidate city == the
+                  requested city key (a filter or a soft preference), or one named in the query
+      freshness   2 ** (-age / half-life) from the updated_at metadata (0.5 if unknown)
+
+    Near-duplicates (see duplicate_key) keep only their best-scored entry.
+    Any object with the same rerank() signature can replace this one; set
+    needs_documents if it scores the document text (e.g. a cross-encoder),
+    so the service reads documents for every candidate.
+    """
+
+    name = "features"
+    needs_documents = False
+
+    def __init__(self, similarity_weight: float = 0.6, category_weight: float = 0.15,
+                 location_weight: float = 0.15, freshness_weight: float = 0.1,
+                 freshness_half_life_days: float = 180.0):
+        self.weights = {
+            "similarity": similarity_weight,
+            "category": category_weight,
+            "location": location_weight,
+            "freshness": freshness_weight,
+        }
+        self.half_life_seconds = max(freshness_half_life_days, 1e-6) * SECONDS_PER_DAY
+
+    def features(self, query: str, candidates: Dict[str, np.ndarray], similarities: np.ndarray,
+                 city: Optional[str] = None, category: Optional[str] = None,
+                 distances_km: Optional[np.ndarray] = None, distance_scale: float = 1.0,
+                 now: Optional[float] = None) -> Dict[str, np.ndarray]:
+        """Feature name -> per-candidate values; features that do not apply to the query are left out."""
+        features = {"similarity": np.clip(similarities, 0.0, 1.0)}
+
+        wanted_category = normalize_category(category) or mentioned_category(query)
+        if wanted_category:
+            features["category"] = (candidates["category_key"] == wanted_category).astype(np.float64)
+
+        if distances_km is not None:
+            features["location"] = 1.0 / (1.0 + distances_km / max(distance_scale, 1e-6))
+        else:
+            wanted_city = city or mentioned_city(query)
+            if wanted_city:
+                features["location"] = (candidates["city"] == wanted_city).astype(np.float64)
+
+        updated = candidates["updated_at"]
+        if not np.isnan(updated).all():
+            age = np.clip((now or time.time()) - updated, 0.0, None)
+            features["freshness"] = np.where(np.isnan(age), 0.5, np.exp2(-age / self.half_life_seconds))
+        return features
+
+    def rerank(self, query: str, candidates: Dict[str, np.ndarray], similarities: np.ndarray,
+               documents: Optional[Sequence[str]] = None, city: Optional[str] = None,
+               category: Optional[str] = None, distances_km: Optional[np.ndarray] = None,
+               distance_scale: float = 1.0, limit: Optional[int] = None) -> List[Tuple[int, float]]:
+        """
+        (candidate index, relevance) pairs, best first, duplicates dropped;
+        at most `limit` of them. `candidates` holds the candidate_features() columns;
+        `city` is a stored city key (see vendor_service.city_key).
+        """
+        if not len(similarities):
+            return []
+        features = self.features(query, candidates, similarities, city, category, distances_km, distance_scale)
+        names = [name for name in features if self.weights.get(name, 0.0) > 0] or ["similarity"]
+        weights = np.array([self.weights.get(name) or 1.0 for name in names])
+        relevance = weights @ np.vstack([features[name] for name in names]) / weights.sum()
+
+        ranked, seen = [], set()
+        duplicates = candidates["duplicate"]
+        # Stable, so ties keep the first-stage order
+        for index in np.argsort(-relevance, kind="stable"):
+            if duplicates[index] in seen:
+                continue
+            seen.add(duplicates[index])
+            ranked.append((int(index), round(float(relevance[index]), 4)))
+            if limit is not None and len(ranked) >= limit:
+                break
+        return ranked
@@ -1,6 +1,5 @@
 from fastapi import Security, HTTPException, status
 from fastapi.security import APIKeyHeader
-from src.config import get_settings
 import os
 
 # Define the header key
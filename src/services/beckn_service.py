@@ -1,31 +1,90 @@
 from src.beckn_models import (
     BecknSearchRequest, BecknOnSearchRequest, Context, Catalog, Provider, Item, Descriptor, OnSearchMessage
 )
-from src.services.vendor_service import VendorService
+from src.services.vendor_service import VendorService, city_key
+from src.services.callback_dispatcher import CallbackDispatcher
 from src.models import VendorSearchRequest
+from src.vendor_filters import CATEGORY_ALIASES, normalize_category, normalize_city
+from src.geo import parse_coordinates
 from src.config import get_settings
-import requests
 import datetime
+import time
 
 settings = get_settings()
 
+def intent_filters(request: BecknSearchRequest):
+    """
+    (city, category, context_city) for a /search. city is the fulfillment end
+    city (or area), the place the intent names; context_city is context.city
+    (an STD code such as "std:080", "*" for all cities), which says where the
+    buyer app is rather than where the buyer wants vendors. The category
+    comes from intent.category. Values we cannot map to a known
+    city/category are dropped rather than filtering out every vendor.
+    """
+    intent = request.message.intent
+    end = ((intent.fulfillment or {}).get("end") or {}).get("location") or {}
+    address = end.get("address") or {}
+    # Resolved like stored vendor locations, so an area alone ("Koramangala") finds its city
+    city = city_key(address.get("city")) or city_key(address.get("locality"))
+    context_city = normalize_city(request.context.city)
+
+    category_data = intent.category or {}
+    category = ""
+    for candidate in (category_data.get("id"), (category_data.get("descriptor") or {}).get("name"),
+                      (category_data.get("descriptor") or {}).get("code")):
+        category = normalize_category(candidate)
+        if category in CATEGORY_ALIASES:
+            break
+        category = ""
+    return city or None, category or None, context_city or None
+
+def intent_location(request: BecknSearchRequest):
+    """
+    (lat, lon, radius_km) from intent.fulfillment.end.location: its gps and,
+    when the buyer app sends one, the circle radius. None without gps.
+    """
+    end = (((request.message.intent.fulfillment or {}).get("end") or {}).get("location")) or {}
+    circle = end.get("circle") or {}
+    coords = parse_coordinates(end.get("gps") or circle.get("gps"))
+    if coords is None:
+        return None
+    radius = circle.get("radius") or {}
+    try:
+        radius_km = float(radius.get("value"))
+        if str(radius.get("unit", "km")).lower() in ("m", "meter", "metre"):
+            radius_km /= 1000.0
+    except (TypeError, ValueError):
+        radius_km = None
+    return coords[0], coords[1], radius_km if radius_km and radius_km > 0 else None
+
 class BecknService:
-    def __init__(self):
-        self.vendor_service = VendorService()
+    def __init__(self, vendor_service: VendorService = None, dispatcher: CallbackDispatcher = None):
+        self.vendor_service = vendor_service or VendorService()
+        self.dispatcher = dispatcher or CallbackDispatcher(
+            max_concurrency_per_host=settings.BECKN_CALLBACK_MAX_CONCURRENCY_PER_HOST,
+            max_retries=settings.BECKN_CALLBACK_MAX_RETRIES,
+            backoff_seconds=settings.BECKN_CALLBACK_BACKOFF_SECONDS,
+            request_timeout=settings.HTTP_TIMEOUT_SECONDS
+        )
         self.bpp_id = "ondc-setu-node"
         self.bpp_uri = "http://localhost:8000/v1/beckn" # Placeholder
 
-    def process_search(self, request: BecknSearchRequest):
+    async def process_search(self, request: BecknSearchRequest, deadline: float = None):
         """
         Processes an incoming ONDC /search request.
         Since ONDC is async, this function should ideally be run in a background task (Celery/FastAPI BackgroundTasks).
+        `deadline` (monotonic seconds) bounds callback retries; defaults to now + context.ttl.
         """
+        if deadline is None:
+            deadline = time.monotonic() + request.context.ttl_seconds()
+
         # 1. Extract query from Intent
         query = ""
         if request.message.intent.item and request.message.intent.item.get("descriptor"):
              query = request.message.intent.item["descriptor"].get("name", "")
         elif request.message.intent.category:
-             query = request.message.intent.category.get("descriptor", {}).get("id", "")
+             category = request.message.intent.category
+             query = category.get("id") or (category.get("descriptor") or {}).get("name", "")
         
         if not query:
             query = "general search" # Fallback
@@ -33,8 +92,23 @@ class BecknService:
         print(f"DEBUG: Processing ONDC Search for '{query}'")
 
         # 2. Use our existing Intelligent Agent
-        # We perform a semantic search using the extracted intent
-        internal_results = self.vendor_service.search_vendors(VendorSearchRequest(query=query, limit=5))
+        # We perform a semantic search using the extracted intent.
+        # The catalog never carries ai_summary, so skip the LLM step.
+        # Only vendors in the intent's city / requested category are scanned.
+        city, category, context_city = intent_filters(request)
+        search = VendorSearchRequest(query=query, limit=5, summary="none", location=city, category=category)
+        # A buyer gps point ranks by distance too (within the circle, if given)
+        location = intent_location(request)
+        if location is not None:
+            search.lat, search.lon, search.radius_km = location
+            search.location = None
+        # context.city filters only when the intent names no place and stored city keys are
+        # trusted; otherwise it just ranks vendors in that city higher
+        if city is None and location is None and settings.BECKN_CONTEXT_CITY_FILTER:
+            search.location = context_city
+        else:
+            search.prefer_location = context_city
+        internal_results = await self.vendor_service.asearch_vendors(search)
 
         # 3. Transform to ONDC Catalog format
         providers = []
@@ -74,9 +148,12 @@ class BecknService:
         # 5. Send Callback (Web Hook) to the BAP (Buyer App)
         # Note: In a real deployment, BAP_URI would be a public URL
         print(f"DEBUG: Sending /on_search to {request.context.bap_uri}")
-        
-        # In a real scenario, we would do:
-        # requests.post(f"{request.context.bap_uri}/on_search", json=on_search_body.dict())
+        if settings.BECKN_SEND_CALLBACKS:
+            await self.dispatcher.send(
+                f"{request.context.bap_uri.rstrip('/')}/on_search",
+                on_search_body.model_dump(mode="json"),
+                deadline=deadline
+            )
         
         return on_search_body # Returning for demo/testing purposes
 
@@ -0,0 +1,340 @@
+import asyncio
+import json
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from src.config import get_settings
+from src.dependencies import get_gazetteer, get_intent_engine, get_llm_client
+from src.embedding_cache import normalize_text
+from src.intent_engine import IntentEngine
+from src.metrics import LatencyRecorder
+from src.models import MessageAnalysis, VendorOnboardRequest, VendorResponse, VendorSearchRequest
+from src.rate_limit import KeyedRateLimiter
+from src.services.message_analyzer import MessageAnalyzer
+from src.services.vendor_service import VendorService
+
+settings = get_settings()
+
+
+class IncomingMessage:
+    __slots__ = ("channel", "sender", "text", "user_name")
+
+    def __init__(self, channel: str, sender: str, text: str, user_name: Optional[str] = None):
+        self.channel = channel
+        self.sender = sender
+        self.text = text
+        self.user_name = user_name
+
+
+class ChannelAdapter:
+    """
+    Per-channel glue around BotCore: how replies are worded/formatted and how
+    a message enters the pipeline. The default wording is plain text; channels
+    override only what differs. A new channel is a subclass with a `name`
+    plus whatever transport code it needs to receive and deliver messages.
+    """
+
+    name = "base"
+
+    def __init__(self, core: "BotCore" = None):
+        self.core = core or BotCore()
+
+    async def receive(self, sender: str, text: str, user_name: Optional[str] = None) -> str:
+        """Runs one message through the shared pipeline and returns the reply text."""
+        return await self.core.handle(IncomingMessage(self.name, sender, text, user_name), self)
+
+    def format_onboarded(self, parsed: dict, vendor_id: str) -> str:
+        return (
+            f"Welcome to ONDC! Your business has been registered.\n\n"
+            f"Name: {parsed.get('name')}\n"
+            f"Location: {parsed.get('location')}\n"
+            f"Category: {parsed.get('category')}\n"
+            f"ID: {vendor_id}\n\n"
+            f"Buyers can now discover you on the ONDC network!"
+        )
+
+    def format_onboard_failed(self) -> str:
+        return "Sorry, we could not process your registration. Please try again."
+
+    def format_search_results(self, query: str, vendors: List[VendorResponse]) -> str:
+        reply = [f"Here are some vendors for '{query}':\n"]
+        for v in vendors:
+            reply.append(f"* {v.name} ({v.category})\n  Loc: {v.location}\n  Contact: {v.contact}\n")
+        reply.append("\nReply with a message to search again or register your own business!")
+        return "\n".join(reply)
+
+    def format_no_results(self, query: str) -> str:
+        return f"I couldn't find any vendors matching '{query}'. Try a different search."
+
+    def format_search_failed(self) -> str:
+        return "Sorry, I encountered an error while searching."
+
+    def format_welcome(self, message: IncomingMessage) -> str:
+        return (
+            "Welcome to ONDC! I didn't quite understand that.\n\n"
+            "- To register your business, describe your shop (e.g., 'Register my grocery store in Indiranagar').\n"
+            "- To find vendors, just ask (e.g., 'Find plumbers nearby')."
+        )
+
+    def format_rate_limited(self) -> str:
+        return "You're sending messages too quickly. Please wait a moment and try again."
+
+    def format_error(self) -> str:
+        return "Sorry, something went wrong. Please try again."
+
+
+class _ChannelStats:
+    def __init__(self):
+        self.messages = 0
+        self.rate_limited = 0
+        self.errors = 0
+        self.latency = LatencyRecorder()
+
+    def as_dict(self) -> dict:
+        return {
+            "messages": self.messages,
+            "rate_limited": self.rate_limited,
+            "errors": self.errors,
+            "latency": self.latency.summary(),
+        }
+
+
+class BotCore:
+    """
+    Channel-agnostic chat pipeline shared by Telegram, WhatsApp and the test
+    endpoint: rate limit -> analyse (intent engine + combined LLM call) ->
+    onboard or search -> reply text via the channel adapter.
+
+    Cross-channel concerns live here once: a per-sender token bucket, a TTL
+    cache of message analyses with single-flight de-duplication of identical
+    in-flight messages, and per-channel metrics. Embedding calls underneath
+    are already micro-batched by the shared embedding function.
+    """
+
+    def __init__(
+        self,
+        vendor_service: VendorService = None,
+        client=None,
+        intent_engine: IntentEngine = None,
+        analyzer: MessageAnalyzer = None,
+        rate_limit_per_minute: float = settings.BOT_RATE_LIMIT_PER_MINUTE,
+        rate_limit_burst: float = settings.BOT_RATE_LIMIT_BURST,
+        analysis_cache_ttl_seconds: float = settings.BOT_ANALYSIS_CACHE_TTL_SECONDS,
+        analysis_cache_max_entries: int = settings.BOT_ANALYSIS_CACHE_MAX_ENTRIES,
+    ):
+        self.client = client or get_llm_client()
+        self.vendor_service = vendor_service or VendorService(client=self.client)
+        self.intent_engine = intent_engine or get_intent_engine()
+        self.analyzer = analyzer or MessageAnalyzer(
+            self.client, self.intent_engine, combined=settings.BOT_COMBINED_ANALYSIS_ENABLED
+        )
+        self.rate_limiter = (
+            KeyedRateLimiter(rate_limit_per_minute / 60.0, rate_limit_burst) if rate_limit_per_minute > 0 else None
+        )
+        self.analysis_cache_ttl = analysis_cache_ttl_seconds
+        self.analysis_cache_max_entries = analysis_cache_max_entries
+        self._analyses: "OrderedDict[str, Tuple[float, MessageAnalysis]]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._channels: Dict[str, _ChannelStats] = {}
+        self.analysis_cache_hits = 0
+        self.analysis_cache_misses = 0
+
+    async def handle(self, message: IncomingMessage, adapter: ChannelAdapter) -> str:
+        stats = self._channels.setdefault(message.channel, _ChannelStats())
+        stats.messages += 1
+        start = time.monotonic()
+        try:
+            if self.rate_limiter is not None and not self.rate_limiter.allow((message.channel, message.sender)):
+                stats.rate_limited += 1
+                return adapter.format_rate_limited()
+
+            analysis = await self.analyze(message.text, message.sender)
+            print(f"[{message.channel}] {message.sender}: intent={analysis.intent}")
+
+            if analysis.intent == "onboard":
+                return await self.onboard(message, analysis, adapter)
+            if analysis.intent == "search":
+                return await self.perform_search(analysis.search_query or message.text, adapter)
+            return adapter.format_welcome(message)
+        except Exception as e:
+            stats.errors += 1
+            print(f"Error handling {message.channel} message: {e}")
+            return adapter.format_error()
+        finally:
+            stats.latency.record((time.monotonic() - start) * 1000)
+
+    async def analyze(self, text: str, sender: str) -> MessageAnalysis:
+        """
+        Cached, single-flight wrapper around MessageAnalyzer.analyze. The
+        analysis only depends on the text, so repeated or concurrent identical
+        messages ("hi", "find plumbers") cost one classification.
+        """
+        key = normalize_text(text)
+        entry = self._analyses.get(key)
+        if entry is not None and entry[0] > time.monotonic():
+            self._analyses.move_to_end(key)
+            self.analysis_cache_hits += 1
+            return entry[1].model_copy()
+
+        pending = self._inflight.get(key)
+        if pending is not None:
+            self.analysis_cache_hits += 1
+            return (await asyncio.shield(pending)).model_copy()
+
+        self.analysis_cache_misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            analysis = await self.analyzer.analyze(
+                text, sender, self.classify_intent_llm, self.parse_vendor_message
+            )
+            future.set_result(analysis)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # mark retrieved when nobody else was waiting
+            raise
+        finally:
+            del self._inflight[key]
+
+        if self.analysis_cache_ttl > 0:
+            self._analyses[key] = (time.monotonic() + self.analysis_cache_ttl, analysis)
+            while len(self._analyses) > self.analysis_cache_max_entries:
+                self._analyses.popitem(last=False)
+        return analysis.model_copy()
+
+    async def classify_intent(self, text: str) -> str:
+        """Intent only: local tiers first, Gemini for low-confidence messages."""
+        result = await self.intent_engine.classify(text, self.classify_intent_llm)
+        return result.intent
+
+    async def classify_intent_llm(self, text: str) -> str:
+        """
+        Uses Gemini AI to classify the user's intent.
+        Returns: "onboard", "search", or "unknown"
+        """
+        prompt = f"""You are an ONDC assistant. A user sent this message:
+
+"{text}"
+
+Classify the intent into one of these categories:
+1. "onboard" -> If the user wants to register, join, or list their business/products.
+2. "search" -> If the user is looking for a product, service, or vendor.
+3. "unknown" -> If the intent is unclear.
+
+Return ONLY the category name (onboard, search, or unknown).
+Do NOT return "Category: search" or any punctuation. Just the word."""
+
+        try:
+            response = await self.client.aio.models.generate_content(
+                model=settings.GEMINI_MODEL_NAME,
+                contents=prompt
+            )
+            raw = response.text.strip().lower()
+            if "onboard" in raw:
+                return "onboard"
+            if "search" in raw:
+                return "search"
+            return "unknown"
+        except Exception as e:
+            print(f"Intent classification failed: {e}")
+            return "unknown"
+
+    async def parse_vendor_message(self, text: str, sender: str) -> dict:
+        """
+        Uses Gemini AI to extract structured vendor information. Never raises:
+        LLM or JSON errors give "Unknown" fields.
+        """
+        prompt = f"""You are an ONDC vendor onboarding assistant.
+A vendor just sent this message to register their business:
+
+"{text}"
+
+Extract the following fields from the message. If a field is not found, use "Unknown".
+Return ONLY a valid JSON object (no markdown) with these exact keys:
+{{
+  "name": "business name",
+  "location": "city or area",
+  "category": "product/service category",
+  "contact": "{sender}"
+}}"""
+
+        try:
+            response = await self.client.aio.models.generate_content(
+                model=settings.GEMINI_MODEL_NAME,
+                contents=prompt
+            )
+            raw = response.text.strip()
+            # Clean markdown if present
+            if raw.startswith("```"):
+                raw = raw.split("\n", 1)[1].rsplit("```", 1)[0]
+            return json.loads(raw)
+        except Exception as e:
+            print(f"AI parsing failed: {e}")
+            return {
+                "name": "Unknown",
+                "location": "Unknown",
+                "category": "Unknown",
+                "contact": sender
+            }
+
+    async def onboard(self, message: IncomingMessage, analysis: MessageAnalysis, adapter: ChannelAdapter) -> str:
+        parsed = {
+            "name": analysis.name or "Unknown",
+            "location": analysis.location or "Unknown",
+            "category": analysis.category or "Unknown",
+            "contact": message.sender
+        }
+        request = VendorOnboardRequest(raw_text=message.text, **parsed)
+        result = await self.vendor_service.aonboard_vendor(request)
+        if result.get("status") == "success":
+            return adapter.format_onboarded(parsed, result.get("id"))
+        return adapter.format_onboard_failed()
+
+    async def perform_search(self, query: str, adapter: ChannelAdapter) -> str:
+        try:
+            request = self._search_request(query)
+            search_response = await self.vendor_service.asearch_vendors(request)
+            if not search_response.vendors and request.radius_km:
+                # Nothing within walking distance: fall back to the nearest matches
+                request.radius_km = None
+                search_response = await self.vendor_service.asearch_vendors(request)
+            if not search_response.vendors:
+                return adapter.format_no_results(query)
+            return adapter.format_search_results(query, search_response.vendors)
+        except Exception as e:
+            print(f"Search failed: {e}")
+            return adapter.format_search_failed()
+
+    def _search_request(self, query: str) -> VendorSearchRequest:
+        """"electrician near Koramangala" searches around Koramangala; "bakery in Pune" filters on the city."""
+        gazetteer = get_gazetteer()
+        rest, place = gazetteer.split_place(query) if gazetteer else (query, None)
+        if place is None:
+            return VendorSearchRequest(query=query, limit=3, summary="none")
+        if place.kind == "city":
+            return VendorSearchRequest(query=rest, limit=3, summary="none", location=place.city)
+        return VendorSearchRequest(
+            query=rest, limit=3, summary="none", lat=place.lat, lon=place.lon, radius_km=settings.GEO_NEAR_RADIUS_KM
+        )
+
+    def stats(self) -> dict:
+        return {
+            "channels": {name: stats.as_dict() for name, stats in self._channels.items()},
+            "analysis_cache": {
+                "hits": self.analysis_cache_hits,
+                "misses": self.analysis_cache_misses,
+                "entries": len(self._analyses),
+            },
+            "tracked_senders": len(self.rate_limiter) if self.rate_limiter is not None else 0,
+            "analyzer": self.analyzer.stats(),
+        }
+
+
+class TestChannel(ChannelAdapter):
+    """The /v1/whatsapp/test endpoint: WhatsApp wording, no Twilio."""
+
+    name = "test"
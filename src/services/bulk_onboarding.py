@@ -0,0 +1,404 @@
+import asyncio
+import csv
+import functools
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterable, AsyncIterator, Callable, Iterable, Iterator, List, Optional, Tuple
+
+from pydantic import ValidationError
+
+from src.embedding_backends import EmbeddingError
+from src.models import VendorOnboardRequest
+from src.services.vendor_service import build_document, build_metadata, same_metadata, vendor_id_for
+
+VENDOR_FIELDS = ("name", "location", "category", "contact", "raw_text")
+
+# Chroma rejects writes above its max batch size; stay comfortably below it
+MAX_CHROMA_WRITE = 5000
+
+
+class BadRow:
+    """Stands in for an upload line that could not be decoded; counted as a row error."""
+
+    def __init__(self, error: str):
+        self.error = error
+
+
+def row_to_request(row) -> VendorOnboardRequest:
+    """
+    Accepts a VendorOnboardRequest, a JSON object (or its raw NDJSON line) or
+    a CSV row. Unknown CSV columns (price, product, ...) are kept as
+    structured_data. Anything unusable raises ValueError/ValidationError so
+    the onboarder can count it as a row error.
+    """
+    if isinstance(row, VendorOnboardRequest):
+        return row
+    if isinstance(row, BadRow):
+        raise ValueError(row.error)
+    if isinstance(row, (str, bytes)):
+        row = json.loads(row)
+    if not isinstance(row, dict):
+        raise ValueError(f"Expected a JSON object, got {type(row).__name__}")
+    if "structured_data" not in row:
+        extra = {k: v for k, v in row.items() if k not in VENDOR_FIELDS and v not in (None, "")}
+        row = {k: row.get(k) or None for k in VENDOR_FIELDS}
+        row["structured_data"] = extra or None
+    return VendorOnboardRequest.model_validate(row)
+
+
+def iter_ndjson(lines: Iterable[str]) -> Iterator[str]:
+    # Lines are parsed per row in BulkOnboarder._commit, so one malformed
+    # line is a row error rather than the end of the job
+    for line in lines:
+        line = line.strip()
+        if line:
+            yield line
+
+
+def iter_csv(lines: Iterable[str]) -> Iterator[dict]:
+    yield from csv.DictReader(lines)
+
+
+async def aiter_rows(chunks: AsyncIterable[bytes], fmt: str) -> AsyncIterator:
+    """
+    Splits a streamed upload (NDJSON or CSV) into rows without buffering the
+    whole body. NDJSON lines are yielded raw (parsed by row_to_request); a
+    line that cannot be decoded becomes a BadRow. CSV rows must not contain
+    embedded newlines.
+    """
+    header = None
+    buffer = b""
+
+    def parse(raw: bytes):
+        nonlocal header
+        try:
+            line = raw.decode("utf-8-sig").rstrip("\r")
+        except UnicodeDecodeError as e:
+            return BadRow(f"Line is not valid UTF-8: {e}")
+        if not line.strip():
+            return None
+        if fmt == "ndjson":
+            return line
+        values = next(csv.reader([line]))
+        if header is None:
+            header = values
+            return None
+        return dict(zip(header, values))
+
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            row = parse(line)
+            if row is not None:
+                yield row
+    if buffer:
+        row = parse(buffer)
+        if row is not None:
+            yield row
+
+
+class BulkJobRunning(RuntimeError):
+    """A run of this job_id is already in progress in this process."""
+
+
+class BulkJobState:
+    def __init__(self, job_id: str, rows_done: int = 0, onboarded: int = 0, errors: int = 0, status: str = "running"):
+        self.job_id = job_id
+        self.rows_done = rows_done
+        self.onboarded = onboarded
+        self.errors = errors
+        self.status = status
+        self.error_samples: List[dict] = []
+        self.started = time.monotonic()
+        self.rows_at_start = rows_done
+
+    def as_dict(self) -> dict:
+        elapsed = time.monotonic() - self.started
+        processed = self.rows_done - self.rows_at_start
+        return {
+            "job_id": self.job_id,
+            "status": self.status,
+            "rows_done": self.rows_done,
+            "onboarded": self.onboarded,
+            "errors": self.errors,
+            "error_samples": self.error_samples,
+            "elapsed_seconds": round(elapsed, 3),
+            "rows_per_second": round(processed / elapsed, 1) if elapsed > 0 else 0.0,
+        }
+
+
+class BulkCheckpointStore:
+    """SQLite record of how far each bulk job got, so a crashed import can resume."""
+
+    def __init__(self, db_path: str):
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS bulk_jobs ("
+            " job_id TEXT PRIMARY KEY,"
+            " rows_done INTEGER NOT NULL,"
+            " onboarded INTEGER NOT NULL,"
+            " errors INTEGER NOT NULL,"
+            " status TEXT NOT NULL,"
+            " updated_at REAL NOT NULL)"
+        )
+        self._db.commit()
+        self._lock = threading.Lock()
+
+    def load(self, job_id: str) -> BulkJobState:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT rows_done, onboarded, errors, status FROM bulk_jobs WHERE job_id = ?", (job_id,)
+            ).fetchone()
+        if row is None:
+            return BulkJobState(job_id)
+        return BulkJobState(job_id, rows_done=row[0], onboarded=row[1], errors=row[2], status=row[3])
+
+    def save(self, state: BulkJobState):
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO bulk_jobs (job_id, rows_done, onboarded, errors, status, updated_at)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (state.job_id, state.rows_done, state.onboarded, state.errors, state.status, time.time())
+            )
+            self._db.commit()
+
+    def get(self, job_id: str) -> Optional[dict]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT rows_done, onboarded, errors, status, updated_at FROM bulk_jobs WHERE job_id = ?", (job_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        return {"job_id": job_id, "rows_done": row[0], "onboarded": row[1], "errors": row[2],
+                "status": row[3], "updated_at": row[4]}
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+class BulkOnboarder:
+    """
+    Imports large vendor registries in chunks.
+
+    Each chunk is embedded in parallel batches and written to Chroma with one
+    upsert, then the job's checkpoint advances. Vendor IDs are deterministic
+    (stable name/location/contact IDs, or (job_id, row number) when
+    stable_ids is off), so re-running a job after a crash skips committed rows
+    and rewrites a half-written chunk in place instead of duplicating it.
+    With stable IDs, vendors whose text is unchanged are not re-embedded.
+
+    Jobs run on job_executor (max_jobs at a time), apart from the pool that
+    serves searches, and one job_id runs at most once at a time: a second
+    run raises BulkJobRunning instead of racing on the checkpoint.
+    """
+
+    def __init__(
+        self,
+        collection,
+        embedding_function,
+        checkpoints: BulkCheckpointStore,
+        summary_cache=None,
+        geo_index=None,
+        lexical_index=None,
+        quantized_vectors=None,
+        rerank_features=None,
+        chunk_size: int = 500,
+        embed_batch_size: int = 100,
+        embed_concurrency: int = 4,
+        stable_ids: bool = True,
+        max_jobs: int = 2,
+    ):
+        self.collection = collection
+        self.embedding_function = embedding_function
+        self.checkpoints = checkpoints
+        self.summary_cache = summary_cache
+        self.geo_index = geo_index
+        self.lexical_index = lexical_index
+        self.quantized_vectors = quantized_vectors
+        self.rerank_features = rerank_features
+        self.chunk_size = chunk_size
+        self.embed_batch_size = embed_batch_size
+        self.stable_ids = stable_ids
+        self._embed_pool = ThreadPoolExecutor(max_workers=embed_concurrency, thread_name_prefix="bulk-embed")
+        self.job_executor = ThreadPoolExecutor(max_workers=max(1, max_jobs), thread_name_prefix="bulk-job")
+        self._running = set()
+        self._running_lock = threading.Lock()
+
+    def _claim(self, job_id: Optional[str]) -> str:
+        job_id = job_id or str(uuid.uuid4())
+        with self._running_lock:
+            if job_id in self._running:
+                raise BulkJobRunning(f"Bulk job {job_id} is already running")
+            self._running.add(job_id)
+        return job_id
+
+    def _release(self, job_id: str):
+        with self._running_lock:
+            self._running.discard(job_id)
+
+    def run(self, rows: Iterable, job_id: Optional[str] = None,
+            progress: Optional[Callable[[dict], None]] = None) -> dict:
+        job_id = self._claim(job_id)
+        try:
+            return self._run(rows, job_id, progress)
+        finally:
+            self._release(job_id)
+
+    def _run(self, rows: Iterable, job_id: str, progress) -> dict:
+        state = self.checkpoints.load(job_id)
+        state.status = "running"
+        chunk: List[Tuple[int, object]] = []
+
+        try:
+            for index, row in enumerate(rows):
+                if index < state.rows_done:
+                    continue  # committed by a previous run of this job
+                chunk.append((index, row))
+                if len(chunk) >= self.chunk_size:
+                    self._commit(state, chunk, progress)
+                    chunk = []
+            if chunk:
+                self._commit(state, chunk, progress)
+        except BaseException:
+            self._fail(state)
+            raise
+
+        state.status = "done"
+        self.checkpoints.save(state)
+        return state.as_dict()
+
+    async def arun(self, rows: AsyncIterable, job_id: Optional[str] = None, executor=None) -> dict:
+        """Same as run() for streamed uploads; chunk commits run on `executor` (default job_executor)."""
+        job_id = self._claim(job_id)
+        try:
+            return await self._arun(rows, job_id, executor or self.job_executor)
+        finally:
+            self._release(job_id)
+
+    async def _arun(self, rows: AsyncIterable, job_id: str, executor) -> dict:
+        loop = asyncio.get_running_loop()
+        state = self.checkpoints.load(job_id)
+        state.status = "running"
+        chunk: List[Tuple[int, object]] = []
+        index = 0
+
+        try:
+            async for row in rows:
+                if index >= state.rows_done:
+                    chunk.append((index, row))
+                index += 1
+                if len(chunk) >= self.chunk_size:
+                    await loop.run_in_executor(executor, self._commit, state, chunk, None)
+                    chunk = []
+            if chunk:
+                await loop.run_in_executor(executor, self._commit, state, chunk, None)
+        except BaseException:
+            # Also covers a client that disconnects mid-upload (cancellation)
+            self._fail(state)
+            raise
+
+        state.status = "done"
+        self.checkpoints.save(state)
+        return state.as_dict()
+
+    def _fail(self, state: BulkJobState):
+        # The checkpoint keeps rows_done, so re-running the job still resumes
+        state.status = "failed"
+        self.checkpoints.save(state)
+
+    def _commit(self, state: BulkJobState, chunk: List[Tuple[int, object]], progress=None):
+        records = {}
+        for index, row in chunk:
+            try:
+                data = row_to_request(row)
+            except (ValidationError, ValueError, TypeError) as e:
+                state.errors += 1
+                if len(state.error_samples) < 20:
+                    state.error_samples.append({"row": index, "error": str(e)[:200]})
+                continue
+            if self.stable_ids:
+                vendor_id = vendor_id_for(data)
+            else:
+                vendor_id = str(uuid.uuid5(uuid.NAMESPACE_URL, f"bulk:{state.job_id}:{index}"))
+            # Duplicates within a chunk collapse to the last row (Chroma rejects repeated IDs)
+            records[vendor_id] = (build_document(data), build_metadata(data, vendor_id))
+
+        if records:
+            previous = {}
+            if self.stable_ids:
+                existing = self.collection.get(ids=list(records), include=["metadatas"])
+                previous = dict(zip(existing["ids"], existing["metadatas"]))
+
+            changed = [i for i in records if previous.get(i, {}).get("doc_hash") != records[i][1]["doc_hash"]]
+            changed_set = set(changed)
+            metadata_only = [
+                i for i in records if i not in changed_set and not same_metadata(previous.get(i), records[i][1])
+            ]
+
+            if changed:
+                documents = [records[i][0] for i in changed]
+                embeddings = self._embed(documents)
+                if self._compact():
+                    self.quantized_vectors.upsert(
+                        self.collection.name, changed, embeddings, [records[i][1]["doc_hash"] for i in changed]
+                    )
+                    embeddings = self.embedding_function.compact(embeddings)
+                for start in range(0, len(changed), MAX_CHROMA_WRITE):
+                    end = start + MAX_CHROMA_WRITE
+                    self.collection.upsert(
+                        ids=changed[start:end],
+                        embeddings=embeddings[start:end],
+                        documents=documents[start:end],
+                        metadatas=[records[i][1] for i in changed[start:end]]
+                    )
+            if metadata_only:
+                self.collection.update(ids=metadata_only, metadatas=[records[i][1] for i in metadata_only])
+            if self.summary_cache and (changed or metadata_only):
+                self.summary_cache.invalidate_vendors(changed + metadata_only)
+            if self.geo_index is not None:
+                self.geo_index.add_metadata(list(records), [records[i][1] for i in records])
+            if self.rerank_features is not None:
+                self.rerank_features.add_metadata(list(records), [records[i][1] for i in records])
+            if self.lexical_index is not None and (changed or metadata_only):
+                self.lexical_index.upsert_many(
+                    (i, records[i][1], records[i][0]) for i in changed + metadata_only
+                )
+
+        state.onboarded += len(records)
+        state.rows_done = chunk[-1][0] + 1
+        self.checkpoints.save(state)
+        if progress:
+            progress(state.as_dict())
+
+    def _compact(self) -> bool:
+        return self.quantized_vectors is not None and bool(getattr(self.embedding_function, "dimensions", 0))
+
+    def _embed(self, documents: List[str]) -> list:
+        """Full vectors for a compact ("@<dims>") collection, else what the collection stores."""
+        batches = [documents[i:i + self.embed_batch_size] for i in range(0, len(documents), self.embed_batch_size)]
+        embed = self.embedding_function
+        if hasattr(embed, "embed_full"):
+            # Bypass the shared micro-batcher: it would re-chunk these batches
+            # into max_batch_size calls and make live queries wait behind them
+            full = functools.partial(embed.embed_full, batched=False)
+            embed = full if self._compact() else (lambda texts: self.embedding_function.compact(full(texts)))
+        embeddings = []
+        try:
+            for vectors in self._embed_pool.map(embed, batches):
+                embeddings.extend(vectors)
+        except EmbeddingError as e:
+            # The checkpoint has not moved, so the job can simply be re-run
+            raise RuntimeError(f"Embedding failed for a bulk chunk; re-run the job to resume ({e})") from e
+        return embeddings
+
+    def close(self):
+        self.job_executor.shutdown(wait=True)
+        self._embed_pool.shutdown(wait=True)
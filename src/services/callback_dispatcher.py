@@ -0,0 +1,138 @@
+import asyncio
+import random
+import time
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+
+import httpx
+
+from src.metrics import LatencyRecorder
+
+# Status codes worth retrying; other 4xx mean the BAP rejected the payload
+RETRYABLE_STATUS = {408, 425, 429, 500, 502, 503, 504}
+
+
+class _HostPool:
+    def __init__(self, client: httpx.AsyncClient, max_concurrency: int):
+        self.client = client
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self.in_flight = 0
+
+
+class CallbackDispatcher:
+    """
+    Delivers Beckn callbacks (/on_search etc.) to buyer apps.
+
+    - One keep-alive connection pool per BAP host, so repeated callbacks to the
+      same buyer app reuse TLS connections.
+    - Bounded concurrency per host; waiting sends are admitted in FIFO order.
+    - Retries with exponential backoff and jitter, never past the request ttl.
+    - Delivery latency (first attempt to final outcome) is recorded.
+    """
+
+    def __init__(
+        self,
+        max_concurrency_per_host: int = 8,
+        max_retries: int = 5,
+        backoff_seconds: float = 0.25,
+        request_timeout: float = 10.0,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        self.max_concurrency_per_host = max_concurrency_per_host
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+        self.request_timeout = request_timeout
+        self._transport = transport
+        self._hosts: Dict[str, _HostPool] = {}
+
+        self.delivered = 0
+        self.failed = 0
+        self.expired = 0
+        self.retries = 0
+        self.latency = LatencyRecorder()
+
+    def _pool_for(self, url: str) -> _HostPool:
+        parts = urlsplit(url)
+        host = f"{parts.scheme}://{parts.netloc}"
+        pool = self._hosts.get(host)
+        if pool is None:
+            client = httpx.AsyncClient(
+                transport=self._transport,
+                timeout=self.request_timeout,
+                limits=httpx.Limits(
+                    max_connections=self.max_concurrency_per_host,
+                    max_keepalive_connections=self.max_concurrency_per_host
+                )
+            )
+            pool = _HostPool(client, self.max_concurrency_per_host)
+            self._hosts[host] = pool
+        return pool
+
+    async def send(self, url: str, payload: dict, ttl_seconds: float = 30.0, deadline: Optional[float] = None) -> bool:
+        """
+        POSTs payload to url, retrying transient failures until the deadline
+        (monotonic seconds; defaults to now + ttl_seconds). Returns True once
+        the BAP acknowledged with a 2xx.
+        """
+        start = time.monotonic()
+        deadline = deadline if deadline is not None else start + ttl_seconds
+        pool = self._pool_for(url)
+        attempt = 0
+
+        while True:
+            if deadline - time.monotonic() <= 0:
+                return self._expire(url, attempt)
+
+            error = None
+            async with pool.semaphore:
+                # The wait for a per-host slot can eat the rest of the TTL
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return self._expire(url, attempt)
+                pool.in_flight += 1
+                try:
+                    resp = await pool.client.post(url, json=payload, timeout=min(self.request_timeout, remaining))
+                    if 200 <= resp.status_code < 300:
+                        self.delivered += 1
+                        self.latency.record((time.monotonic() - start) * 1000)
+                        return True
+                    error = f"HTTP {resp.status_code}"
+                    if resp.status_code not in RETRYABLE_STATUS:
+                        self.failed += 1
+                        print(f"Callback to {url} rejected: {error}")
+                        return False
+                except httpx.HTTPError as e:
+                    error = repr(e)
+                finally:
+                    pool.in_flight -= 1
+
+            attempt += 1
+            if attempt > self.max_retries:
+                self.failed += 1
+                print(f"Callback to {url} failed after {attempt} attempt(s): {error}")
+                return False
+
+            self.retries += 1
+            backoff = self.backoff_seconds * (2 ** (attempt - 1)) * (0.5 + random.random())
+            await asyncio.sleep(min(backoff, max(0.0, deadline - time.monotonic())))
+
+    def _expire(self, url: str, attempt: int) -> bool:
+        self.expired += 1
+        print(f"Callback to {url} expired after {attempt} attempt(s)")
+        return False
+
+    def stats(self) -> dict:
+        return {
+            "delivered": self.delivered,
+            "failed": self.failed,
+            "expired": self.expired,
+            "retries": self.retries,
+            "hosts": len(self._hosts),
+            "in_flight": sum(pool.in_flight for pool in self._hosts.values()),
+            "delivery_latency": self.latency.summary(),
+        }
+
+    async def aclose(self):
+        for pool in self._hosts.values():
+            await pool.client.aclose()
+        self._hosts.clear()
@@ -0,0 +1,126 @@
+from typing import Awaitable, Callable, Optional
+
+from google.genai import types
+from pydantic import ValidationError
+
+from src.config import get_settings
+from src.intent_engine import IntentEngine, extract_search_query
+from src.models import MessageAnalysis
+
+settings = get_settings()
+
+ClassifyFallback = Callable[[str], Awaitable[str]]
+ParseFallback = Callable[[str, str], Awaitable[dict]]
+
+
+class MessageAnalyzer:
+    """
+    Works out what a chat message wants with as few Gemini calls as possible.
+
+    The intent engine answers locally when it can. Otherwise, and for every
+    onboarding message, one structured-output call returns the intent, the
+    vendor fields and a cleaned search query together, replacing the old
+    classify-then-parse pair. If that output is malformed, the bot's
+    separate classify/parse calls are used as the fallback.
+    """
+
+    def __init__(self, client, intent_engine: IntentEngine, combined: bool = True):
+        self.client = client
+        self.intent_engine = intent_engine
+        self.combined = combined
+        self.combined_calls = 0
+        self.combined_failures = 0
+
+    async def analyze(
+        self,
+        message: str,
+        sender: str,
+        classify_fallback: Optional[ClassifyFallback] = None,
+        parse_fallback: Optional[ParseFallback] = None,
+    ) -> MessageAnalysis:
+        analysis: Optional[MessageAnalysis] = None
+
+        async def llm_tier(text: str) -> str:
+            nonlocal analysis
+            if self.combined:
+                analysis = await self.analyze_llm(text)
+                if analysis is not None:
+                    return analysis.intent
+            return await classify_fallback(text) if classify_fallback else "unknown"
+
+        result = await self.intent_engine.classify(message, llm_tier)
+
+        if result.intent == "onboard" and analysis is None:
+            if self.combined:
+                analysis = await self.analyze_llm(message)
+            if analysis is None and parse_fallback is not None:
+                analysis = await self._parse_separately(message, sender, parse_fallback)
+
+        analysis = analysis or MessageAnalysis(intent=result.intent)
+        analysis.intent = result.intent
+        if analysis.intent == "search" and not (analysis.search_query or "").strip():
+            analysis.search_query = extract_search_query(message)
+        return analysis
+
+    async def analyze_llm(self, message: str) -> Optional[MessageAnalysis]:
+        """
+        One Gemini call with a JSON response schema. Returns None when the call
+        fails or the output does not validate, so callers can fall back.
+        """
+        prompt = f"""You are an ONDC assistant. A user sent this chat message:
+
+"{message}"
+
+1. intent: "onboard" if they want to register, join or list their business/products;
+   "search" if they are looking for a product, service or vendor; otherwise "unknown".
+2. For "onboard": name (business name), location (city or area) and category
+   (product/service category). Use null for anything not stated.
+3. For "search": search_query, a short query with only what they are looking for and
+   where (e.g. "electrician in Indiranagar"), without filler like "please find me".
+   Keep the user's language."""
+
+        self.combined_calls += 1
+        try:
+            response = await self.client.aio.models.generate_content(
+                model=settings.GEMINI_MODEL_NAME,
+                contents=prompt,
+                config=types.GenerateContentConfig(
+                    response_mime_type="application/json",
+                    response_schema=MessageAnalysis
+                )
+            )
+            parsed = getattr(response, "parsed", None)
+            if isinstance(parsed, MessageAnalysis):
+                return parsed
+            return MessageAnalysis.model_validate_json(response.text)
+        except (ValidationError, ValueError) as e:
+            self.combined_failures += 1
+            print(f"Combined analysis returned malformed output: {e}")
+        except Exception as e:
+            self.combined_failures += 1
+            print(f"Combined analysis failed: {e}")
+        return None
+
+    async def _parse_separately(self, message: str, sender: str, parse_fallback: ParseFallback) -> MessageAnalysis:
+        try:
+            parsed = await parse_fallback(message, sender)
+        except Exception as e:
+            print(f"AI parsing failed: {e}")
+            parsed = {}
+        if not isinstance(parsed, dict):
+            # Valid JSON that is not an object (a list, a string, null)
+            print(f"AI parsing returned {type(parsed).__name__}, not an object")
+            parsed = {}
+        return MessageAnalysis(
+            intent="onboard",
+            name=parsed.get("name"),
+            location=parsed.get("location"),
+            category=parsed.get("category")
+        )
+
+    def stats(self) -> dict:
+        return {
+            "combined": self.combined,
+            "combined_calls": self.combined_calls,
+            "combined_failures": self.combined_failures,
+        }
@@ -0,0 +1,264 @@
+import asyncio
+import random
+import time
+from collections import deque
+from typing import Deque, Dict, Hashable, Optional
+
+import httpx
+
+from src.metrics import LatencyRecorder
+from src.rate_limit import KeyedRateLimiter, TokenBucket
+
+# Status codes worth retrying; other 4xx mean the API rejected the message
+RETRYABLE_STATUS = {408, 425, 429, 500, 502, 503, 504}
+
+
+class OutboundMessage:
+    __slots__ = ("recipient", "payload", "enqueued_at", "attempts")
+
+    def __init__(self, recipient: Hashable, payload: dict):
+        self.recipient = recipient
+        self.payload = payload
+        self.enqueued_at = time.monotonic()
+        self.attempts = 0
+
+
+class DeliveryTransport:
+    """How one message is put on the wire for a given chat platform."""
+
+    name = "base"
+
+    async def deliver(self, message: OutboundMessage) -> httpx.Response:
+        raise NotImplementedError
+
+    def retry_after(self, response: httpx.Response) -> Optional[float]:
+        """Seconds the platform asked us to wait (429), if it said."""
+        value = response.headers.get("Retry-After")
+        try:
+            return float(value) if value is not None else None
+        except ValueError:
+            return None
+
+
+class TelegramTransport(DeliveryTransport):
+    name = "telegram"
+
+    def __init__(self, http_client: httpx.AsyncClient, base_url: str):
+        self.http_client = http_client
+        self.base_url = base_url
+
+    async def deliver(self, message: OutboundMessage) -> httpx.Response:
+        return await self.http_client.post(f"{self.base_url}/sendMessage", json=message.payload)
+
+    def retry_after(self, response: httpx.Response) -> Optional[float]:
+        # Bot API: {"ok": false, "error_code": 429, "parameters": {"retry_after": 5}}
+        try:
+            return float(response.json()["parameters"]["retry_after"])
+        except Exception:
+            return super().retry_after(response)
+
+
+class TwilioTransport(DeliveryTransport):
+    """Twilio Programmable Messaging (WhatsApp), authenticated with basic auth."""
+
+    name = "twilio"
+
+    def __init__(self, http_client: httpx.AsyncClient, account_sid: str, auth_token: str, from_number: str,
+                 base_url: str = "https://api.twilio.com"):
+        self.http_client = http_client
+        self.auth = httpx.BasicAuth(account_sid, auth_token)
+        self.url = f"{base_url.rstrip('/')}/2010-04-01/Accounts/{account_sid}/Messages.json"
+        self.from_number = from_number if from_number.startswith("whatsapp:") else f"whatsapp:{from_number}"
+
+    async def deliver(self, message: OutboundMessage) -> httpx.Response:
+        data = {"From": self.from_number, **message.payload}
+        return await self.http_client.post(self.url, data=data, auth=self.auth)
+
+
+class OutboundSender:
+    """
+    Background send queue for chat replies, so handlers never wait on delivery.
+
+    Messages are queued per recipient and delivered in order for each one,
+    while different recipients are sent concurrently by a pool of workers.
+    Each send takes a token from the recipient's bucket and from a global
+    bucket (platform send limits). A recipient that is out of tokens, or that
+    got a 429 with retry_after, is parked with a timer instead of holding a
+    worker; the global bucket is waited on in place. Network errors and 5xx are retried with exponential backoff.
+    """
+
+    def __init__(
+        self,
+        transport: DeliveryTransport,
+        per_recipient_per_second: float = 1.0,
+        per_recipient_burst: float = 3,
+        global_per_second: float = 30.0,
+        workers: int = 8,
+        max_queue: int = 10000,
+        max_retries: int = 5,
+        backoff_seconds: float = 0.5,
+    ):
+        self.transport = transport
+        self.per_recipient = (
+            KeyedRateLimiter(per_recipient_per_second, per_recipient_burst) if per_recipient_per_second > 0 else None
+        )
+        # Global sends are paced evenly (burst 1) rather than bursting a full second's worth
+        self.global_bucket = TokenBucket(global_per_second, 1) if global_per_second > 0 else None
+        self.workers = workers
+        self.max_queue = max_queue
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+
+        self._queues: Dict[Hashable, Deque[OutboundMessage]] = {}
+        self._ready: Optional[asyncio.Queue] = None
+        self._tasks = []
+        self._depth = 0
+        self._idle: Optional[asyncio.Event] = None
+
+        self.sent = 0
+        self.failed = 0
+        self.dropped = 0
+        self.retries = 0
+        self.rate_limited = 0
+        self.throttled = 0
+        self.latency = LatencyRecorder()
+        self.send_time = LatencyRecorder()
+
+    async def start(self):
+        self._ready = asyncio.Queue()
+        self._idle = asyncio.Event()
+        self._idle.set()
+        for i in range(self.workers):
+            self._tasks.append(asyncio.create_task(self._worker(), name=f"outbound-{self.transport.name}-{i}"))
+
+    def enqueue(self, recipient: Hashable, payload: dict) -> bool:
+        """Queues a message; returns False when the sender is not running or the queue is full."""
+        if self._ready is None:
+            return False
+        if self._depth >= self.max_queue:
+            self.dropped += 1
+            return False
+        queue = self._queues.get(recipient)
+        if queue is None:
+            # Recipient not active: create its queue and make it schedulable
+            queue = self._queues[recipient] = deque()
+            self._ready.put_nowait(recipient)
+        queue.append(OutboundMessage(recipient, payload))
+        self._depth += 1
+        self._idle.clear()
+        return True
+
+    async def _worker(self):
+        while True:
+            recipient = await self._ready.get()
+            queue = self._queues[recipient]
+            message = queue[0]
+
+            wait = self.per_recipient.wait_time(recipient) if self.per_recipient is not None else 0.0
+            if wait > 0:
+                self.throttled += 1
+                self._park(recipient, wait)
+                continue
+            await self._pace()
+            if self.per_recipient is not None:
+                # Only this worker holds the recipient, so its token is still there
+                self.per_recipient.allow(recipient)
+
+            retry_in = await self._attempt(message)
+            if retry_in is not None:
+                self._park(recipient, retry_in)
+                continue
+
+            queue.popleft()
+            self._depth -= 1
+            if queue:
+                self._ready.put_nowait(recipient)
+            else:
+                del self._queues[recipient]
+                if not self._queues:
+                    self._idle.set()
+
+    async def _pace(self):
+        # The global limit applies to every recipient alike, so the worker
+        # waits for it in place instead of re-queueing the recipient
+        if self.global_bucket is None:
+            return
+        while True:
+            wait = self.global_bucket.take_or_wait()
+            if wait == 0.0:
+                return
+            await asyncio.sleep(wait)
+
+    def _park(self, recipient: Hashable, delay: float):
+        # The recipient's queue stays in _queues, so new messages append behind it
+        asyncio.get_running_loop().call_later(delay, self._ready.put_nowait, recipient)
+
+    async def _attempt(self, message: OutboundMessage) -> Optional[float]:
+        """
+        One delivery attempt. Returns None when the message is finished
+        (delivered, or given up on), else the delay before retrying it.
+        """
+        message.attempts += 1
+        start = time.monotonic()
+        try:
+            response = await self.transport.deliver(message)
+            status = response.status_code
+        except Exception as e:
+            response, status = None, None
+            print(f"Outbound {self.transport.name} send to {message.recipient} failed: {e}")
+        finally:
+            self.send_time.record((time.monotonic() - start) * 1000)
+
+        if status is not None and 200 <= status < 300:
+            self.sent += 1
+            self.latency.record((time.monotonic() - message.enqueued_at) * 1000)
+            return None
+
+        if status == 429:
+            self.rate_limited += 1
+            retry_after = self.transport.retry_after(response)
+            if retry_after is not None:
+                # Platform-imposed wait; does not count against max_retries
+                message.attempts -= 1
+                return retry_after
+
+        if (status is None or status in RETRYABLE_STATUS) and message.attempts <= self.max_retries:
+            self.retries += 1
+            return self.backoff_seconds * (2 ** (message.attempts - 1)) * (0.5 + random.random())
+
+        self.failed += 1
+        print(f"Outbound {self.transport.name} message to {message.recipient} dropped (status {status})")
+        return None
+
+    def depth(self) -> int:
+        return self._depth
+
+    def stats(self) -> dict:
+        return {
+            "transport": self.transport.name,
+            "depth": self._depth,
+            "active_recipients": len(self._queues),
+            "sent": self.sent,
+            "failed": self.failed,
+            "dropped": self.dropped,
+            "retries": self.retries,
+            "rate_limited": self.rate_limited,
+            "throttled": self.throttled,
+            "latency": self.latency.summary(),
+            "send_time": self.send_time.summary(),
+        }
+
+    async def drain(self, timeout: Optional[float] = None):
+        """Waits until every queued message has been delivered or given up on."""
+        if self._idle is not None:
+            await asyncio.wait_for(self._idle.wait(), timeout=timeout)
+
+    async def aclose(self, drain_timeout: float = 5.0):
+        try:
+            await self.drain(drain_timeout)
+        except asyncio.TimeoutError:
+            print(f"Outbound {self.transport.name}: {self._depth} message(s) undelivered at shutdown")
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks.clear()
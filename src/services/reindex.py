@@ -0,0 +1,346 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from src.embedding_backends import EmbeddingError
+from src.rate_limit import TokenBucket
+
+
+def _fingerprint(value: str) -> str:
+    return hashlib.blake2b(value.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def _meta_fingerprint(meta: Optional[dict]) -> str:
+    return _fingerprint(json.dumps(meta or {}, sort_keys=True))
+
+
+class ReindexState:
+    """
+    One migration of an alias onto a shadow collection (job_id = target name).
+    status: "copying" (passes over the source) -> "switched" (alias repointed,
+    final catch-up pending) -> "done".
+    """
+
+    def __init__(self, job_id: str, alias: str, source: str, embedding_model: str, status: str = "copying",
+                 sync_pass: int = 1, offset: int = 0, scanned: int = 0, embedded: int = 0, updated: int = 0,
+                 deleted: int = 0):
+        self.job_id = job_id
+        self.alias = alias
+        self.source = source
+        self.embedding_model = embedding_model
+        self.status = status
+        self.sync_pass = sync_pass
+        self.offset = offset
+        self.scanned = scanned
+        self.embedded = embedded
+        self.updated = updated
+        self.deleted = deleted
+        self.started = time.monotonic()
+        self.scanned_at_start = scanned
+
+    @property
+    def target(self) -> str:
+        return self.job_id
+
+    def as_dict(self) -> dict:
+        elapsed = time.monotonic() - self.started
+        scanned = self.scanned - self.scanned_at_start
+        return {
+            "job_id": self.job_id,
+            "alias": self.alias,
+            "source": self.source,
+            "target": self.target,
+            "embedding_model": self.embedding_model,
+            "status": self.status,
+            "sync_pass": self.sync_pass,
+            "offset": self.offset,
+            "scanned": self.scanned,
+            "embedded": self.embedded,
+            "updated": self.updated,
+            "deleted": self.deleted,
+            "elapsed_seconds": round(elapsed, 3),
+            "rows_per_second": round(scanned / elapsed, 1) if elapsed > 0 else 0.0,
+        }
+
+
+class ReindexCheckpointStore:
+    """
+    SQLite record of each migration: its position in the current pass, plus
+    per-vendor fingerprints of what the shadow collection holds. The
+    fingerprints keep memory flat at any collection size and let later passes
+    copy only what changed in the live collection meanwhile.
+    """
+
+    def __init__(self, db_path: str):
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS reindex_jobs ("
+            " job_id TEXT PRIMARY KEY,"
+            " alias TEXT NOT NULL,"
+            " source TEXT NOT NULL,"
+            " embedding_model TEXT NOT NULL,"
+            " status TEXT NOT NULL,"
+            " sync_pass INTEGER NOT NULL,"
+            " offset INTEGER NOT NULL,"
+            " scanned INTEGER NOT NULL,"
+            " embedded INTEGER NOT NULL,"
+            " updated INTEGER NOT NULL,"
+            " deleted INTEGER NOT NULL,"
+            " updated_at REAL NOT NULL)"
+        )
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS reindex_rows ("
+            " job_id TEXT NOT NULL,"
+            " vendor_id TEXT NOT NULL,"
+            " doc_fp TEXT NOT NULL,"
+            " meta_fp TEXT NOT NULL,"
+            " seen_pass INTEGER NOT NULL,"
+            " PRIMARY KEY (job_id, vendor_id)) WITHOUT ROWID"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS reindex_rows_pass ON reindex_rows (job_id, seen_pass)")
+        self._db.commit()
+        self._lock = threading.Lock()
+
+    def load(self, job_id: str) -> Optional[ReindexState]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT alias, source, embedding_model, status, sync_pass, offset, scanned, embedded, updated, deleted"
+                " FROM reindex_jobs WHERE job_id = ?", (job_id,)
+            ).fetchone()
+        return ReindexState(job_id, *row) if row else None
+
+    def active(self, alias: str) -> Optional[ReindexState]:
+        """The unfinished migration of `alias`, if any."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT job_id FROM reindex_jobs WHERE alias = ? AND status != 'done' ORDER BY updated_at DESC",
+                (alias,)
+            ).fetchone()
+        return self.load(row[0]) if row else None
+
+    def save(self, state: ReindexState):
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO reindex_jobs (job_id, alias, source, embedding_model, status, sync_pass,"
+                " offset, scanned, embedded, updated, deleted, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (state.job_id, state.alias, state.source, state.embedding_model, state.status, state.sync_pass,
+                 state.offset, state.scanned, state.embedded, state.updated, state.deleted, time.time())
+            )
+            self._db.commit()
+
+    def fingerprints(self, job_id: str, vendor_ids: Sequence[str]) -> Dict[str, Tuple[str, str]]:
+        with self._lock:
+            rows = self._db.execute(
+                f"SELECT vendor_id, doc_fp, meta_fp FROM reindex_rows WHERE job_id = ?"
+                f" AND vendor_id IN ({', '.join('?' * len(vendor_ids))})", (job_id, *vendor_ids)
+            ).fetchall()
+        return {vendor_id: (doc_fp, meta_fp) for vendor_id, doc_fp, meta_fp in rows}
+
+    def record(self, job_id: str, rows: List[Tuple[str, str, str]], sync_pass: int):
+        """rows: (vendor_id, doc_fp, meta_fp) now present in the shadow collection."""
+        with self._lock:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO reindex_rows (job_id, vendor_id, doc_fp, meta_fp, seen_pass)"
+                " VALUES (?, ?, ?, ?, ?)",
+                [(job_id, vendor_id, doc_fp, meta_fp, sync_pass) for vendor_id, doc_fp, meta_fp in rows]
+            )
+            self._db.commit()
+
+    def unseen(self, job_id: str, sync_pass: int, limit: int) -> List[str]:
+        """Vendors copied earlier but not met in this pass (deleted from the source, or skipped by paging)."""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT vendor_id FROM reindex_rows WHERE job_id = ? AND seen_pass < ? LIMIT ?",
+                (job_id, sync_pass, limit)
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def forget(self, job_id: str, vendor_ids: Sequence[str]):
+        with self._lock:
+            self._db.executemany(
+                "DELETE FROM reindex_rows WHERE job_id = ? AND vendor_id = ?", [(job_id, v) for v in vendor_ids]
+            )
+            self._db.commit()
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+class CollectionReindexer:
+    """
+    Streams a live collection into a shadow collection: pages of `page_size`
+    vendors are read, re-embedded in batches of `embed_batch_size` (throttled
+    to `texts_per_second`, retried with backoff) and upserted, and the
+    checkpoint advances after every page. Repeat passes copy only what changed
+    in the source since (re-embedding only changed documents) and drop deleted
+    vendors, until a pass finds at most `delta_threshold` changes. Then
+    `switch` repoints the alias; after `grace_seconds`, once every server has
+    moved over, a last pass copies writes that still reached the old collection.
+    """
+
+    def __init__(
+        self,
+        checkpoints: ReindexCheckpointStore,
+        embedding_function,
+        page_size: int = 500,
+        embed_batch_size: int = 100,
+        texts_per_second: float = 0,
+        max_retries: int = 5,
+        backoff_seconds: float = 1.0,
+        delta_threshold: int = 100,
+        max_passes: int = 5,
+        quantized_vectors=None,
+    ):
+        self.checkpoints = checkpoints
+        self.embedding_function = embedding_function
+        # Filled for a compact ("@<dims>") target, which stores truncated vectors only
+        self.quantized_vectors = quantized_vectors if getattr(embedding_function, "dimensions", 0) else None
+        self.page_size = page_size
+        self.embed_batch_size = embed_batch_size
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+        self.delta_threshold = delta_threshold
+        self.max_passes = max_passes
+        self._throttle = TokenBucket(texts_per_second, max(texts_per_second, embed_batch_size)) \
+            if texts_per_second > 0 else None
+
+    def run(self, state: ReindexState, source, target, switch: Optional[Callable[[], None]] = None,
+            grace_seconds: float = 0, progress: Optional[Callable[[dict], None]] = None) -> dict:
+        if state.status == "copying":
+            first_pass = state.sync_pass
+            while True:
+                changes = self._sync_pass(state, source, target, progress)
+                if changes <= self.delta_threshold or state.sync_pass - first_pass >= self.max_passes:
+                    break
+            if switch is None:
+                # Copied and caught up; run again with switch to go live
+                return state.as_dict()
+            switch()
+            state.status = "switched"
+            self.checkpoints.save(state)
+            time.sleep(grace_seconds)
+        if state.status == "switched":
+            self._sync_pass(state, source, target, progress, final=True)
+            state.status = "done"
+            self.checkpoints.save(state)
+        return state.as_dict()
+
+    def _sync_pass(self, state: ReindexState, source, target, progress=None, final: bool = False) -> int:
+        """
+        final: the alias already points at `target`, so vendors written there
+        since the switch are newer than the source and are left alone.
+        """
+        changes = 0
+        while True:
+            page = source.get(include=["documents", "metadatas"], limit=self.page_size, offset=state.offset)
+            if not page["ids"]:
+                break
+            changes += self._copy(state, target, page["ids"], page["documents"], page["metadatas"], final)
+            state.offset += len(page["ids"])
+            state.scanned += len(page["ids"])
+            self.checkpoints.save(state)
+            if progress:
+                progress(state.as_dict())
+
+        # Deletes shift offsets, so a vendor can be missed by paging; only drop
+        # those that are really gone from the source
+        while True:
+            unseen = self.checkpoints.unseen(state.job_id, state.sync_pass, self.page_size)
+            if not unseen:
+                break
+            present = source.get(ids=unseen, include=["documents", "metadatas"])
+            if present["ids"]:
+                changes += self._copy(state, target, present["ids"], present["documents"], present["metadatas"], final)
+            gone = sorted(set(unseen) - set(present["ids"]))
+            if gone and final:
+                untouched = self._untouched(state, target, gone)
+                self.checkpoints.forget(state.job_id, [v for v in gone if v not in untouched])
+                gone = [v for v in gone if v in untouched]
+            if gone:
+                target.delete(ids=gone)
+                if self.quantized_vectors is not None:
+                    self.quantized_vectors.remove(target.name, gone)
+                self.checkpoints.forget(state.job_id, gone)
+                state.deleted += len(gone)
+                changes += len(gone)
+
+        state.sync_pass += 1
+        state.offset = 0
+        self.checkpoints.save(state)
+        return changes
+
+    def _copy(self, state: ReindexState, target, ids, documents, metadatas, final: bool = False) -> int:
+        known = self.checkpoints.fingerprints(state.job_id, ids)
+        embed, update, rows = [], [], []
+        for i, (vendor_id, document, meta) in enumerate(zip(ids, documents, metadatas)):
+            doc_fp, meta_fp = _fingerprint(document or ""), _meta_fingerprint(meta)
+            previous = known.get(vendor_id)
+            if previous is None or previous[0] != doc_fp:
+                embed.append(i)
+            elif previous[1] != meta_fp:
+                update.append(i)
+            rows.append((vendor_id, doc_fp, meta_fp))
+        if final and (embed or update):
+            untouched = self._untouched(state, target, [ids[i] for i in embed + update], known)
+            embed = [i for i in embed if ids[i] in untouched]
+            update = [i for i in update if ids[i] in untouched]
+
+        for start in range(0, len(embed), self.embed_batch_size):
+            batch = embed[start:start + self.embed_batch_size]
+            texts = [documents[i] or "" for i in batch]
+            embeddings = self._embed(texts)
+            if self.quantized_vectors is not None:
+                self.quantized_vectors.upsert(
+                    target.name, [ids[i] for i in batch], embeddings,
+                    [(metadatas[i] or {}).get("doc_hash", "") for i in batch]
+                )
+                embeddings = self.embedding_function.compact(embeddings)
+            target.upsert(
+                ids=[ids[i] for i in batch],
+                embeddings=embeddings,
+                documents=texts,
+                metadatas=[metadatas[i] for i in batch]
+            )
+        if update:
+            target.update(ids=[ids[i] for i in update], metadatas=[metadatas[i] for i in update])
+        self.checkpoints.record(state.job_id, rows, state.sync_pass)
+        state.embedded += len(embed)
+        state.updated += len(update)
+        return len(embed) + len(update)
+
+    def _untouched(self, state: ReindexState, target, vendor_ids: List[str], known=None) -> set:
+        """Vendors the target still holds exactly as copied (or never held), i.e. not written since the switch."""
+        known = known if known is not None else self.checkpoints.fingerprints(state.job_id, vendor_ids)
+        current = target.get(ids=vendor_ids, include=["documents", "metadatas"])
+        held = {
+            vendor_id: (_fingerprint(document or ""), _meta_fingerprint(meta))
+            for vendor_id, document, meta in zip(current["ids"], current["documents"], current["metadatas"])
+        }
+        return {v for v in vendor_ids if held.get(v) == known.get(v)}
+
+    def _embed(self, texts: List[str]) -> list:
+        if self._throttle is not None:
+            while True:
+                wait = self._throttle.take_or_wait(len(texts))
+                if not wait:
+                    break
+                time.sleep(wait)
+        for attempt in range(self.max_retries + 1):
+            try:
+                if self.quantized_vectors is not None:
+                    return self.embedding_function.embed_full(texts)
+                return self.embedding_function(texts)
+            except EmbeddingError as e:
+                if attempt == self.max_retries:
+                    # The checkpoint has not moved past this page, so re-running resumes here
+                    raise
+                delay = self.backoff_seconds * 2 ** attempt
+                print(f"Re-index embedding failed ({e}); retrying in {delay:.1f} s")
+                time.sleep(delay)
@@ -0,0 +1,270 @@
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional, Set
+
+import httpx
+
+from src.metrics import LatencyRecorder
+from src.services.telegram_service import TelegramService, update_chat_id
+
+
+class TelegramOffsetStore:
+    """Durable getUpdates offset per bot, so a restarted poller resumes where it stopped."""
+
+    def __init__(self, db_path: str):
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS telegram_offsets ("
+            " bot TEXT PRIMARY KEY,"
+            " next_offset INTEGER NOT NULL,"
+            " updated_at REAL NOT NULL)"
+        )
+        self._db.commit()
+        self._lock = threading.Lock()
+
+    def load(self, bot: str) -> Optional[int]:
+        with self._lock:
+            row = self._db.execute("SELECT next_offset FROM telegram_offsets WHERE bot = ?", (bot,)).fetchone()
+        return row[0] if row else None
+
+    def save(self, bot: str, next_offset: int):
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO telegram_offsets (bot, next_offset, updated_at) VALUES (?, ?, ?)",
+                (bot, next_offset, time.time())
+            )
+            self._db.commit()
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+class TelegramPoller:
+    """
+    Long-polling alternative to the webhook: fetches updates in batches with
+    getUpdates and feeds them to TelegramService.handle_incoming_update.
+
+    Updates for different chats run concurrently (up to max_concurrency);
+    updates for one chat run in update_id order, each waiting for the previous.
+    The offset only advances past an update once it and every earlier update
+    has been handled, and is checkpointed in TelegramOffsetStore. Telegram
+    deletes updates below the offset we send, so a crash re-delivers the
+    unfinished ones instead of losing them. Updates that are still running
+    when the next batch re-delivers them are skipped.
+
+    An update whose handler raises is not confirmed either: the offset stays
+    on it and Telegram's re-delivery runs it again, up to max_attempts, after
+    which it is logged and dropped so one bad update cannot stall the bot.
+    A retried update runs after the later updates of its chat.
+    """
+
+    def __init__(
+        self,
+        service: TelegramService,
+        http_client: httpx.AsyncClient,
+        offsets: TelegramOffsetStore,
+        bot_key: str,
+        batch_size: int = 100,
+        poll_timeout: int = 25,
+        max_concurrency: int = 16,
+        retry_backoff_seconds: float = 2.0,
+        max_attempts: int = 3,
+    ):
+        self.service = service
+        self.http_client = http_client
+        self.offsets = offsets
+        self.bot_key = bot_key
+        self.batch_size = batch_size
+        self.poll_timeout = poll_timeout
+        self.retry_backoff_seconds = retry_backoff_seconds
+        self.max_attempts = max(1, max_attempts)
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+        self._pending: Dict[int, asyncio.Task] = {}
+        self._chat_tail: Dict[object, asyncio.Task] = {}
+        self._scheduled: Set[int] = set()
+        self._attempts: Dict[int, int] = {}
+        self._next_offset: Optional[int] = offsets.load(bot_key)
+        self._saved_offset = self._next_offset
+        self._highest_seen: Optional[int] = None
+
+        self.polls = 0
+        self.received = 0
+        self.handled = 0
+        self.redelivered = 0
+        self.retried = 0
+        self.dropped = 0
+        self.errors = 0
+        self.handle_time = LatencyRecorder()
+
+    async def run(self, stop: Optional[asyncio.Event] = None):
+        """Polls until `stop` is set (or the task is cancelled), then drains in-flight updates."""
+        stop = stop or asyncio.Event()
+        stopped = asyncio.ensure_future(stop.wait())
+        poll = None
+        try:
+            while not stop.is_set():
+                try:
+                    poll = asyncio.ensure_future(self.poll_once())
+                    await asyncio.wait({poll, stopped}, return_when=asyncio.FIRST_COMPLETED)
+                    if not poll.done():
+                        # Abandon the long poll; its updates were not confirmed and will come back
+                        poll.cancel()
+                        break
+                    scheduled = poll.result()
+                    if not scheduled and self._pending:
+                        # Only re-deliveries of running updates came back; wait for progress, don't spin
+                        await asyncio.wait(list(self._pending.values()), return_when=asyncio.FIRST_COMPLETED)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    self.errors += 1
+                    print(f"Telegram getUpdates failed: {e}")
+                    try:
+                        await asyncio.wait_for(stop.wait(), timeout=self.retry_backoff_seconds)
+                    except asyncio.TimeoutError:
+                        pass
+        finally:
+            stopped.cancel()
+            if poll is not None and not poll.done():
+                poll.cancel()
+            await self.drain()
+
+    async def poll_once(self) -> int:
+        """One getUpdates round trip. Returns how many new updates were scheduled."""
+        params = {"timeout": self.poll_timeout, "limit": self.batch_size, "allowed_updates": ["message"]}
+        offset = self._watermark()
+        if offset is not None:
+            params["offset"] = offset
+        self._checkpoint()
+
+        response = await self.http_client.post(
+            f"{self.service.base_url}/getUpdates",
+            json=params,
+            timeout=self.poll_timeout + 10
+        )
+        body = response.json()
+        if response.status_code != 200 or not body.get("ok"):
+            if response.status_code == 409:
+                print("getUpdates conflicts with an active webhook; run with --delete-webhook")
+            raise RuntimeError(f"HTTP {response.status_code}: {body.get('description')}")
+
+        self.polls += 1
+        scheduled = 0
+        for update in body.get("result", []):
+            update_id = update["update_id"]
+            if update_id in self._scheduled:
+                self.redelivered += 1  # still running, or finished behind an unfinished one
+                continue
+            if update_id in self._pending:
+                self.retried += 1  # its handler failed last time
+            self._schedule(update)
+            scheduled += 1
+        return scheduled
+
+    def _schedule(self, update: dict):
+        update_id = update["update_id"]
+        chat_id = update_chat_id(update)
+        previous = self._chat_tail.get(chat_id) if chat_id is not None else None
+        task = asyncio.create_task(self._handle(update, previous), name=f"telegram-update-{update_id}")
+        if chat_id is not None:
+            self._chat_tail[chat_id] = task
+        self._pending[update_id] = task
+        self._scheduled.add(update_id)
+        self._highest_seen = max(update_id, self._highest_seen if self._highest_seen is not None else update_id)
+        self.received += 1
+
+        def done(_task: asyncio.Task, update_id=update_id, chat_id=chat_id):
+            # A cancelled update (shutdown) stays pending so the offset never passes it
+            if _task.cancelled():
+                pass
+            elif _task.result() or self._attempts.get(update_id, 0) >= self.max_attempts:
+                self._pending.pop(update_id, None)
+                self._attempts.pop(update_id, None)
+            else:
+                # Failed: keep the offset on it and take Telegram's re-delivery as the retry
+                self._scheduled.discard(update_id)
+            if chat_id is not None and self._chat_tail.get(chat_id) is _task:
+                del self._chat_tail[chat_id]
+
+        task.add_done_callback(done)
+
+    async def _handle(self, update: dict, previous: Optional[asyncio.Task]) -> bool:
+        """Runs one update; False when its handler raised."""
+        if previous is not None:
+            # Keep per-chat order; the previous update's outcome does not matter here
+            await asyncio.wait([previous])
+        update_id = update.get("update_id")
+        async with self._semaphore:
+            start = time.monotonic()
+            try:
+                await self.service.handle_incoming_update(update)
+                self.handled += 1
+                return True
+            except Exception as e:
+                self.errors += 1
+                attempts = self._attempts[update_id] = self._attempts.get(update_id, 0) + 1
+                if attempts >= self.max_attempts:
+                    self.dropped += 1
+                    print(f"Telegram update {update_id} failed {attempts} times, dropping it: {e}")
+                else:
+                    print(f"Telegram update {update_id} failed (attempt {attempts}), will retry: {e}")
+                return False
+            finally:
+                self.handle_time.record((time.monotonic() - start) * 1000)
+
+    def _watermark(self) -> Optional[int]:
+        """Lowest update_id not yet handled (everything below it is done)."""
+        if self._pending:
+            watermark = min(self._pending)
+        elif self._highest_seen is not None:
+            watermark = self._highest_seen + 1
+        else:
+            return self._next_offset
+        # Forget finished ids that the offset has moved past
+        self._scheduled = {u for u in self._scheduled if u >= watermark}
+        self._next_offset = watermark
+        return watermark
+
+    def _checkpoint(self):
+        if self._next_offset is not None and self._next_offset != self._saved_offset:
+            self.offsets.save(self.bot_key, self._next_offset)
+            self._saved_offset = self._next_offset
+
+    async def drain(self):
+        """Waits for in-flight updates and checkpoints the final offset."""
+        if self._pending:
+            await asyncio.wait(list(self._pending.values()))
+        self._watermark()
+        self._checkpoint()
+
+    async def confirm(self):
+        """
+        Tells Telegram the checkpointed offset (a zero-timeout getUpdates), so
+        updates handled just before shutdown are not re-delivered next start.
+        """
+        if self._next_offset is None:
+            return
+        await self.http_client.post(
+            f"{self.service.base_url}/getUpdates",
+            json={"offset": self._next_offset, "limit": 1, "timeout": 0}
+        )
+
+    def stats(self) -> dict:
+        return {
+            "polls": self.polls,
+            "received": self.received,
+            "handled": self.handled,
+            "redelivered": self.redelivered,
+            "retried": self.retried,
+            "dropped": self.dropped,
+            "errors": self.errors,
+            "in_flight": len(self._pending),
+            "next_offset": self._next_offset,
+            "handle_time": self.handle_time.summary(),
+        }
@@ -1,125 +1,49 @@
-import json
-import requests
-from src.dependencies import get_llm_client
+import httpx
+from typing import List
 from src.config import get_settings
-from src.models import VendorOnboardRequest
-from src.services.vendor_service import VendorService
+from src.models import VendorResponse
+from src.services.bot_core import BotCore, ChannelAdapter, IncomingMessage
+from src.services.outbound import OutboundSender
 
 settings = get_settings()
 
-class TelegramService:
-    def __init__(self):
-        self.client = get_llm_client()
-        self.vendor_service = VendorService()
-        self.base_url = f"https://api.telegram.org/bot{settings.TELEGRAM_BOT_TOKEN}"
+def update_chat_id(update: dict):
+    """Chat the update belongs to (None for unsupported update types)."""
+    return (update.get("message") or {}).get("chat", {}).get("id")
 
-    def send_message(self, chat_id: int, text: str):
-        """
-        Sends a message to a Telegram chat.
-        """
-        url = f"{self.base_url}/sendMessage"
-        payload = {"chat_id": chat_id, "text": text}
-        try:
-            requests.post(url, json=payload)
-        except Exception as e:
-            print(f"Failed to send Telegram message: {e}")
-
-    def parse_vendor_message(self, message: str, sender: str) -> dict:
-        """
-        Uses Gemini AI to extract structured vendor information.
-        Reused from WhatsAppService logic.
-        """
-        prompt = f"""You are an ONDC vendor onboarding assistant. 
-A vendor just sent this message to register their business:
-
-"{message}"
-
-Extract the following fields. If a field is not found, use "Unknown".
-Return ONLY a valid JSON object (no markdown) with these exact keys:
-{{
-  "name": "business name",
-  "location": "city or area",
-  "category": "product/service category",
-  "contact": "{sender}"
-}}"""
-
-        try:
-            response = self.client.models.generate_content(
-                model=settings.GEMINI_MODEL_NAME,
-                contents=prompt
-            )
-            text = response.text.strip()
-            # Clean markdown if present
-            if text.startswith("```"):
-                text = text.split("\n", 1)[1].rsplit("```", 1)[0]
-            return json.loads(text)
-        except Exception as e:
-            print(f"AI parsing failed: {e}")
-            return {
-                "name": "Unknown",
-                "location": "Unknown", 
-                "category": "Unknown",
-                "contact": sender
-            }
-
-    def classify_intent(self, message: str) -> str:
-        """
-        Uses Gemini AI to classify intent.
-        """
-        prompt = f"""You are an ONDC assistant. A user sent this message:
-
-"{message}"
+class TelegramService(ChannelAdapter):
+    """
+    Telegram channel adapter: unpacks webhook updates, runs them through the
+    shared BotCore pipeline and sends the reply via the Bot API.
+    """
 
-Classify the intent into one of these categories:
-1. "onboard" -> Register/join/list business.
-2. "search" -> Looking for product/service/vendor.
-3. "unknown" -> Unclear.
+    name = "telegram"
 
-Return ONLY the category name (onboard, search, or unknown). 
-Do NOT return "Category: search" or any punctuation. Just the word."""
-
-        try:
-            response = self.client.models.generate_content(
-                model=settings.GEMINI_MODEL_NAME,
-                contents=prompt
-            )
-            raw = response.text.strip().lower()
-            print(f"DEBUG Intent Raw: {raw}")
-            
-            # More robust matching
-            if "onboard" in raw:
-                return "onboard"
-            if "search" in raw:
-                return "search"
-                
-            return "unknown"
-        except Exception as e:
-            print(f"Intent classification failed: {e}")
-            return "unknown"
+    def __init__(self, core: BotCore = None, http_client: httpx.AsyncClient = None,
+                 outbound: OutboundSender = None):
+        super().__init__(core)
+        # Pooled keep-alive client shared with the rest of the app
+        self.http_client = http_client or httpx.AsyncClient(timeout=settings.HTTP_TIMEOUT_SECONDS)
+        # Background send queue (rate limits, 429 handling); None = send inline
+        self.outbound = outbound
+        self.base_url = f"{settings.TELEGRAM_API_BASE_URL.rstrip('/')}/bot{settings.TELEGRAM_BOT_TOKEN}"
 
-    def perform_search(self, message: str) -> str:
+    async def send_message(self, chat_id: int, text: str):
         """
-        Handles search intent.
+        Sends a message to a Telegram chat. With a send queue this only
+        enqueues; otherwise (or when the queue is full) it posts inline.
         """
-        from src.models import VendorSearchRequest
+        payload = {"chat_id": chat_id, "text": text}
+        if self.outbound is not None and self.outbound.enqueue(chat_id, payload):
+            return
         try:
-            request = VendorSearchRequest(query=message, limit=3)
-            search_response = self.vendor_service.search_vendors(request)
-            
-            if not search_response.vendors:
-                return f"I couldn't find any vendors matching '{message}'."
-
-            reply = [f"Here are some vendors for '{message}':\n"]
-            for v in search_response.vendors:
-                reply.append(f"• {v.name} ({v.category})\n  📍 {v.location}\n  📞 {v.contact}\n")
-            
-            reply.append("\nReply to search again or register your business!")
-            return "\n".join(reply)
+            response = await self.http_client.post(f"{self.base_url}/sendMessage", json=payload)
+            if response.status_code != 200:
+                print(f"Telegram sendMessage failed: HTTP {response.status_code} {response.text[:200]}")
         except Exception as e:
-            print(f"Search failed: {e}")
-            return "Sorry, I encountered an error while searching."
+            print(f"Failed to send Telegram message: {e}")
 
-    def handle_incoming_update(self, update: dict):
+    async def handle_incoming_update(self, update: dict):
         """
         Main handler for Telegram Webhook updates.
         """
@@ -127,59 +51,47 @@ Do NOT return "Category: search" or any punctuation. Just the word."""
             message_data = update.get("message", {})
             if not message_data:
                 return # Not a text message or unsupported update
-            
+
             chat_id = message_data.get("chat", {}).get("id")
             text = message_data.get("text", "")
             user_first_name = message_data.get("from", {}).get("first_name", "User")
-            
+
             if not text or not chat_id:
                 return
 
             print(f"Telegram Message from {user_first_name}: {text}")
-
-            # 1. Classify
-            intent = self.classify_intent(text)
-            print(f"Classified Intent: {intent}")
-
-            # 2. Route
-            if intent == "onboard":
-                reply = self._handle_onboarding(text, str(chat_id))
-            elif intent == "search":
-                reply = self.perform_search(text)
-            else:
-                reply = (
-                    f"Hi {user_first_name}! Welcome to ONDC.\n\n"
-                    "• *Register*: 'Register my bakery in Delhi'\n"
-                    "• *Search*: 'Find electricians nearby'"
-                )
-
-            # 3. Send Reply
-            self.send_message(chat_id, reply)
+            reply = await self.receive(str(chat_id), text, user_first_name)
+            await self.send_message(chat_id, reply)
 
         except Exception as e:
             print(f"Error handling Telegram update: {e}")
 
-    def _handle_onboarding(self, message: str, sender_id: str) -> str:
-        parsed = self.parse_vendor_message(message, sender_id)
-        
-        request = VendorOnboardRequest(
-            name=parsed.get("name", "Unknown"),
-            location=parsed.get("location", "Unknown"),
-            category=parsed.get("category", "Unknown"),
-            contact=parsed.get("contact", sender_id), # Using chat_id/sender as contact for now
-            raw_text=message
+    def format_onboarded(self, parsed: dict, vendor_id: str) -> str:
+        return (
+            f"✅ Business Registered!\n\n"
+            f"Name: {parsed.get('name')}\n"
+            f"Location: {parsed.get('location')}\n"
+            f"Category: {parsed.get('category')}\n"
+            f"ID: {vendor_id}\n\n"
+            f"You are now discoverable on ONDC."
+        )
+
+    def format_onboard_failed(self) -> str:
+        return "❌ Registration failed. Please try again."
+
+    def format_search_results(self, query: str, vendors: List[VendorResponse]) -> str:
+        reply = [f"Here are some vendors for '{query}':\n"]
+        for v in vendors:
+            reply.append(f"• {v.name} ({v.category})\n  📍 {v.location}\n  📞 {v.contact}\n")
+        reply.append("\nReply to search again or register your business!")
+        return "\n".join(reply)
+
+    def format_no_results(self, query: str) -> str:
+        return f"I couldn't find any vendors matching '{query}'."
+
+    def format_welcome(self, message: IncomingMessage) -> str:
+        return (
+            f"Hi {message.user_name or 'User'}! Welcome to ONDC.\n\n"
+            "• *Register*: 'Register my bakery in Delhi'\n"
+            "• *Search*: 'Find electricians nearby'"
         )
-        
-        result = self.vendor_service.onboard_vendor(request)
-        
-        if result.get("status") == "success":
-            return (
-                f"✅ Business Registered!\n\n"
-                f"Name: {parsed.get('name')}\n"
-                f"Location: {parsed.get('location')}\n"
-                f"Category: {parsed.get('category')}\n"
-                f"ID: {result.get('id')}\n\n"
-                f"You are now discoverable on ONDC."
-            )
-        else:
-            return "❌ Registration failed. Please try again."
@@ -1,84 +1,736 @@
+import asyncio
+import functools
+import hashlib
+import math
+import threading
+import time
 import uuid
-from src.models import VendorOnboardRequest, VendorSearchRequest, SearchResponse, VendorResponse
-from src.dependencies import get_collection, get_llm_client
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, List, Optional, Tuple
+import numpy as np
+from src.models import VendorOnboardRequest, VendorSearchRequest, SearchResponse, SummaryResponse, VendorResponse
+from src.dependencies import (
+    collection_space, get_collection, get_embedding_function, get_gazetteer, get_llm_client, get_reranker,
+    get_summary_cache
+)
 from src.config import get_settings
+from src.embedding_backends import EmbeddingError
+from src.embedding_cache import normalize_text
+from src.vendor_filters import build_where, normalize_category, normalize_city
+from src.geo import KM_PER_DEGREE_LAT, geohash_encode, haversine_km
+from src.metrics import LatencyRecorder
+from src.reranker import candidate_features
+
+SEARCH_STAGES = ("retrieve", "geo", "rerank", "fetch", "total")
+
+def _normalize_contact(contact: Optional[str]) -> str:
+    # "whatsapp:+91 98765-43210" and "+919876543210" are the same vendor
+    value = normalize_text(contact or "").replace("whatsapp:", "").replace("tel:", "")
+    return "".join(ch for ch in value if ch not in " -()")
+
+def _known(value: Optional[str]) -> str:
+    value = normalize_text(value or "")
+    return "" if value == "unknown" else value
+
+def document_hash(document: str) -> str:
+    return hashlib.sha256(document.encode("utf-8")).hexdigest()
+
+def vendor_id_for(data: VendorOnboardRequest) -> str:
+    """
+    Stable vendor ID from the normalized name, location and contact, so repeat
+    registrations (bot retries, re-imports) land on the same record. Falls back
+    to the document text when none of those are known.
+    """
+    name, location, contact = _known(data.name), _known(data.location), _normalize_contact(_known(data.contact))
+    if name or contact:
+        key = f"vendor:{name}|{location}|{contact}"
+    else:
+        key = f"document:{normalize_text(build_document(data))}"
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, key))
+
+def build_document(data: VendorOnboardRequest) -> str:
+    """The text that gets embedded for a vendor."""
+    if data.raw_text:
+        return f"Raw Content: {data.raw_text}"
+    s_data = data.structured_data or {}
+    return f"Vendor: {data.name}. Location: {data.location}. Category: {data.category}. Details: {s_data}"
+
+def location_fields(location: Optional[str]) -> dict:
+    """
+    City filter key plus lat/lon/geohash metadata from the offline gazetteer.
+    A location the gazetteer resolves takes its place's city ("Koramangala"
+    -> bengaluru), so locality-only vendors match city filters; otherwise
+    the city comes from the text alone ("" when it names no known city, so
+    it never becomes a filter key) and there are no coordinates.
+    """
+    gazetteer = get_gazetteer()
+    place = gazetteer.geocode(location) if gazetteer else None
+    if place is None:
+        return {"city": normalize_city(location)}
+    return {
+        # Explicit coordinates ("point") carry no city
+        "city": place.city or normalize_city(location),
+        "lat": place.lat,
+        "lon": place.lon,
+        "geohash": geohash_encode(place.lat, place.lon),
+        "geo_precision": place.kind,
+    }
+
+def city_key(location: Optional[str]) -> str:
+    """The city key a vendor at `location` is stored under (see location_fields), or ""."""
+    return location_fields(location)["city"] if location else ""
+
+def build_metadata(data: VendorOnboardRequest, vendor_id: str) -> dict:
+    return {
+        "id": vendor_id,
+        "name": data.name or "Unknown",
+        "location": data.location or "Unknown",
+        "category": data.category or "Unknown",
+        "contact": data.contact or "Unknown",
+        # Normalized keys that search filters (where clauses) match on
+        **location_fields(data.location),
+        "category_key": normalize_category(data.category),
+        # Lets upserts skip re-embedding when the text has not changed
+        "doc_hash": document_hash(build_document(data)),
+        # Freshness signal for search re-ranking
+        "updated_at": int(time.time())
+    }
+
+def same_metadata(previous: Optional[dict], metadata: dict) -> bool:
+    """Equal apart from updated_at, which every write refreshes."""
+    if previous is None:
+        return False
+    return {k: v for k, v in previous.items() if k != "updated_at"} == {
+        k: v for k, v in metadata.items() if k != "updated_at"
+    }
+
+def distance_to_similarity(distances, space: str):
+    """Chroma distances of unit vectors as cosine similarity (l2 is squared: 2 - 2 cos; cosine: 1 - cos; ip: -cos)."""
+    distances = np.asarray(distances, dtype=np.float64)
+    if space == "l2":
+        return 1.0 - distances / 2
+    if space == "cosine":
+        return 1.0 - distances
+    return -distances
+
+def backfill_filter_metadata(collection, batch_size: int = 1000) -> int:
+    """
+    Adds (or corrects) the city / category_key filter fields and the geocoded
+    lat/lon on existing vendors, the way onboarding now sets them: vendors
+    stored with a locality as their city get the gazetteer place's city.
+    Metadata-only update, so nothing is re-embedded.
+    Returns the number of vendors updated.
+    """
+    updated, offset = 0, 0
+    while True:
+        page = collection.get(include=["metadatas"], limit=batch_size, offset=offset)
+        if not page["ids"]:
+            return updated
+        ids, metadatas = [], []
+        for vendor_id, meta in zip(page["ids"], page["metadatas"]):
+            fields = {
+                **location_fields(meta.get("location")),
+                "category_key": normalize_category(meta.get("category")),
+            }
+            if any(meta.get(k) != v for k, v in fields.items()):
+                ids.append(vendor_id)
+                metadatas.append({**meta, **fields})
+        if ids:
+            collection.update(ids=ids, metadatas=metadatas)
+            updated += len(ids)
+        offset += len(page["ids"])
 
 class VendorService:
-    def __init__(self):
-        self.collection = get_collection()
-        self.client = get_llm_client()
+    def __init__(self, collection=None, client=None, embedding_function=None, summary_cache=None, executor=None,
+                 geo_index=None, lexical_index=None, quantized_vectors=None, reranker=None, rerank_features=None):
+        # Shared instances are injected by the ServiceContainer; fall back to
+        # building our own for scripts that use the service standalone.
+        self.collection = collection if collection is not None else get_collection()
+        self.client = client if client is not None else get_llm_client()
+        self.embedding_function = embedding_function or get_embedding_function()
+        self.summary_cache = summary_cache if summary_cache is not None else get_summary_cache()
         self.settings = get_settings()
+        # Radius / nearest-k lookups; without it geo searches use a bounding-box where clause
+        self.geo_index = geo_index
+        # BM25 retriever for hybrid / lexical search; without it every search is vector-only
+        self.lexical_index = lexical_index
+        # Full-precision re-ranking for compact ("@<dims>") collections
+        self.quantized_vectors = quantized_vectors
+        # Set when the collection is switched after a re-index: deletes go there too,
+        # so the re-index catch-up cannot copy a just-deleted vendor back
+        self.previous_collection = None
+        # Second search stage over SEARCH_RERANK_CANDIDATES first-stage results (None = off)
+        self.reranker = reranker if reranker is not None else get_reranker()
+        # Re-ranking features held in memory; without it candidates' metadata is read from Chroma
+        self.rerank_features = rerank_features
+        self.stage_latency = {stage: LatencyRecorder() for stage in SEARCH_STAGES}
+
+        # Summaries requested with summary="deferred" are generated here and
+        # fetched later through /v1/search/summary/{summary_id}
+        self._summary_executor = ThreadPoolExecutor(
+            max_workers=self.settings.DEFERRED_SUMMARY_WORKERS, thread_name_prefix="deferred-summary"
+        )
+        self._deferred: "OrderedDict[str, object]" = OrderedDict()
+        self._deferred_lock = threading.Lock()
+
+        # Chroma (and the embedding call it triggers) is blocking, so the async
+        # API runs it on this bounded pool instead of the event loop
+        self._owns_executor = executor is None
+        self.executor = executor or ThreadPoolExecutor(
+            max_workers=self.settings.CHROMA_THREAD_POOL_SIZE, thread_name_prefix="chroma"
+        )
 
     def onboard_vendor(self, data: VendorOnboardRequest):
         # 1. Prepare Text for Embedding
-        text_to_embed = ""
-        if data.raw_text:
-            text_to_embed = f"Raw Content: {data.raw_text}"
-        else:
-            s_data = data.structured_data or {}
-            text_to_embed = f"Vendor: {data.name}. Location: {data.location}. Category: {data.category}. Details: {s_data}"
+        text_to_embed = build_document(data)
 
         # 2. Prepare Metadata
-        metadata = {
-            "id": str(uuid.uuid4()),
-            "name": data.name or "Unknown",
-            "location": data.location or "Unknown",
-            "category": data.category or "Unknown",
-            "contact": data.contact or "Unknown"
-        }
+        vendor_id = vendor_id_for(data) if self.settings.ONBOARD_UPSERT_ENABLED else str(uuid.uuid4())
+        metadata = build_metadata(data, vendor_id)
 
-        # 3. Add to Chroma
-        self.collection.add(
-            documents=[text_to_embed],
-            metadatas=[metadata],
-            ids=[metadata["id"]]
-        )
-        return {"status": "success", "id": metadata["id"]}
+        # 3. Write to Chroma
+        if not self.settings.ONBOARD_UPSERT_ENABLED:
+            self.collection.add(
+                documents=[text_to_embed],
+                metadatas=[metadata],
+                ids=[vendor_id],
+                embeddings=self._compact_embeddings(vendor_id, text_to_embed, metadata)
+            )
+            result = "created"
+        else:
+            existing = self.collection.get(ids=[vendor_id], include=["metadatas"])
+            previous = existing["metadatas"][0] if existing["ids"] else None
+            if previous is None:
+                result = "created"
+                self.collection.upsert(documents=[text_to_embed], metadatas=[metadata], ids=[vendor_id],
+                                       embeddings=self._compact_embeddings(vendor_id, text_to_embed, metadata))
+            elif same_metadata(previous, metadata):
+                # Retry of an identical registration: nothing to write
+                return {"status": "success", "id": vendor_id, "result": "unchanged"}
+            elif previous.get("doc_hash") == metadata["doc_hash"]:
+                # Same text, so the stored embedding is still valid
+                result = "updated"
+                self.collection.update(metadatas=[metadata], ids=[vendor_id])
+            else:
+                result = "updated"
+                self.collection.upsert(documents=[text_to_embed], metadatas=[metadata], ids=[vendor_id],
+                                       embeddings=self._compact_embeddings(vendor_id, text_to_embed, metadata))
+
+        if self.summary_cache:
+            self.summary_cache.invalidate_vendors([vendor_id])
+        if self.geo_index is not None:
+            self.geo_index.add_metadata([vendor_id], [metadata])
+        if self.rerank_features is not None:
+            self.rerank_features.add_metadata([vendor_id], [metadata])
+        if self.lexical_index is not None:
+            self.lexical_index.upsert(vendor_id, metadata, text_to_embed)
+        return {"status": "success", "id": vendor_id, "result": result}
+
+    def delete_vendor(self, vendor_id: str):
+        self.collection.delete(ids=[vendor_id])
+        if self.previous_collection is not None:
+            self.previous_collection.delete(ids=[vendor_id])
+        if self.quantized_vectors is not None:
+            self.quantized_vectors.remove(self.collection.name, [vendor_id])
+        if self.summary_cache:
+            self.summary_cache.invalidate_vendors([vendor_id])
+        if self.geo_index is not None:
+            self.geo_index.remove(vendor_id)
+        if self.rerank_features is not None:
+            self.rerank_features.remove(vendor_id)
+        if self.lexical_index is not None:
+            self.lexical_index.remove(vendor_id)
+        return {"status": "success", "id": vendor_id}
 
     def search_vendors(self, request: VendorSearchRequest) -> SearchResponse:
         # 1. Query Chroma
-        results = self.collection.query(
-            query_texts=[request.query],
-            n_results=request.limit
+        vendors, context_text = self._retrieve(request)
+        if not vendors:
+            return SearchResponse(ai_summary="No matching vendors found.", vendors=[], summary_status="complete")
+
+        # 2. Callers that never read the summary (Beckn, bots) skip the LLM entirely
+        if request.summary == "none":
+            return SearchResponse(ai_summary="", vendors=vendors, summary_status="skipped")
+
+        cached, query_embedding = self._cached_summary(request.query, vendors)
+        if cached is not None:
+            return SearchResponse(ai_summary=cached, vendors=vendors)
+
+        if request.summary == "deferred":
+            summary_id = self._defer_summary(request.query, vendors, context_text, query_embedding)
+            return SearchResponse(ai_summary="", vendors=vendors, summary_status="pending", summary_id=summary_id)
+
+        # 3. Generate AI Summary using google-genai SDK
+        summary = self._generate_summary(request.query, vendors, context_text, query_embedding)
+        return SearchResponse(
+            ai_summary=summary,
+            vendors=vendors
         )
 
-        if not results['documents'] or not results['documents'][0]:
-            return SearchResponse(ai_summary="No matching vendors found.", vendors=[])
+    def get_deferred_summary(self, summary_id: str) -> Optional[SummaryResponse]:
+        with self._deferred_lock:
+            future = self._deferred.get(summary_id)
+        if future is None:
+            return None
+        if not future.done():
+            return SummaryResponse(summary_id=summary_id, summary_status="pending")
+        try:
+            return SummaryResponse(summary_id=summary_id, summary_status="complete", ai_summary=future.result())
+        except Exception as e:
+            print(f"Deferred summary {summary_id} failed: {e}")
+            return SummaryResponse(summary_id=summary_id, summary_status="failed")
+
+    # ---- Async API (used by the FastAPI handlers and bots) ----
+
+    async def aonboard_vendor(self, data: VendorOnboardRequest):
+        return await self._run_blocking(self.onboard_vendor, data)
+
+    async def adelete_vendor(self, vendor_id: str):
+        return await self._run_blocking(self.delete_vendor, vendor_id)
+
+    async def asearch_vendors(self, request: VendorSearchRequest) -> SearchResponse:
+        vendors, context_text = await self._run_blocking(self._retrieve, request)
+        if not vendors:
+            return SearchResponse(ai_summary="No matching vendors found.", vendors=[], summary_status="complete")
+
+        if request.summary == "none":
+            return SearchResponse(ai_summary="", vendors=vendors, summary_status="skipped")
+
+        cached, query_embedding = await self._acached_summary(request.query, vendors)
+        if cached is not None:
+            return SearchResponse(ai_summary=cached, vendors=vendors)
+
+        if request.summary == "deferred":
+            summary_id = self._defer_summary(request.query, vendors, context_text, query_embedding)
+            return SearchResponse(ai_summary="", vendors=vendors, summary_status="pending", summary_id=summary_id)
+
+        summary = await self._agenerate_summary(request.query, vendors, context_text, query_embedding)
+        return SearchResponse(ai_summary=summary, vendors=vendors)
+
+    async def astream_search(self, request: VendorSearchRequest) -> AsyncIterator[dict]:
+        """
+        Yields the vendors first, then the summary as it is generated.
+        Used by /v1/search when summary="stream". Retrieval errors raise
+        before the first event; a failed summary ends with an "error" event.
+        """
+        vendors, context_text = await self._run_blocking(self._retrieve, request)
+        yield {"type": "vendors", "vendors": [v.model_dump() for v in vendors]}
+        if not vendors:
+            yield {"type": "summary", "text": "No matching vendors found."}
+            yield {"type": "done"}
+            return
+
+        try:
+            cached, query_embedding = await self._acached_summary(request.query, vendors)
+            if cached is not None:
+                yield {"type": "summary", "text": cached}
+                yield {"type": "done"}
+                return
+
+            chunks = []
+            stream = await self.client.aio.models.generate_content_stream(
+                model=self.settings.GEMINI_MODEL_NAME,
+                contents=self._summary_prompt(request.query, context_text)
+            )
+            async for chunk in stream:
+                if chunk.text:
+                    chunks.append(chunk.text)
+                    yield {"type": "summary", "text": chunk.text}
+        except Exception as e:
+            # The 200 and the vendors are already sent; tell the client the summary stopped
+            print(f"Streamed summary failed: {e}")
+            yield {"type": "error", "detail": "Summary generation failed"}
+            yield {"type": "done"}
+            return
+
+        if self.summary_cache and chunks:
+            self.summary_cache.put(request.query, [v.id for v in vendors], "".join(chunks), query_embedding)
+        yield {"type": "done"}
+
+    def close(self):
+        self._summary_executor.shutdown(wait=False, cancel_futures=True)
+        if self._owns_executor:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+
+    def _run_blocking(self, fn, *args):
+        loop = asyncio.get_running_loop()
+        return loop.run_in_executor(self.executor, functools.partial(fn, *args))
+
+    async def _acached_summary(self, query: str, vendors: List[VendorResponse]):
+        if self.summary_cache and self.summary_cache.semantic:
+            # May need an embedding call on a cold cache
+            return await self._run_blocking(self._cached_summary, query, vendors)
+        return self._cached_summary(query, vendors)
+
+    async def _agenerate_summary(self, query: str, vendors: List[VendorResponse], context_text: str, query_embedding=None) -> str:
+        response = await self.client.aio.models.generate_content(
+            model=self.settings.GEMINI_MODEL_NAME,
+            contents=self._summary_prompt(query, context_text)
+        )
+        if self.summary_cache and response.text:
+            self.summary_cache.put(query, [v.id for v in vendors], response.text, query_embedding)
+        return response.text
+
+    def search_stats(self) -> dict:
+        return {
+            "reranker": getattr(self.reranker, "name", type(self.reranker).__name__) if self.reranker else None,
+            "candidates": self.settings.SEARCH_RERANK_CANDIDATES if self.reranker else None,
+            "stages": {stage: recorder.summary() for stage, recorder in self.stage_latency.items()},
+        }
+
+    def _candidates(self, limit: int) -> int:
+        """First-stage depth: the limit, or SEARCH_RERANK_CANDIDATES when a re-ranker picks from them."""
+        if self.reranker is None:
+            return limit
+        return max(limit, self.settings.SEARCH_RERANK_CANDIDATES)
+
+    def _timed(self, stage: str, started: float) -> float:
+        now = time.perf_counter()
+        self.stage_latency[stage].record((now - started) * 1000)
+        return now
+
+    def _retrieve(self, request: VendorSearchRequest) -> Tuple[List[VendorResponse], str]:
+        began = started = time.perf_counter()
+        # Location/category filters narrow the candidate set before the vector scan
+        city = city_key(request.location)
+        where = build_where(city, normalize_category(request.category))
+        n_results, ids, nearby = self._candidates(request.limit), None, None
+        point = self._geo_point(request)
+        if point is not None:
+            where, ids, n_results, nearby = self._geo_scope(point, request, where)
+            if ids is not None and not ids:
+                return [], ""
+        # With the features in memory, candidates are IDs + distances until the final few are picked
+        fetch = not (
+            self.reranker is not None and self.rerank_features is not None
+            and not getattr(self.reranker, "needs_documents", False) and (point is None or nearby is not None)
+        )
+        mode = self._search_mode(request)
+        if mode == "vector":
+            rows = self._vector_rows(request.query, n_results, where, ids, fetch)
+        else:
+            rows = self._fused_rows(request, mode, n_results, where, ids, fetch)
+        started = self._timed("retrieve", started)
+        # Before _geo_rank folds physical distance into the score
+        similarities = dict(zip((meta.get("id") for _, meta, _, _ in rows), self._similarities(rows, mode)))
+        if point is not None:
+            rows = self._geo_rank(rows, point, request, nearby)
+            started = self._timed("geo", started)
+
+        relevance = [None] * len(rows)
+        if self.reranker is not None and rows:
+            metas = [meta for _, meta, _, _ in rows]
+            if fetch:
+                features = candidate_features(metas)
+            else:
+                features = self.rerank_features.features(self.collection, [meta.get("id") for meta in metas])
+            ranked = self.reranker.rerank(
+                request.query,
+                features,
+                np.array([similarities[meta.get("id")] for meta in metas]),
+                documents=[doc for doc, _, _, _ in rows] if fetch else None,
+                # A soft city preference only ranks, it never filters
+                city=city or city_key(request.prefer_location),
+                category=request.category,
+                distances_km=np.array([km for *_, km in rows]) if point is not None else None,
+                distance_scale=request.radius_km or self.settings.GEO_NEAR_RADIUS_KM,
+                limit=request.limit,
+            )
+            rows = [rows[index] for index, _ in ranked]
+            relevance = [score for _, score in ranked]
+            started = self._timed("rerank", started)
+        if not fetch:
+            rows, relevance = self._fetch_rows(rows[:request.limit], relevance)
+            self._timed("fetch", started)
+        self._timed("total", began)
 
-        # 2. Process Results
         vendors = []
         context_text = ""
         
-        for i in range(len(results['documents'][0])):
-            doc = results['documents'][0][i]
-            meta = results['metadatas'][0][i]
-            dist = results['distances'][0][i] if 'distances' in results and results['distances'] else 0.0
-            
+        for i, (doc, meta, dist, km) in enumerate(rows[:request.limit]):
             v = VendorResponse(
                 id=meta.get("id"),
                 name=meta.get("name"),
                 location=meta.get("location"),
                 category=meta.get("category"),
                 contact=meta.get("contact"),
-                score=dist
+                score=dist,
+                relevance=relevance[i],
+                distance_km=km
             )
             vendors.append(v)
             context_text += f"Vendor {i+1}: {doc}\nMetadata: {meta}\n\n"
 
-        # 3. Generate AI Summary using google-genai SDK
-        prompt = f"""You are an intelligent procurement assistant for ONDC. Recommend vendors based on the provided context.
+        return vendors, context_text
+
+    def _fetch_rows(self, rows, relevance):
+        """Reads documents and metadata for rows the first stage left as IDs (vendors deleted meanwhile drop out)."""
+        if not rows:
+            # Chroma rejects get(ids=[]); no candidates is a normal "no vendors found"
+            return [], []
+        ids = [meta.get("id") for _, meta, _, _ in rows]
+        fetched = self.collection.get(ids=ids, include=["documents", "metadatas"])
+        found = dict(zip(fetched["ids"], zip(fetched["documents"], fetched["metadatas"])))
+        kept = [
+            (found[meta.get("id")][0], found[meta.get("id")][1], dist, km, score)
+            for (_, meta, dist, km), score in zip(rows, relevance) if meta.get("id") in found
+        ]
+        return [row[:4] for row in kept], [row[4] for row in kept]
+
+    def _search_mode(self, request: VendorSearchRequest) -> str:
+        if self.lexical_index is None:
+            return "vector"
+        return request.mode or self.settings.SEARCH_MODE
+
+    def _similarities(self, rows, mode: str) -> np.ndarray:
+        """First-stage scores as similarity in [0, 1] (rows carry distances, lower is better)."""
+        distances = [dist for _, _, dist, _ in rows]
+        if mode == "vector" and not self._compact():
+            similarity = distance_to_similarity(distances, collection_space(self.collection))
+        else:
+            # Compact re-rank: cosine distance; hybrid/lexical: 1 - normalized RRF
+            similarity = 1.0 - np.asarray(distances, dtype=np.float64)
+        return np.clip(similarity, 0.0, 1.0)
+
+    def _compact(self) -> bool:
+        return self.quantized_vectors is not None and bool(getattr(self.embedding_function, "dimensions", 0))
+
+    def _compact_embeddings(self, vendor_id: str, document: str, metadata: dict):
+        """
+        Compact collections: embeds the full vector once, keeps it (int8) in the
+        re-rank store and returns the truncated one for Chroma. Otherwise None,
+        and Chroma embeds the document itself.
+        """
+        if not self._compact():
+            return None
+        full = self.embedding_function.embed_full([document])
+        self.quantized_vectors.upsert(self.collection.name, [vendor_id], full, [metadata["doc_hash"]])
+        return self.embedding_function.compact(full)
+
+    def _vector_rows(self, query: str, n_results: int, where: Optional[dict], ids: Optional[List[str]],
+                     fetch: bool = True):
+        """
+        (document, metadata, distance, km) rows, best first. fetch=False skips
+        reading documents and metadata: rows are (None, {"id": ...}, distance, None).
+        """
+        if self._compact():
+            return self._reranked_rows(query, n_results, where, ids, fetch)
+        if not fetch:
+            results = self.collection.query(
+                query_texts=[query], n_results=n_results, where=where, ids=ids, include=["distances"]
+            )
+            if not results["ids"] or not results["ids"][0]:
+                return []
+            return [
+                (None, {"id": vendor_id}, distance, None)
+                for vendor_id, distance in zip(results["ids"][0], results["distances"][0])
+            ]
+        results = self.collection.query(
+            query_texts=[query],
+            n_results=n_results,
+            where=where,
+            ids=ids
+        )
+        if not results['documents'] or not results['documents'][0]:
+            return []
+        distances = results['distances'][0] if 'distances' in results and results['distances'] else None
+        return [
+            (doc, meta, distances[i] if distances else 0.0, None)
+            for i, (doc, meta) in enumerate(zip(results['documents'][0], results['metadatas'][0]))
+        ]
+
+    def _reranked_rows(self, query: str, n_results: int, where: Optional[dict], ids: Optional[List[str]],
+                       fetch: bool = True):
+        """
+        Compact index: VECTOR_RERANK_DEPTH candidate IDs from the truncated
+        vectors, re-scored against the int8 full vectors; documents are read
+        for the final n_results only. Scores are cosine distances (1 - similarity);
+        vendors missing from the store keep their truncated-vector similarity.
+        """
+        full = self.embedding_function.embed_full([query])
+        depth = max(n_results, self.settings.VECTOR_RERANK_DEPTH)
+        if ids is not None:
+            depth = min(depth, len(ids))
+        results = self.collection.query(
+            query_embeddings=self.embedding_function.compact(full),
+            n_results=depth,
+            where=where,
+            ids=ids,
+            include=["distances"]
+        )
+        if not results["ids"] or not results["ids"][0]:
+            return []
+        candidates = results["ids"][0]
+        similarities = self.quantized_vectors.scores(self.collection.name, full[0], candidates)
+        fallback = distance_to_similarity(results["distances"][0], collection_space(self.collection))
+        for vendor_id, similarity in zip(candidates, fallback):
+            similarities.setdefault(vendor_id, float(similarity))
+        top = sorted(candidates, key=similarities.get, reverse=True)[:n_results]
+        if not fetch:
+            return [(None, {"id": vendor_id}, round(1.0 - similarities[vendor_id], 6), None) for vendor_id in top]
+        fetched = self.collection.get(ids=top, include=["documents", "metadatas"])
+        rows = dict(zip(fetched["ids"], zip(fetched["documents"], fetched["metadatas"])))
+        return [
+            (rows[vendor_id][0], rows[vendor_id][1], round(1.0 - similarities[vendor_id], 6), None)
+            for vendor_id in top if vendor_id in rows
+        ]
+
+    def _fused_rows(self, request: VendorSearchRequest, mode: str, n_results: int, where: Optional[dict],
+                    ids: Optional[List[str]], fetch: bool = True):
+        """
+        Hybrid: vector and BM25 candidate lists merged with reciprocal-rank
+        fusion. Lexical: BM25 only, no embedding call. Scores stay "lower is
+        better" (1 - normalized RRF) so they sort like embedding distances.
+        """
+        depth = max(n_results, self.settings.SEARCH_FUSION_DEPTH)
+        if ids is not None:
+            depth = min(depth, len(ids))
+        rankings, rows = [], {}
+        if mode == "hybrid":
+            try:
+                vector = self._vector_rows(request.query, depth, where, ids, fetch)
+            except Exception as e:
+                # Embedding API slow or down: the lexical half still answers
+                print(f"Vector search failed, using lexical results only: {e}")
+                vector = []
+            rows.update((meta.get("id"), (doc, meta)) for doc, meta, _, _ in vector if doc is not None)
+            rankings.append([meta.get("id") for _, meta, _, _ in vector])
+        lexical = self.lexical_index.search(
+            request.query, depth, city=city_key(request.location) or None,
+            category_key=normalize_category(request.category) or None, ids=ids
+        )
+        rankings.append([vendor_id for vendor_id, _ in lexical])
+
+        k = self.settings.SEARCH_RRF_K
+        fused = {}
+        for ranking in rankings:
+            for rank, vendor_id in enumerate(ranking):
+                fused[vendor_id] = fused.get(vendor_id, 0.0) + 1.0 / (k + rank + 1)
+        # n_results is the limit, or the over-fetch that _geo_rank re-ranks
+        top = sorted(fused, key=fused.get, reverse=True)[:n_results]
+
+        best = len(rankings) / (k + 1)
+        if not fetch:
+            return [(None, {"id": vendor_id}, round(1.0 - fused[vendor_id] / best, 6), None) for vendor_id in top]
+        missing = [vendor_id for vendor_id in top if vendor_id not in rows]
+        if missing:
+            fetched = self.collection.get(ids=missing, include=["documents", "metadatas"])
+            rows.update(zip(fetched["ids"], zip(fetched["documents"], fetched["metadatas"])))
+        return [
+            (rows[vendor_id][0], rows[vendor_id][1], round(1.0 - fused[vendor_id] / best, 6), None)
+            for vendor_id in top if vendor_id in rows
+        ]
+
+    def _geo_point(self, request: VendorSearchRequest) -> Optional[Tuple[float, float]]:
+        if request.lat is not None and request.lon is not None:
+            return request.lat, request.lon
+        if not request.near:
+            return None
+        gazetteer = get_gazetteer()
+        place = gazetteer.geocode(request.near) if gazetteer else None
+        if place is None:
+            raise ValueError(f"Unknown place: {request.near}")
+        return place.lat, place.lon
+
+    def _geo_scope(self, point: Tuple[float, float], request: VendorSearchRequest, where: Optional[dict]):
+        """
+        Restricts the semantic query to vendors near `point`. Returns
+        (where, ids, n_results, km by vendor ID or None); the query
+        over-fetches so _geo_rank can trade embedding distance against
+        physical distance.
+        """
+        lat, lon = point
+        over_fetch = max(request.limit * 5, 20, self._candidates(request.limit))
+        if self.geo_index is not None:
+            limit = self.settings.GEO_MAX_CANDIDATES
+            if request.radius_km:
+                nearby = self.geo_index.within(lat, lon, request.radius_km, limit=limit)
+            else:
+                nearby = self.geo_index.nearest(lat, lon, limit)
+            ids = [vendor_id for vendor_id, _ in nearby]
+            return where, ids, min(over_fetch, len(ids)), dict(nearby)
+
+        # No in-memory index (standalone scripts): bounding box on the stored coordinates
+        radius = request.radius_km or 50.0
+        dlat = radius / KM_PER_DEGREE_LAT
+        dlon = radius / (KM_PER_DEGREE_LAT * max(math.cos(math.radians(abs(lat) + dlat)), 1e-6))
+        clauses = [
+            {"lat": {"$gte": lat - dlat}}, {"lat": {"$lte": lat + dlat}},
+            {"lon": {"$gte": lon - dlon}}, {"lon": {"$lte": lon + dlon}},
+        ]
+        if where:
+            clauses.append(where)
+        return {"$and": clauses}, None, over_fetch, None
+
+    def _geo_rank(self, rows, point: Tuple[float, float], request: VendorSearchRequest,
+                  nearby: Optional[dict] = None):
+        """
+        Drops vendors outside the radius and orders by embedding + weighted
+        physical distance (from the geo index's `nearby` when given, else the
+        stored coordinates). Keeps every candidate; _retrieve applies the
+        limit after re-ranking.
+        """
+        located = []
+        for doc, meta, dist, _ in rows:
+            if nearby is not None and meta.get("id") in nearby:
+                km = float(nearby[meta.get("id")])
+            elif "lat" in meta and "lon" in meta:
+                km = float(haversine_km(point[0], point[1], meta["lat"], meta["lon"]))
+            else:
+                continue
+            if request.radius_km and km > request.radius_km:
+                continue
+            located.append((doc, meta, dist, km))
+        if not located:
+            return []
+        scale = request.radius_km or max(km for *_, km in located) or 1.0
+        weight = self.settings.GEO_DISTANCE_WEIGHT
+        ranked = [(doc, meta, dist + weight * km / scale, round(km, 3)) for doc, meta, dist, km in located]
+        ranked.sort(key=lambda row: row[2])
+        return ranked
+
+    def _cached_summary(self, query: str, vendors: List[VendorResponse]):
+        """
+        Returns (cached summary or None, query embedding used for semantic lookups).
+        """
+        if not self.summary_cache:
+            return None, None
+        query_embedding = None
+        if self.summary_cache.semantic:
+            # Already embedded by the Chroma query, so this is an embedding cache hit
+            try:
+                query_embedding = self.embedding_function([query])[0]
+            except EmbeddingError as e:
+                # Lexical-only search: exact-match summary lookups still work
+                print(f"Summary cache lookup without embedding: {e}")
+        cached = self.summary_cache.get(query, [v.id for v in vendors], query_embedding)
+        return cached, query_embedding
+
+    def _summary_prompt(self, query: str, context_text: str) -> str:
+        return f"""You are an intelligent procurement assistant for ONDC. Recommend vendors based on the provided context.
         
-User Query: {request.query}
+User Query: {query}
 
 Vendor Context:
 {context_text}
 """
+
+    def _generate_summary(self, query: str, vendors: List[VendorResponse], context_text: str, query_embedding=None) -> str:
         response = self.client.models.generate_content(
             model=self.settings.GEMINI_MODEL_NAME,
-            contents=prompt
-        )
-        
-        return SearchResponse(
-            ai_summary=response.text,
-            vendors=vendors
+            contents=self._summary_prompt(query, context_text)
         )
+        if self.summary_cache and response.text:
+            self.summary_cache.put(query, [v.id for v in vendors], response.text, query_embedding)
+        return response.text
+
+    def _defer_summary(self, query: str, vendors: List[VendorResponse], context_text: str, query_embedding=None) -> str:
+        summary_id = str(uuid.uuid4())
+        future = self._summary_executor.submit(self._generate_summary, query, vendors, context_text, query_embedding)
+        with self._deferred_lock:
+            self._deferred[summary_id] = future
+            # Bounded: the oldest results are forgotten once clients had time to fetch them
+            while len(self._deferred) > self.settings.DEFERRED_SUMMARY_MAX_PENDING:
+                self._deferred.popitem(last=False)
+        return summary_id
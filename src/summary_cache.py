@@ -0,0 +1,141 @@
+import math
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+
+from src.embedding_cache import normalize_text
+
+
+def cosine_similarity(a: Sequence[float], b: Sequence[float]) -> float:
+    dot = sum(x * y for x, y in zip(a, b))
+    norm = math.sqrt(sum(x * x for x in a)) * math.sqrt(sum(y * y for y in b))
+    return dot / norm if norm else 0.0
+
+
+class _Entry:
+    __slots__ = ("summary", "vendor_ids", "embedding", "expires_at")
+
+    def __init__(self, summary: str, vendor_ids: Tuple[str, ...], embedding, expires_at: float):
+        self.summary = summary
+        self.vendor_ids = vendor_ids
+        self.embedding = embedding
+        self.expires_at = expires_at
+
+
+class SummaryCache:
+    """
+    Caches ai_summary text keyed by the normalized query plus the ordered vendor IDs.
+
+    Entries expire after ttl_seconds and are dropped as soon as any vendor they
+    mention is re-onboarded or deleted. With semantic_threshold set, a query whose
+    embedding is within that cosine similarity of a cached query for the *same*
+    vendor list reuses the cached summary too.
+    """
+
+    def __init__(self, ttl_seconds: float = 600, max_entries: int = 2000, semantic_threshold: Optional[float] = None):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.semantic_threshold = semantic_threshold
+
+        self._entries: "OrderedDict[Tuple[str, Tuple[str, ...]], _Entry]" = OrderedDict()
+        self._by_vendor: Dict[str, Set[Tuple[str, Tuple[str, ...]]]] = {}
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    @property
+    def semantic(self) -> bool:
+        return self.semantic_threshold is not None
+
+    def get(self, query: str, vendor_ids: Sequence[str], query_embedding: Optional[List[float]] = None) -> Optional[str]:
+        key = (normalize_text(query), tuple(vendor_ids))
+        now = time.monotonic()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires_at <= now:
+                self._drop(key)
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry.summary
+
+            if self.semantic and query_embedding is not None:
+                best = self._nearest(key[1], query_embedding, now)
+                if best is not None:
+                    self.semantic_hits += 1
+                    return best.summary
+
+            self.misses += 1
+            return None
+
+    def put(self, query: str, vendor_ids: Sequence[str], summary: str, query_embedding: Optional[List[float]] = None):
+        key = (normalize_text(query), tuple(vendor_ids))
+        embedding = list(query_embedding) if (self.semantic and query_embedding is not None) else None
+
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = _Entry(summary, key[1], embedding, time.monotonic() + self.ttl_seconds)
+            for vendor_id in key[1]:
+                self._by_vendor.setdefault(vendor_id, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._drop(next(iter(self._entries)))
+
+    def invalidate_vendors(self, vendor_ids: Sequence[str]):
+        """Drops every cached summary that mentions one of these vendors."""
+        with self._lock:
+            for vendor_id in vendor_ids:
+                for key in list(self._by_vendor.get(vendor_id, ())):
+                    self._drop(key)
+                    self.invalidations += 1
+
+    def clear(self):
+        """Drops everything, e.g. when query embeddings come from a new model."""
+        with self._lock:
+            self._entries.clear()
+            self._by_vendor.clear()
+
+    def _nearest(self, vendor_ids: Tuple[str, ...], query_embedding: List[float], now: float) -> Optional[_Entry]:
+        # Only summaries written for exactly this vendor list are candidates
+        if not vendor_ids or vendor_ids[0] not in self._by_vendor:
+            return None
+        best, best_score = None, self.semantic_threshold
+        for key in list(self._by_vendor[vendor_ids[0]]):
+            entry = self._entries[key]
+            if entry.vendor_ids != vendor_ids or entry.embedding is None:
+                continue
+            if entry.expires_at <= now:
+                self._drop(key)
+                continue
+            score = cosine_similarity(query_embedding, entry.embedding)
+            if score >= best_score:
+                best, best_score = entry, score
+        return best
+
+    def _drop(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for vendor_id in entry.vendor_ids:
+            keys = self._by_vendor.get(vendor_id)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._by_vendor[vendor_id]
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.semantic_hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "semantic_hits": self.semantic_hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+            "hit_rate": round((self.hits + self.semantic_hits) / lookups, 4) if lookups else 0.0,
+        }
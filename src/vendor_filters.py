@@ -0,0 +1,111 @@
+import re
+from typing import Optional
+
+from src.embedding_cache import normalize_text
+
+# Canonical city -> spellings seen in vendor messages and ONDC payloads.
+# ONDC context.city is an STD code ("std:080"), so those map here too.
+CITY_ALIASES = {
+    "bengaluru": ["bangalore", "bengaluru", "blr", "std:080"],
+    "mumbai": ["mumbai", "bombay", "std:022"],
+    "delhi": ["delhi", "new delhi", "ncr", "std:011"],
+    "chennai": ["chennai", "madras", "std:044"],
+    "kolkata": ["kolkata", "calcutta", "std:033"],
+    "hyderabad": ["hyderabad", "secunderabad", "std:040"],
+    "pune": ["pune", "poona", "std:020"],
+    "ahmedabad": ["ahmedabad", "amdavad", "std:079"],
+    "jaipur": ["jaipur", "std:0141"],
+    "lucknow": ["lucknow", "std:0522"],
+    "gurugram": ["gurugram", "gurgaon", "std:0124"],
+    "noida": ["noida", "std:0120"],
+    "kochi": ["kochi", "cochin", "ernakulam", "std:0484"],
+    "chandigarh": ["chandigarh", "std:0172"],
+    "indore": ["indore", "std:0731"],
+    "surat": ["surat", "std:0261"],
+    "nagpur": ["nagpur", "std:0712"],
+    "coimbatore": ["coimbatore", "std:0422"],
+    "varanasi": ["varanasi", "banaras", "benares", "std:0542"],
+    "patna": ["patna", "std:0612"],
+}
+
+# Canonical category -> vendor wording and ONDC retail category/domain names
+CATEGORY_ALIASES = {
+    "grocery": ["grocery", "groceries", "kirana", "general store", "provision store", "supermarket", "ret10"],
+    "food": ["food", "restaurant", "dhaba", "cafe", "tiffin", "food & beverage", "f&b", "ret11"],
+    "bakery": ["bakery", "bakers", "cakes", "cake shop"],
+    "fashion": ["fashion", "clothing", "garments", "apparel", "boutique", "ret12"],
+    "beauty": ["beauty", "beauty & personal care", "salon", "parlour", "cosmetics", "ret13"],
+    "electronics": ["electronics", "mobile shop", "mobile store", "ret14"],
+    "appliances": ["appliances", "ret15"],
+    "home": ["home & decor", "home & kitchen", "furniture", "ret16"],
+    "pharmacy": ["pharmacy", "chemist", "medical store", "medicines", "health & wellness", "ret18"],
+    "electrician": ["electrician", "electrical"],
+    "plumber": ["plumber", "plumbing"],
+    "tailor": ["tailor", "darzi", "stitching"],
+    "florist": ["florist", "flowers", "flower shop"],
+}
+
+
+def _index(aliases: dict) -> dict:
+    return {alias: canonical for canonical, names in aliases.items() for alias in names}
+
+_CITY_INDEX = _index(CITY_ALIASES)
+_CATEGORY_INDEX = _index(CATEGORY_ALIASES)
+_TOKEN_RE = re.compile(r"[^\w&:]+")
+
+
+def _lookup(value: Optional[str], index: dict) -> str:
+    """
+    Exact alias first, then any alias found as a word run inside the value
+    ("MG Road, Bangalore" -> bengaluru). Unknown categories come back
+    normalized; unknown cities as "", so they never become a filter key.
+    """
+    text = normalize_text(value or "")
+    if not text or text in ("unknown", "*"):
+        return ""
+    if text in index:
+        return index[text]
+    tokens = [t for t in _TOKEN_RE.split(text) if t]
+    # Longest alias first, so "new delhi" wins over "delhi"
+    for size in (3, 2, 1):
+        for i in range(len(tokens) - size + 1):
+            canonical = index.get(" ".join(tokens[i:i + size]))
+            if canonical:
+                return canonical
+    return "" if index is _CITY_INDEX else text
+
+
+def normalize_city(value: Optional[str]) -> str:
+    """Canonical city key for filtering, or "" when unknown."""
+    return _lookup(value, _CITY_INDEX)
+
+
+def normalize_category(value: Optional[str]) -> str:
+    """Canonical category key for filtering, or "" when unknown."""
+    return _lookup(value, _CATEGORY_INDEX)
+
+
+def mentioned_city(text: Optional[str]) -> str:
+    """Known city named anywhere in free text ("plumber in bombay" -> mumbai), or ""."""
+    return normalize_city(text)
+
+
+def mentioned_category(text: Optional[str]) -> str:
+    """Known category named anywhere in free text ("need a darzi" -> tailor), or ""."""
+    category = normalize_category(text)
+    return category if category in CATEGORY_ALIASES else ""
+
+
+def build_where(city: str = "", category_key: str = "") -> Optional[dict]:
+    """
+    Chroma `where` clause over the city / category_key metadata (keys already
+    normalized), or None when there is nothing to filter on.
+    """
+    clauses = []
+    if city:
+        clauses.append({"city": city})
+    if category_key:
+        clauses.append({"category_key": category_key})
+    if not clauses:
+        return None
+    return clauses[0] if len(clauses) == 1 else {"$and": clauses}
@@ -0,0 +1,71 @@
+from dotenv import load_dotenv
+load_dotenv()
+
+import argparse
+import asyncio
+import os
+import signal
+import sys
+
+from src.config import get_settings
+from src.container import ServiceContainer
+from src.services.telegram_poller import TelegramOffsetStore, TelegramPoller
+
+# Usage: python telegram_poll.py [--delete-webhook]
+# Long-polling worker for deployments without a public HTTPS endpoint.
+# Telegram only delivers through one mechanism: remove the webhook first
+# (--delete-webhook), and run set_webhook.py again to switch back.
+
+async def run(args):
+    settings = get_settings()
+    if not settings.TELEGRAM_BOT_TOKEN:
+        print("TELEGRAM_BOT_TOKEN is not set")
+        sys.exit(1)
+
+    services = ServiceContainer()
+    telegram = services.telegram_service
+    offsets = TelegramOffsetStore(
+        settings.TELEGRAM_POLL_OFFSET_PATH or os.path.join(settings.CHROMA_DB_DIR, "telegram_offsets.sqlite3")
+    )
+    poller = TelegramPoller(
+        telegram,
+        services.http_client,
+        offsets,
+        bot_key=settings.TELEGRAM_BOT_TOKEN.split(":", 1)[0],  # bot id only, never the secret
+        batch_size=args.batch_size or settings.TELEGRAM_POLL_BATCH_SIZE,
+        poll_timeout=settings.TELEGRAM_POLL_TIMEOUT_SECONDS,
+        max_concurrency=args.concurrency or settings.TELEGRAM_POLL_MAX_CONCURRENCY
+    )
+
+    if args.delete_webhook:
+        resp = await services.http_client.post(f"{telegram.base_url}/deleteWebhook")
+        print(f"deleteWebhook: {resp.json()}")
+
+    # Starts the background send queue that delivers the replies
+    await services.start()
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+
+    print(f"Polling Telegram for updates (offset {poller.stats()['next_offset']}); Ctrl+C to stop")
+    try:
+        await poller.run(stop)
+        await poller.confirm()
+    finally:
+        print(f"Stopped: {poller.stats()}")
+        offsets.close()
+        await services.aclose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the Telegram bot with getUpdates long polling")
+    parser.add_argument("--delete-webhook", action="store_true", help="Remove the webhook before polling")
+    parser.add_argument("--batch-size", type=int, help="Updates per getUpdates call (max 100)")
+    parser.add_argument("--concurrency", type=int, help="Updates handled concurrently across chats")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
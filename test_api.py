@@ -2,7 +2,6 @@ import requests
 import time
 import json
 import argparse
-import sys
 
 # Parse command line arguments
 parser = argparse.ArgumentParser(description="Test ONDC-Setu API")
@@ -37,7 +36,7 @@ def test_onboard():
     print("  -> Attempting without Admin Key...")
     resp_fail = requests.post(f"{BASE_URL}/v1/vendor/onboard", json=payload)
     if resp_fail.status_code == 403:
-        print(f"  [OK] Blocked correctly (403 Forbidden)")
+        print("  [OK] Blocked correctly (403 Forbidden)")
     else:
         print(f"  [FAIL] Security Bypass! Status: {resp_fail.status_code}")
 
@@ -0,0 +1,164 @@
+"""
+TelegramPoller against the local fake Bot API (benchmarks/fake_telegram.py):
+restart from the durable offset, per-chat order under concurrency, and
+failed handlers keeping the offset until their retry succeeds.
+
+Run: python -m pytest tests/test_telegram_poller.py
+"""
+import asyncio
+import os
+import tempfile
+import time
+
+os.environ.setdefault("GOOGLE_API_KEY", "test-dummy-key")
+os.environ.setdefault("CHROMA_DB_DIR", tempfile.mkdtemp(prefix="test-telegram-poll-"))
+
+import httpx
+import pytest
+
+from benchmarks.fake_telegram import FakeTelegramAPI
+from src.services.telegram_poller import TelegramOffsetStore, TelegramPoller
+
+
+class RecordingService:
+    """Stands in for TelegramService: records handled updates, optionally fails some."""
+
+    def __init__(self, base_url: str, delay: float = 0.01, failures: dict = None, events: list = None):
+        self.base_url = base_url
+        self.delay = delay
+        self.failures = dict(failures or {})  # update_id -> failures left
+        self.events = events if events is not None else []
+        self.handled = []
+        self.running = 0
+        self.peak = 0
+
+    async def handle_incoming_update(self, update: dict):
+        self.running += 1
+        self.peak = max(self.peak, self.running)
+        try:
+            await asyncio.sleep(self.delay)
+            update_id = update["update_id"]
+            if self.failures.get(update_id):
+                self.failures[update_id] -= 1
+                self.events.append(("failed", update_id))
+                raise RuntimeError("handler failed")
+            self.handled.append((update["message"]["chat"]["id"], update_id))
+            self.events.append(("handled", update_id))
+        finally:
+            self.running -= 1
+
+
+class RecordingOffsets(TelegramOffsetStore):
+    def __init__(self, db_path: str, events: list):
+        super().__init__(db_path)
+        self.events = events
+
+    def save(self, bot: str, next_offset: int):
+        self.events.append(("saved", next_offset))
+        super().save(bot, next_offset)
+
+
+@pytest.fixture
+def api():
+    fake = FakeTelegramAPI()
+    fake.start()
+    yield fake
+    fake.stop()
+
+
+def push_updates(api: FakeTelegramAPI, count: int, chats: int) -> list:
+    return [api.push(1000 + i % chats, f"hello {i}") for i in range(count)]
+
+
+async def run_until(poller: TelegramPoller, done, timeout: float = 15.0):
+    """Runs the poller until done() holds, then stops it gracefully (in-flight updates drain)."""
+    stop = asyncio.Event()
+    task = asyncio.create_task(poller.run(stop))
+    deadline = time.monotonic() + timeout
+    while not done() and time.monotonic() < deadline:
+        await asyncio.sleep(0.01)
+    stop.set()
+    await task
+    await poller.confirm()
+
+
+def make_poller(service, offsets, http_client, **kwargs) -> TelegramPoller:
+    return TelegramPoller(service, http_client, offsets, bot_key="test", poll_timeout=1, **kwargs)
+
+
+def test_restart_resumes_from_checkpoint_without_repeats_or_gaps(api, tmp_path):
+    update_ids = push_updates(api, 60, chats=6)
+    base_url = f"{api.base_url}/bot{api.token}"
+    handled = []
+
+    async def scenario():
+        async with httpx.AsyncClient() as client:
+            for target in (20, len(update_ids)):
+                # A new poller and offset store each time, as after a process restart
+                offsets = TelegramOffsetStore(str(tmp_path / "offsets.sqlite3"))
+                service = RecordingService(base_url)
+                poller = make_poller(service, offsets, client, batch_size=10, max_concurrency=8)
+                await run_until(poller, lambda: len(handled) + len(service.handled) >= target)
+                handled.extend(service.handled)
+                offsets.close()
+                assert service.peak > 1, "updates for different chats should run concurrently"
+
+    asyncio.run(scenario())
+
+    ids = [update_id for _, update_id in handled]
+    assert len(ids) == len(set(ids)), "an update was processed twice across the restart"
+    assert sorted(ids) == update_ids, "an update was skipped across the restart"
+    by_chat = {}
+    for chat_id, update_id in handled:
+        by_chat.setdefault(chat_id, []).append(update_id)
+    for chat_id, chat_updates in by_chat.items():
+        assert chat_updates == sorted(chat_updates), f"chat {chat_id} was handled out of order"
+    assert not api.updates, "the final offset was not confirmed to Telegram"
+
+
+def test_failed_update_keeps_the_offset_until_its_retry_succeeds(api, tmp_path):
+    update_ids = push_updates(api, 12, chats=3)
+    failing = update_ids[4]
+    base_url = f"{api.base_url}/bot{api.token}"
+    events = []
+
+    async def scenario():
+        async with httpx.AsyncClient() as client:
+            offsets = RecordingOffsets(str(tmp_path / "offsets.sqlite3"), events)
+            service = RecordingService(base_url, failures={failing: 1}, events=events)
+            poller = make_poller(service, offsets, client, batch_size=5)
+            await run_until(poller, lambda: len(service.handled) >= len(update_ids))
+            offsets.close()
+            return poller
+
+    poller = asyncio.run(scenario())
+
+    assert poller.retried == 1 and poller.dropped == 0
+    first_failure = events.index(("failed", failing))
+    retried_ok = events.index(("handled", failing))
+    saved_meanwhile = [offset for kind, offset in events[first_failure:retried_ok] if kind == "saved"]
+    assert all(offset <= failing for offset in saved_meanwhile), "the offset moved past a failed update"
+    runs = [kind for kind, update_id in events if kind != "saved" and update_id == failing]
+    assert runs == ["failed", "handled"]
+
+
+def test_update_that_keeps_failing_is_dropped_after_max_attempts(api, tmp_path):
+    update_ids = push_updates(api, 6, chats=2)
+    failing = update_ids[1]
+    base_url = f"{api.base_url}/bot{api.token}"
+
+    async def scenario():
+        async with httpx.AsyncClient() as client:
+            offsets = TelegramOffsetStore(str(tmp_path / "offsets.sqlite3"))
+            service = RecordingService(base_url, failures={failing: 99})
+            poller = make_poller(service, offsets, client, max_attempts=3)
+            await run_until(poller, lambda: poller.dropped == 1 and len(service.handled) == len(update_ids) - 1)
+            saved = offsets.load("test")
+            offsets.close()
+            return poller, service, saved
+
+    poller, service, saved = asyncio.run(scenario())
+
+    assert poller.dropped == 1 and poller.retried == 2
+    assert failing not in [update_id for _, update_id in service.handled]
+    assert saved == update_ids[-1] + 1, "the offset should move on once the update is dropped"
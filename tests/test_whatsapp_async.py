@@ -0,0 +1,115 @@
+"""
+WhatsApp async reply mode against the local fake Twilio Messages API
+(benchmarks/fake_twilio.py), driving the real FastAPI app in-process:
+replies are delivered once each, in order per sender, and a full job queue
+falls back to an inline TwiML reply.
+
+Run: python -m pytest tests/test_whatsapp_async.py
+"""
+import asyncio
+import os
+import re
+import tempfile
+import time
+
+os.environ.setdefault("GOOGLE_API_KEY", "test-dummy-key")
+os.environ.setdefault("CHROMA_DB_DIR", tempfile.mkdtemp(prefix="test-whatsapp-"))
+
+import httpx
+import pytest
+
+import main
+from benchmarks.bench_async_throughput import fake_embed
+from benchmarks.bench_telegram_webhook import SlowGenAI
+from benchmarks.fake_twilio import FakeTwilioAPI
+from src.config import get_settings
+
+ASYNC_SETTINGS = ("WHATSAPP_REPLY_MODE", "TWILIO_ACCOUNT_SID", "TWILIO_AUTH_TOKEN", "TWILIO_PHONE_NUMBER",
+                  "TWILIO_API_BASE_URL")
+
+
+@pytest.fixture
+def twilio():
+    fake = FakeTwilioAPI()
+    fake.start()
+    settings = get_settings()
+    saved = {name: getattr(settings, name) for name in ASYNC_SETTINGS}
+    settings.WHATSAPP_REPLY_MODE = "async"
+    settings.TWILIO_ACCOUNT_SID = fake.account_sid
+    settings.TWILIO_AUTH_TOKEN = fake.auth_token
+    settings.TWILIO_PHONE_NUMBER = "+14155238886"
+    settings.TWILIO_API_BASE_URL = fake.base_url
+    yield fake
+    for name, value in saved.items():
+        setattr(settings, name, value)
+    fake.stop()
+
+
+def run_app(scenario):
+    """Runs scenario(services, client) inside the app lifespan with the LLM and embeddings stubbed out."""
+    async def wrapper():
+        async with main.lifespan(main.app):
+            services = main.app.state.services
+            services.embedding_function._embed_remote = fake_embed
+            if services.embedding_function.batcher:
+                services.embedding_function.batcher.embed_fn = fake_embed
+            llm = SlowGenAI(0.01)
+            services.bot_core.client = llm
+            services.message_analyzer.client = llm
+            services.intent_engine.centroid = None
+            services.bot_core.rate_limiter = None
+            services.bot_core.analysis_cache_ttl = 0
+            transport = httpx.ASGITransport(app=main.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test", timeout=30) as client:
+                return await scenario(services, client)
+
+    return asyncio.run(wrapper())
+
+
+async def wait_for(condition, timeout: float = 15.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        await asyncio.sleep(0.02)
+
+
+def test_async_mode_delivers_each_reply_once_in_order_per_sender(twilio):
+    messages = [(seq, f"whatsapp:+9199000000{seq % 3:02d}") for seq in range(12)]
+
+    async def scenario(services, client):
+        assert services.whatsapp_service.replies_async
+        responses = []
+        for seq, sender in messages:
+            resp = await client.post("/v1/whatsapp/webhook", data={"Body": f"hmm {seq} ?", "From": sender})
+            responses.append(resp)
+        await wait_for(lambda: len(twilio.sent) >= len(messages))
+        await asyncio.sleep(0.2)  # let any duplicate arrive before counting
+        return responses
+
+    responses = run_app(scenario)
+
+    for resp in responses:
+        assert resp.status_code == 200
+        assert "<Message>" not in resp.text, "async mode should answer the webhook with empty TwiML"
+    assert len(twilio.sent) == len(messages), f"expected {len(messages)} replies, got {len(twilio.sent)}"
+    expected, received = {}, {}
+    for seq, sender in messages:
+        expected.setdefault(sender, []).append(seq)
+    for form in twilio.sent:
+        assert form["From"] == "whatsapp:+14155238886"
+        received.setdefault(form["To"], []).append(int(re.search(r"hmm (\d+)", form["Body"]).group(1)))
+    assert received == expected, "replies were duplicated, lost or out of order for a sender"
+
+
+def test_full_job_queue_falls_back_to_an_inline_twiml_reply(twilio):
+    async def scenario(services, client):
+        services.job_queue.max_depth = 0  # every enqueue raises QueueFullError
+        resp = await client.post("/v1/whatsapp/webhook", data={"Body": "hmm 7 ?", "From": "whatsapp:+919900000099"})
+        await asyncio.sleep(0.3)
+        return resp, services.job_queue.rejected
+
+    resp, rejected = run_app(scenario)
+
+    assert rejected == 1
+    assert resp.status_code == 200
+    assert re.search(r"<Message>.*hmm 7.*</Message>", resp.text, re.S), "expected the reply inline in TwiML"
+    assert not twilio.sent, "the inline reply must not also go out through the Messages API"